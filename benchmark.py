@@ -0,0 +1,509 @@
+"""
+Benchmark riproducibile dei motori di ottimizzazione del taglio barre
+
+Genera istanze sintetiche con un seme fisso, esegue ogni motore
+(OttimizzatoreTaglio.ottimizza e le strategie _calcola_scenario_* di
+GeneratoreScenari) e riporta tempo, picco di memoria, barre, sfrido e
+distanza dal limite inferiore teorico.
+
+Esempi:
+    python benchmark.py
+    python benchmark.py --pezzi 5000 --json risultati.json
+    python benchmark.py --salva-baseline baseline.json
+    python benchmark.py --baseline baseline.json   (esce con 1 se ci sono regressioni)
+    python benchmark.py --scalabilita              (complessità asintotica e budget degli scenari)
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from ottimizzatore_taglio import (OttimizzatoreTaglio, GeneratoreScenari, _DomandaPezzi,
+                                  limite_inferiore_barre, TEMPO_ENUMERAZIONE)
+
+
+# ---------------------------------------------------------------------------
+# Generatori di istanze: restituiscono (pezzi_richiesti, catalogo, spessore_lama)
+# con pezzi_richiesti nel formato dell'applicazione [(quantità, lunghezza), ...]
+# ---------------------------------------------------------------------------
+
+def _raggruppa(lunghezze):
+    """Converte una lista di lunghezze in tuple (quantità, lunghezza)"""
+    conteggi = {}
+    for lunghezza in lunghezze:
+        conteggi[lunghezza] = conteggi.get(lunghezza, 0) + 1
+    return [(qty, lunghezza) for lunghezza, qty in sorted(conteggi.items(), reverse=True)]
+
+
+def istanza_uniforme(rng, num_pezzi):
+    """Pezzi uniformi tra il 10% e il 70% della barra, catalogo a tre lunghezze"""
+    catalogo = [6000, 7500, 4000]
+    lunghezze = [rng.randint(600, 4200) for _ in range(num_pezzi)]
+    return _raggruppa(lunghezze), catalogo, 3.0
+
+
+def istanza_triplette(rng, num_pezzi):
+    """Triplette alla Falkenauer: ogni terna riempie esattamente una barra da 6000
+
+    Senza spessore lama l'ottimo è noto (num_pezzi / 3 barre) e il gap misura
+    direttamente la qualità del motore.
+    """
+    capacita = 6000
+    lunghezze = []
+    for _ in range(max(1, num_pezzi // 3)):
+        primo = rng.randint(2280, 2940)
+        secondo = rng.randint(1500, (capacita - primo) // 2)
+        lunghezze.extend((primo, secondo, capacita - primo - secondo))
+    return _raggruppa(lunghezze), [capacita], 0.0
+
+
+def istanza_hard28(rng, num_pezzi):
+    """Profilo simile alle istanze "hard28": molte lunghezze distinte, pochi duplicati
+
+    Le istanze originali hanno 160-200 pezzi con capacità 1000; qui i pezzi
+    sono riscalati su barre da 6000 e la dimensione segue num_pezzi.
+    """
+    lunghezze = [rng.randint(1, 800) * 6 for _ in range(num_pezzi)]
+    return _raggruppa(lunghezze), [6000], 0.0
+
+
+def istanza_reale(rng, num_pezzi):
+    """Mix realistico: poche misure commerciali molto ripetute (distribuzione di Zipf)"""
+    misure = sorted({rng.randint(50, 560) * 5 for _ in range(15)}, reverse=True)
+    pesi = [1.0 / (k + 1) for k in range(len(misure))]
+    rng.shuffle(pesi)
+    lunghezze = rng.choices(misure, weights=pesi, k=num_pezzi)
+    return _raggruppa(lunghezze), [6000, 6500, 3000], 4.0
+
+
+GENERATORI = {
+    "uniforme": istanza_uniforme,
+    "triplette": istanza_triplette,
+    "hard28": istanza_hard28,
+    "reale": istanza_reale,
+}
+
+
+# ---------------------------------------------------------------------------
+# Motori: ogni funzione riceve l'istanza e restituisce un PianoTaglio (o None)
+# ---------------------------------------------------------------------------
+
+def _scenario(metodo, argomenti=lambda catalogo: ()):
+    """Adatta una strategia di GeneratoreScenari all'interfaccia dei motori
+
+    argomenti(catalogo) fornisce gli eventuali parametri specifici della strategia.
+    """
+    def esegui(pezzi, catalogo, spessore_lama):
+        generatore = GeneratoreScenari()
+        scenario = getattr(generatore, metodo)(_DomandaPezzi(pezzi), catalogo, spessore_lama,
+                                               *argomenti(catalogo), None)
+        return scenario['piano'] if scenario else None
+    return esegui
+
+
+def motore_ottimizza(pezzi, catalogo, spessore_lama):
+    # Magazzino illimitato con le lunghezze del catalogo
+    num_pezzi = sum(qty for qty, _ in pezzi)
+    barre = [(num_pezzi, lunghezza) for lunghezza in catalogo]
+    return OttimizzatoreTaglio(barre, spessore_lama).ottimizza(pezzi)
+
+
+def motore_scenari(pezzi, catalogo, spessore_lama):
+    # Pipeline completa: restituisce il piano con meno barre tra quelli generati
+    scenari = GeneratoreScenari().genera_tutti_scenari(pezzi, catalogo, spessore_lama)
+    return min((s['piano'] for s in scenari), key=len, default=None)
+
+
+def motore_scenari_fissi(pezzi, catalogo, spessore_lama):
+    # Solo le strategie fisse: l'enumerazione dei sottoinsiemi del catalogo si ferma
+    # dopo TEMPO_ENUMERAZIONE secondi e renderebbe la crescita misurata più piatta del vero
+    scenari = GeneratoreScenari().genera_tutti_scenari(pezzi, catalogo, spessore_lama, tempo_enumerazione=0)
+    return min((s['piano'] for s in scenari), key=len, default=None)
+
+
+MOTORI = {
+    "ottimizza": motore_ottimizza,
+    "greedy": _scenario("_calcola_scenario_greedy"),
+    "preferenza": _scenario("_calcola_scenario_con_preferenza", lambda catalogo: (min(catalogo),)),
+    "min_barre": _scenario("_calcola_scenario_min_barre"),
+    "scarti_lunghi": _scenario("_calcola_scenario_scarti_lunghi"),
+    "scenari": motore_scenari,
+}
+
+
+# ---------------------------------------------------------------------------
+# Esecuzione e misure
+# ---------------------------------------------------------------------------
+
+def misura(motore, istanza, seme, ripetizioni):
+    """Esegue un motore su un'istanza e ne misura tempo e memoria
+
+    Il tempo è il minimo su più ripetizioni senza tracemalloc (che rallenta
+    molto le allocazioni); il picco di memoria viene da una esecuzione a parte.
+    """
+    pezzi, catalogo, spessore_lama = istanza
+
+    tempi = []
+    piano = None
+    for _ in range(ripetizioni):
+        random.seed(seme)
+        inizio = time.perf_counter()
+        piano = motore(pezzi, catalogo, spessore_lama)
+        tempi.append(time.perf_counter() - inizio)
+
+    random.seed(seme)
+    tracemalloc.start()
+    motore(pezzi, catalogo, spessore_lama)
+    _, picco = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    risultato = {
+        "tempo_s": round(min(tempi), 4),
+        "memoria_picco_mb": round(picco / 1e6, 3),
+        "barre": None,
+        "sfrido_mm": None,
+        "limite_inferiore": limite_inferiore_barre(pezzi, max(catalogo), spessore_lama),
+        "gap_percento": None,
+    }
+    if piano is not None:
+        risultato["barre"] = len(piano)
+        risultato["sfrido_mm"] = round(piano.sfrido_totale, 1)
+        if risultato["limite_inferiore"]:
+            risultato["gap_percento"] = round(100.0 * (len(piano) - risultato["limite_inferiore"])
+                                              / risultato["limite_inferiore"], 2)
+    return risultato
+
+
+def esegui_benchmark(istanze, motori, num_pezzi, seme, ripetizioni):
+    """Esegue tutti i motori richiesti su tutte le istanze richieste"""
+    righe = []
+    for nome_istanza in istanze:
+        istanza = GENERATORI[nome_istanza](random.Random(seme), num_pezzi)
+        for nome_motore in motori:
+            try:
+                risultato = misura(MOTORI[nome_motore], istanza, seme, ripetizioni)
+            except ValueError as e:
+                risultato = {"errore": str(e).splitlines()[0]}
+            risultato.update(istanza=nome_istanza, motore=nome_motore)
+            righe.append(risultato)
+            print(f"  {nome_istanza:<10} {nome_motore:<14} {risultato.get('tempo_s', '-')} s", file=sys.stderr)
+    return {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "piattaforma": platform.platform(),
+        "pezzi": num_pezzi,
+        "seme": seme,
+        "risultati": righe,
+    }
+
+
+def confronta_baseline(rapporto, baseline, soglia_tempo, tolleranza_s=0.01):
+    """Confronta un rapporto con una baseline e restituisce la lista delle regressioni
+
+    Una regressione è un tempo oltre soglia_tempo volte quello di riferimento
+    (con una tolleranza assoluta per i tempi molto brevi) oppure un numero di
+    barre maggiore sulla stessa istanza.
+    """
+    riferimento = {(r["istanza"], r["motore"]): r for r in baseline["risultati"]}
+    regressioni = []
+    for r in rapporto["risultati"]:
+        base = riferimento.get((r["istanza"], r["motore"]))
+        if base is None or "errore" in r or "errore" in base:
+            continue
+        if r["tempo_s"] > base["tempo_s"] * soglia_tempo + tolleranza_s:
+            regressioni.append(f"{r['istanza']}/{r['motore']}: tempo {base['tempo_s']}s -> {r['tempo_s']}s")
+        if base["barre"] is not None and r["barre"] is not None and r["barre"] > base["barre"]:
+            regressioni.append(f"{r['istanza']}/{r['motore']}: barre {base['barre']} -> {r['barre']}")
+    return regressioni
+
+
+def tabella_markdown(rapporto, baseline=None):
+    """Formatta il rapporto come tabella markdown"""
+    riferimento = {}
+    if baseline:
+        riferimento = {(r["istanza"], r["motore"]): r for r in baseline["risultati"]}
+
+    righe = [
+        f"Pezzi: {rapporto['pezzi']} | Seme: {rapporto['seme']} | Python {rapporto['python']}",
+        "",
+        "| Istanza | Motore | Tempo (s) | Memoria (MB) | Barre | Limite inf. | Gap (%) | Sfrido (mm) |"
+        + (" Δ tempo |" if baseline else ""),
+        "|---|---|---:|---:|---:|---:|---:|---:|" + ("---:|" if baseline else ""),
+    ]
+    for r in rapporto["risultati"]:
+        if "errore" in r:
+            righe.append(f"| {r['istanza']} | {r['motore']} | errore: {r['errore']} |")
+            continue
+        riga = (f"| {r['istanza']} | {r['motore']} | {r['tempo_s']:.4f} | {r['memoria_picco_mb']:.2f} "
+                f"| {r['barre'] if r['barre'] is not None else '-'} | {r['limite_inferiore']} "
+                f"| {r['gap_percento'] if r['gap_percento'] is not None else '-'} "
+                f"| {r['sfrido_mm'] if r['sfrido_mm'] is not None else '-'} |")
+        if baseline:
+            base = riferimento.get((r["istanza"], r["motore"]))
+            if base and "errore" not in base and base["tempo_s"] > 0:
+                riga += f" {100.0 * (r['tempo_s'] / base['tempo_s'] - 1):+.0f}% |"
+            else:
+                riga += " - |"
+        righe.append(riga)
+    return "\n".join(righe)
+
+
+# ---------------------------------------------------------------------------
+# Verifica di scalabilità: esponente di crescita del tempo al crescere dei pezzi
+# ---------------------------------------------------------------------------
+
+# Classe di complessità dichiarata per ogni motore (nel numero di pezzi):
+# - ottimizza e greedy: best fit con ricerca binaria tra le barre aperte (_BarreAperte)
+# - preferenza, min_barre e scarti_lunghi: riempi senza limite lascia ogni barra nuova
+#   con meno spazio del pezzo residuo più corto, quindi le barre aperte da scorrere
+#   restano vuote; il costo è l'ordinamento delle classi più i riempimenti
+# - scenari: le strategie fisse (una per lunghezza del catalogo più tre) a budget
+#   fisso, senza l'enumerazione a tempo (vedi MOTORI_SCALABILITA)
+COMPLESSITA_DICHIARATA = {
+    "ottimizza": "n log n",
+    "greedy": "n log n",
+    "preferenza": "n log n",
+    "min_barre": "n log n",
+    "scarti_lunghi": "n log n",
+    "scenari": "n log n",
+}
+
+# Crescita di ogni classe: l'esponente atteso è la pendenza del suo fit log-log
+# alle stesse dimensioni misurate (n log n tra 1.000 e 100.000 pezzi dà circa 1.11)
+CLASSI_COMPLESSITA = {
+    "n": lambda n: n,
+    "n log n": lambda n: n * math.log(n),
+    "n²": lambda n: n * n,
+}
+
+# Motori sostituiti nella verifica di scalabilità da una variante a budget fisso
+MOTORI_SCALABILITA = {
+    "scenari": motore_scenari_fissi,
+}
+
+# Margine sull'esponente atteso: assorbe cache e rumore della macchina, ma un
+# percorso diventato quadratico (esponente ~2) viene comunque segnalato
+TOLLERANZA_ESPONENTE = 0.4
+
+# Tempo minimo di misura per ogni punto: le istanze piccole vengono ripetute
+TEMPO_MINIMO_PUNTO_S = 0.2
+
+
+def _tempo_minimo(motore, istanza, seme, tempo_minimo=TEMPO_MINIMO_PUNTO_S, max_ripetizioni=20):
+    """Miglior tempo di un motore su un'istanza, ripetendo finché la misura è significativa"""
+    pezzi, catalogo, spessore_lama = istanza
+    tempi = []
+    while sum(tempi) < tempo_minimo and len(tempi) < max_ripetizioni:
+        random.seed(seme)
+        inizio = time.perf_counter()
+        motore(pezzi, catalogo, spessore_lama)
+        tempi.append(time.perf_counter() - inizio)
+    return min(tempi)
+
+
+def esponente_crescita(dimensioni, tempi):
+    """Pendenza della retta di regressione di log(tempo) su log(dimensione)"""
+    xs = [math.log(n) for n in dimensioni]
+    ys = [math.log(max(t, 1e-9)) for t in tempi]
+    media_x = sum(xs) / len(xs)
+    media_y = sum(ys) / len(ys)
+    numeratore = sum((x - media_x) * (y - media_y) for x, y in zip(xs, ys))
+    denominatore = sum((x - media_x) ** 2 for x in xs)
+    return numeratore / denominatore
+
+
+def verifica_scalabilita(istanze, motori, dimensioni, seme, tolleranza=TOLLERANZA_ESPONENTE):
+    """Misura ogni motore alle dimensioni indicate e confronta l'esponente con quello dichiarato
+
+    I motori con un tempo massimo (scenari) si misurano nella variante a budget
+    fisso di MOTORI_SCALABILITA.
+
+    Returns:
+        Lista di dict (istanza, motore, tempi_s, esponente, limite, classe, ok)
+    """
+    risultati = []
+    for nome_istanza in istanze:
+        istanze_dim = [GENERATORI[nome_istanza](random.Random(seme), n) for n in dimensioni]
+        for nome_motore in motori:
+            motore = MOTORI_SCALABILITA.get(nome_motore, MOTORI[nome_motore])
+            tempi = [_tempo_minimo(motore, istanza, seme) for istanza in istanze_dim]
+            classe = COMPLESSITA_DICHIARATA[nome_motore]
+            atteso = esponente_crescita(dimensioni, [CLASSI_COMPLESSITA[classe](n) for n in dimensioni])
+            esponente = esponente_crescita(dimensioni, tempi)
+            limite = round(atteso + tolleranza, 2)
+            risultati.append({
+                "istanza": nome_istanza,
+                "motore": nome_motore,
+                "tempi_s": [round(t, 4) for t in tempi],
+                "esponente": round(esponente, 2),
+                "limite": limite,
+                "classe": classe,
+                "ok": esponente <= limite,
+            })
+            print(f"  {nome_istanza:<10} {nome_motore:<14} esponente {esponente:.2f}", file=sys.stderr)
+    return risultati
+
+
+def tabella_scalabilita(risultati, dimensioni):
+    """Formatta i risultati della verifica di scalabilità come tabella markdown"""
+    intestazione_tempi = " | ".join(f"{n} pezzi (s)" for n in dimensioni)
+    righe = [
+        f"| Istanza | Motore | {intestazione_tempi} | Esponente | Classe | Limite | Esito |",
+        "|---|---|" + "---:|" * len(dimensioni) + "---:|---|---:|---|",
+    ]
+    for r in risultati:
+        tempi = " | ".join(f"{t:.4f}" for t in r["tempi_s"])
+        esito = "OK" if r["ok"] else "FUORI CLASSE"
+        righe.append(f"| {r['istanza']} | {r['motore']} | {tempi} | {r['esponente']:.2f} "
+                     f"| {r['classe']} | {r['limite']:.2f} | {esito} |")
+    return "\n".join(righe)
+
+
+# ---------------------------------------------------------------------------
+# Verifica del budget di enumerazione: tempo degli scenari al crescere del catalogo
+# ---------------------------------------------------------------------------
+
+# Pezzi delle istanze per la verifica del catalogo: il costo cresce con le lunghezze, non con i pezzi
+PEZZI_CATALOGO = 1000
+
+# Tempo massimo oltre strategie fisse e budget: generazione dei candidati e
+# ultimo scenario avviato prima della scadenza
+MARGINE_CATALOGO_S = 0.25
+
+
+def catalogo_esteso(num_lunghezze, minima=3000, massima=7500):
+    """Catalogo di num_lunghezze lunghezze equidistanti tra minima e massima"""
+    passo = (massima - minima) / max(1, num_lunghezze - 1)
+    return [round(minima + i * passo) for i in range(num_lunghezze)]
+
+
+def verifica_catalogo(istanze, lunghezze_catalogo, seme, budget=TEMPO_ENUMERAZIONE, margine=MARGINE_CATALOGO_S):
+    """Misura gli scenari con cataloghi sempre più lunghi e controlla che l'enumerazione resti nel budget
+
+    L'enumerazione dei sottoinsiemi cresce in modo esponenziale con le
+    lunghezze del catalogo: il tempo oltre le strategie fisse deve restare
+    entro budget + margine qualunque sia il numero di lunghezze.
+
+    Returns:
+        Lista di dict (istanza, lunghezze, fissi_s, totale_s, eccesso_s, ok)
+    """
+    risultati = []
+    for nome_istanza in istanze:
+        pezzi, catalogo, spessore_lama = GENERATORI[nome_istanza](random.Random(seme), PEZZI_CATALOGO)
+        for num_lunghezze in lunghezze_catalogo:
+            catalogo = catalogo_esteso(num_lunghezze, massima=max(7500, pezzi[0][1]))
+            tempi = []
+            for tempo_enumerazione in (0, budget):
+                random.seed(seme)
+                inizio = time.perf_counter()
+                GeneratoreScenari().genera_tutti_scenari(pezzi, catalogo, spessore_lama,
+                                                         tempo_enumerazione=tempo_enumerazione)
+                tempi.append(time.perf_counter() - inizio)
+            eccesso = tempi[1] - tempi[0] - budget
+            risultati.append({
+                "istanza": nome_istanza,
+                "lunghezze": num_lunghezze,
+                "fissi_s": round(tempi[0], 4),
+                "totale_s": round(tempi[1], 4),
+                "eccesso_s": round(eccesso, 4),
+                "ok": eccesso <= margine,
+            })
+            print(f"  {nome_istanza:<10} {num_lunghezze:>3} lunghezze  eccesso {eccesso:.3f} s", file=sys.stderr)
+    return risultati
+
+
+def tabella_catalogo(risultati, budget=TEMPO_ENUMERAZIONE):
+    """Formatta i risultati della verifica del catalogo come tabella markdown"""
+    righe = [
+        f"| Istanza | Lunghezze | Strategie fisse (s) | Con enumerazione {budget:g} s (s) | Eccesso (s) | Esito |",
+        "|---|---:|---:|---:|---:|---|",
+    ]
+    for r in risultati:
+        esito = "OK" if r["ok"] else "FUORI BUDGET"
+        righe.append(f"| {r['istanza']} | {r['lunghezze']} | {r['fissi_s']:.4f} | {r['totale_s']:.4f} "
+                     f"| {r['eccesso_s']:.4f} | {esito} |")
+    return "\n".join(righe)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dei motori di ottimizzazione taglio barre")
+    parser.add_argument("--pezzi", type=int, default=2000, help="Numero di pezzi per istanza (default 2000)")
+    parser.add_argument("--seme", type=int, default=12345, help="Seme del generatore casuale")
+    parser.add_argument("--ripetizioni", type=int, default=3, help="Ripetizioni per la misura del tempo")
+    parser.add_argument("--istanze", nargs="+", choices=sorted(GENERATORI), default=list(GENERATORI))
+    parser.add_argument("--motori", nargs="+", choices=sorted(MOTORI), default=list(MOTORI))
+    parser.add_argument("--json", help="Salva il rapporto JSON in questo file")
+    parser.add_argument("--baseline", help="Rapporto JSON di riferimento con cui confrontare")
+    parser.add_argument("--salva-baseline", help="Salva il rapporto come nuova baseline")
+    parser.add_argument("--soglia", type=float, default=1.25,
+                        help="Rapporto massimo di tempo rispetto alla baseline (default 1.25)")
+    parser.add_argument("--scalabilita", action="store_true",
+                        help="Verifica l'esponente di crescita dei motori (esce con 1 se fuori classe)")
+    parser.add_argument("--dimensioni", nargs="+", type=int, default=[1000, 10000, 100000],
+                        help="Numero di pezzi per la verifica di scalabilità")
+    parser.add_argument("--lunghezze-catalogo", nargs="+", type=int, default=[6, 8, 10, 12],
+                        help="Lunghezze del catalogo per la verifica del budget di enumerazione")
+    parser.add_argument("--margine-catalogo", type=float, default=MARGINE_CATALOGO_S,
+                        help="Secondi tollerati oltre il budget di enumerazione (default 0.25)")
+    args = parser.parse_args(argv)
+
+    if args.scalabilita:
+        istanze = args.istanze if args.istanze != list(GENERATORI) else ["uniforme", "reale"]
+        risultati = verifica_scalabilita(istanze, args.motori, args.dimensioni, args.seme)
+        print(tabella_scalabilita(risultati, args.dimensioni))
+        risultati_catalogo = []
+        if "scenari" in args.motori:
+            risultati_catalogo = verifica_catalogo(istanze, args.lunghezze_catalogo, args.seme,
+                                                   margine=args.margine_catalogo)
+            print()
+            print(tabella_catalogo(risultati_catalogo))
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(risultati, f, indent=2, ensure_ascii=False)
+        fuori_classe = [r for r in risultati if not r["ok"]]
+        fuori_budget = [r for r in risultati_catalogo if not r["ok"]]
+        if fuori_classe:
+            print("\nMOTORI FUORI DALLA CLASSE DI COMPLESSITÀ DICHIARATA:")
+            for r in fuori_classe:
+                print(f"  - {r['istanza']}/{r['motore']}: esponente {r['esponente']} > {r['limite']:.2f}")
+        if fuori_budget:
+            print("\nENUMERAZIONE DEGLI SCENARI OLTRE IL BUDGET:")
+            for r in fuori_budget:
+                print(f"  - {r['istanza']}/{r['lunghezze']} lunghezze: {r['eccesso_s']} s oltre il budget")
+        if fuori_classe or fuori_budget:
+            return 1
+        print("\nTutti i motori rispettano la complessità dichiarata.")
+        return 0
+
+    rapporto = esegui_benchmark(args.istanze, args.motori, args.pezzi, args.seme, args.ripetizioni)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print(tabella_markdown(rapporto, baseline))
+
+    for percorso in (args.json, args.salva_baseline):
+        if percorso:
+            with open(percorso, "w", encoding="utf-8") as f:
+                json.dump(rapporto, f, indent=2, ensure_ascii=False)
+
+    if baseline:
+        regressioni = confronta_baseline(rapporto, baseline, args.soglia)
+        if regressioni:
+            print("\nREGRESSIONI:")
+            for r in regressioni:
+                print(f"  - {r}")
+            return 1
+        print("\nNessuna regressione rispetto alla baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
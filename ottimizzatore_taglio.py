@@ -1,33 +1,1587 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
-from typing import List, Tuple, Dict
+from tkinter import ttk, messagebox, filedialog, simpledialog
+from typing import List, Tuple
+import bisect
 import copy
+import cProfile
+import functools
+import heapq
+import itertools
+import json
+import multiprocessing
 import random
 import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.units import mm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+from reportlab.platypus import SimpleDocTemplate, LongTable, TableStyle, Paragraph, Spacer, PageBreak, Flowable
+from reportlab.graphics.shapes import Drawing, Rect, String
+from reportlab.graphics import renderPDF
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from openpyxl import load_workbook, Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment
 
 
+class Strumentazione:
+    """Tempi e contatori dei punti caldi dell'ottimizzazione
+
+    Di default è disattivata e le funzioni _conta e _misurato non fanno nulla
+    oltre a un controllo su None. Si attiva per un blocco di codice:
+
+        with Strumentazione(memoria=True) as s:
+            GeneratoreScenari().genera_tutti_scenari(...)
+        print(s.come_dict())
+
+    Ogni sezione (una strategia, ottimizza, ...) accumula chiamate, tempo,
+    contatori e, se memoria=True, il picco di memoria misurato con tracemalloc
+    (che rallenta sensibilmente l'esecuzione). Con profilo=percorso viene
+    salvato anche un dump cProfile/pstats dell'intero blocco.
+
+    L'istanza attiva è per thread: un calcolo in un thread in background non
+    scrive nella strumentazione aperta da un altro thread.
+    """
+
+    # Istanza attiva di ogni thread (attributo assente = strumentazione disattivata)
+    _locale = threading.local()
+
+    def __init__(self, memoria=False, profilo=None):
+        """
+        Args:
+            memoria: Se True misura il picco di memoria di ogni sezione
+            profilo: Percorso opzionale del file pstats da scrivere
+        """
+        self.memoria = memoria
+        self.profilo = profilo
+        self.sezioni = {}
+        self.tempo_totale = 0.0
+        self._pila = []
+        self._profiler = None
+        self._avviato_tracemalloc = False
+
+    @staticmethod
+    def attiva():
+        """Strumentazione attiva nel thread corrente, None se disattivata"""
+        return getattr(Strumentazione._locale, "istanza", None)
+
+    def __enter__(self):
+        self._precedente = Strumentazione.attiva()
+        Strumentazione._locale.istanza = self
+        if self.memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._avviato_tracemalloc = True
+        if self.profilo:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._inizio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valore, traccia):
+        self.tempo_totale += time.perf_counter() - self._inizio
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.profilo)
+            self._profiler = None
+        if self._avviato_tracemalloc:
+            tracemalloc.stop()
+            self._avviato_tracemalloc = False
+        Strumentazione._locale.istanza = self._precedente
+        return False
+
+    def _sezione(self, nome):
+        sezione = self.sezioni.get(nome)
+        if sezione is None:
+            sezione = self.sezioni[nome] = {"chiamate": 0, "tempo_s": 0.0, "memoria_picco_mb": None}
+        return sezione
+
+    def entra(self, nome):
+        """Apre una sezione misurata (le sezioni possono essere annidate)"""
+        memoria_iniziale = picco = 0
+        if self.memoria:
+            memoria_iniziale, picco = tracemalloc.get_traced_memory()
+            # Il picco viene azzerato per la sezione: conservalo per quella esterna
+            if self._pila:
+                self._pila[-1][3] = max(self._pila[-1][3], picco)
+            tracemalloc.reset_peak()
+        self._pila.append([nome, time.perf_counter(), memoria_iniziale, 0])
+
+    def esci(self):
+        """Chiude la sezione aperta più recente"""
+        nome, inizio, memoria_iniziale, picco = self._pila.pop()
+        sezione = self._sezione(nome)
+        sezione["chiamate"] += 1
+        sezione["tempo_s"] += time.perf_counter() - inizio
+        if self.memoria:
+            picco = max(picco, tracemalloc.get_traced_memory()[1])
+            if self._pila:
+                self._pila[-1][3] = max(self._pila[-1][3], picco)
+            picco_mb = (picco - memoria_iniziale) / 1e6
+            precedente = sezione["memoria_picco_mb"] or 0.0
+            sezione["memoria_picco_mb"] = max(precedente, picco_mb)
+
+    def conta(self, **contatori):
+        """Somma i contatori alla sezione aperta (o a "totale" fuori da ogni sezione)"""
+        sezione = self._sezione(self._pila[-1][0] if self._pila else "totale")
+        for nome, valore in contatori.items():
+            sezione[nome] = sezione.get(nome, 0) + valore
+
+    def come_dict(self):
+        """Dati raccolti in forma serializzabile (JSON)"""
+        return {
+            "tempo_totale_s": round(self.tempo_totale, 6),
+            "sezioni": {
+                nome: {k: (round(v, 6) if isinstance(v, float) else v) for k, v in sezione.items()}
+                for nome, sezione in self.sezioni.items()
+            },
+        }
+
+
+def _conta(**contatori):
+    """Aggiorna i contatori della strumentazione attiva (nessun effetto se disattivata)"""
+    strumentazione = Strumentazione.attiva()
+    if strumentazione is not None:
+        strumentazione.conta(**contatori)
+
+
+def _misurato(nome):
+    """Decoratore: misura ogni chiamata della funzione come sezione della strumentazione"""
+    def decora(funzione):
+        @functools.wraps(funzione)
+        def misurata(*args, **kwargs):
+            strumentazione = Strumentazione.attiva()
+            if strumentazione is None:
+                return funzione(*args, **kwargs)
+            strumentazione.entra(nome)
+            try:
+                return funzione(*args, **kwargs)
+            finally:
+                strumentazione.esci()
+        return misurata
+    return decora
+
+
+class PatternTaglio:
+    """Schema di taglio di una singola barra: lunghezza, tagli e sfrido
+
+    Le istanze sono internate (una sola istanza per ogni schema distinto),
+    immutabili e hashable: i piani di taglio con molte barre identiche
+    condividono lo stesso oggetto. I tagli sono memorizzati in ordine decrescente.
+    Il profilo (materiale/sezione) distingue barre uguali di commesse multi-profilo;
+    è vuoto per i lavori a profilo singolo.
+    """
+    __slots__ = ('lunghezza', 'tagli', 'sfrido', 'profilo', '_hash', '__weakref__')
+
+    _istanze = weakref.WeakValueDictionary()
+
+    def __new__(cls, lunghezza, tagli, sfrido, profilo=""):
+        tagli = tuple(sorted(tagli, reverse=True))
+        # Arrotonda per non distinguere schemi che differiscono solo per errori di virgola mobile
+        sfrido = round(sfrido, 6)
+        chiave = (profilo, lunghezza, tagli, sfrido)
+        istanza = cls._istanze.get(chiave)
+        if istanza is None:
+            _conta(pattern_nuovi=1)
+            istanza = object.__new__(cls)
+            object.__setattr__(istanza, 'lunghezza', lunghezza)
+            object.__setattr__(istanza, 'tagli', tagli)
+            object.__setattr__(istanza, 'sfrido', sfrido)
+            object.__setattr__(istanza, 'profilo', profilo)
+            object.__setattr__(istanza, '_hash', hash(chiave))
+            cls._istanze[chiave] = istanza
+        else:
+            _conta(pattern_riusati=1)
+        return istanza
+
+    def __setattr__(self, nome, valore):
+        raise AttributeError("PatternTaglio è immutabile")
+
+    def __reduce__(self):
+        # Dopo la deserializzazione (es. tra processi) l'istanza viene internata di nuovo
+        return (PatternTaglio, (self.lunghezza, self.tagli, self.sfrido, self.profilo))
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, altro):
+        if self is altro:
+            return True
+        if not isinstance(altro, PatternTaglio):
+            return NotImplemented
+        return ((self.profilo, self.lunghezza, self.tagli, self.sfrido)
+                == (altro.profilo, altro.lunghezza, altro.tagli, altro.sfrido))
+
+    def __repr__(self):
+        if self.profilo:
+            return f"PatternTaglio({self.lunghezza!r}, {self.tagli!r}, {self.sfrido!r}, {self.profilo!r})"
+        return f"PatternTaglio({self.lunghezza!r}, {self.tagli!r}, {self.sfrido!r})"
+
+    @property
+    def num_tagli(self):
+        return len(self.tagli)
+
+    @property
+    def tagli_str(self):
+        return " + ".join(str(int(t)) for t in self.tagli)
+
+    @property
+    def descrizione_barra(self):
+        """Barra da usare, es. "6000 mm" oppure "IPE80 6000 mm" """
+        if self.profilo:
+            return f"{self.profilo} {int(self.lunghezza)} mm"
+        return f"{int(self.lunghezza)} mm"
+
+    def con_profilo(self, profilo):
+        """Lo stesso schema assegnato a un profilo"""
+        return PatternTaglio(self.lunghezza, self.tagli, self.sfrido, profilo)
+
+    def chiave_ordinamento(self):
+        """Ordine canonico: per profilo, poi barre più lunghe prima, poi tagli più lunghi prima"""
+        return (self.profilo, -self.lunghezza, tuple(-t for t in self.tagli), self.sfrido)
+
+
+class PianoTaglio:
+    """Piano di taglio canonico: pattern distinti con la rispettiva molteplicità
+
+    Memoria, visualizzazione e report crescono con il numero di pattern distinti
+    e non con il numero di barre. Le barre sono numerate seguendo l'ordine
+    canonico delle voci; il piano è immutabile e hashable.
+    """
+    __slots__ = ('voci', '_cumulate', '_hash')
+
+    def __init__(self, voci=()):
+        """
+        Args:
+            voci: Iterabile di tuple (PatternTaglio, numero di copie)
+        """
+        conteggi = {}
+        for pattern, copie in voci:
+            conteggi[pattern] = conteggi.get(pattern, 0) + copie
+
+        self.voci = tuple(sorted(((p, c) for p, c in conteggi.items() if c > 0),
+                                 key=lambda voce: voce[0].chiave_ordinamento()))
+
+        # Numero di barre prima di ogni voce, per accedere alla barra i-esima con bisect
+        cumulate = [0]
+        for _, copie in self.voci:
+            cumulate.append(cumulate[-1] + copie)
+        self._cumulate = cumulate
+        self._hash = hash(self.voci)
+
+    @classmethod
+    def da_barre(cls, barre):
+        """Crea un piano da un iterabile di tuple (lunghezza, tagli, sfrido), una per barra"""
+        conteggi = {}
+        for lunghezza, tagli, sfrido in barre:
+            pattern = PatternTaglio(lunghezza, tagli, sfrido)
+            conteggi[pattern] = conteggi.get(pattern, 0) + 1
+        return cls(conteggi.items())
+
+    def __len__(self):
+        return self._cumulate[-1]
+
+    def __iter__(self):
+        """Itera i pattern barra per barra (i pattern ripetuti non vengono copiati)"""
+        for pattern, copie in self.voci:
+            for _ in range(copie):
+                yield pattern
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, altro):
+        if not isinstance(altro, PianoTaglio):
+            return NotImplemented
+        return self.voci == altro.voci
+
+    def __repr__(self):
+        return f"PianoTaglio({self.num_pattern} pattern, {len(self)} barre)"
+
+    def __reduce__(self):
+        # L'hash dipende dal processo: tra processi si ricostruisce il piano dalle voci
+        return (PianoTaglio, (self.voci,))
+
+    def barra(self, indice):
+        """Restituisce il pattern della barra in posizione indice (0-based)"""
+        if not 0 <= indice < len(self):
+            raise IndexError(indice)
+        return self.voci[bisect.bisect_right(self._cumulate, indice) - 1][0]
+
+    def numero_prima_barra(self, posizione_voce):
+        """Numero (1-based) della prima barra della voce in posizione data"""
+        return self._cumulate[posizione_voce] + 1
+
+    @property
+    def num_barre(self):
+        return len(self)
+
+    @property
+    def num_pattern(self):
+        return len(self.voci)
+
+    @property
+    def sfrido_totale(self):
+        return sum(p.sfrido * c for p, c in self.voci)
+
+    @property
+    def lunghezza_totale(self):
+        return sum(p.lunghezza * c for p, c in self.voci)
+
+    @property
+    def efficienza(self):
+        """Percentuale di materiale utilizzato rispetto alla lunghezza delle barre"""
+        totale = self.lunghezza_totale
+        return (totale - self.sfrido_totale) / totale * 100 if totale > 0 else 0
+
+    @property
+    def profili(self):
+        """Profili presenti nel piano, in ordine (vuoto per i piani a profilo singolo)"""
+        return sorted({p.profilo for p, _ in self.voci if p.profilo})
+
+    def fabbisogno(self, per_profilo=False):
+        """Numero di barre per lunghezza: dict {lunghezza: quantità}
+
+        Con per_profilo=True le chiavi sono tuple (profilo, lunghezza).
+        """
+        conteggio = {}
+        for pattern, copie in self.voci:
+            chiave = (pattern.profilo, pattern.lunghezza) if per_profilo else pattern.lunghezza
+            conteggio[chiave] = conteggio.get(chiave, 0) + copie
+        return conteggio
+
+    def scarti(self):
+        """Lista degli sfridi di tutte le barre in ordine decrescente"""
+        scarti = []
+        for pattern, copie in sorted(self.voci, key=lambda v: v[0].sfrido, reverse=True):
+            scarti.extend([pattern.sfrido] * copie)
+        return scarti
+
+    def unisci(self, altro):
+        """Restituisce un nuovo piano con le barre di entrambi i piani"""
+        return PianoTaglio(self.voci + altro.voci)
+
+
+class ParametriSega:
+    """Tempi della sega usati per stimare il tempo macchina di un piano (in secondi)"""
+
+    def __init__(self, cambio_battuta=15.0, carico_barra=20.0, taglio=8.0, cambio_barra=60.0,
+                 barre_per_fascio=1):
+        """
+        Args:
+            cambio_battuta: Spostamento della battuta su una nuova lunghezza
+            carico_barra: Carico e scarico di una barra
+            taglio: Singolo taglio (di tutto il fascio)
+            cambio_barra: Cambio di lunghezza o profilo delle barre da prelevare
+            barre_per_fascio: Barre identiche tagliate insieme in un fascio (1 = una alla volta)
+        """
+        self.cambio_battuta = cambio_battuta
+        self.carico_barra = carico_barra
+        self.taglio = taglio
+        self.cambio_barra = cambio_barra
+        self.barre_per_fascio = max(1, int(barre_per_fascio))
+
+    def come_dict(self):
+        return {"cambio_battuta": self.cambio_battuta, "carico_barra": self.carico_barra,
+                "taglio": self.taglio, "cambio_barra": self.cambio_barra,
+                "barre_per_fascio": self.barre_per_fascio}
+
+
+class SequenzaTaglio:
+    """Ordine di esecuzione di un piano alla sega
+
+    Ogni passo è una tupla (pattern, copie, ordine): le copie del pattern si
+    tagliano di seguito a fasci di barre_per_fascio barre, il primo fascio
+    nell'ordine indicato e i successivi alternando ordine inverso e diretto,
+    così l'ultima battuta di un fascio è la prima del successivo. Le barre
+    sono numerate seguendo i passi.
+    """
+    __slots__ = ('passi', 'barre_per_fascio', '_cumulate')
+
+    def __init__(self, passi, barre_per_fascio=1):
+        self.passi = tuple(passi)
+        self.barre_per_fascio = barre_per_fascio
+        cumulate = [0]
+        for _, copie, _ in self.passi:
+            cumulate.append(cumulate[-1] + copie)
+        self._cumulate = cumulate
+
+    def __len__(self):
+        return self._cumulate[-1]
+
+    @classmethod
+    def da_piano(cls, piano, barre_per_fascio=1):
+        """Sequenza non ottimizzata: ordine canonico del piano, tagli dal più lungo"""
+        return cls(((pattern, copie, pattern.tagli) for pattern, copie in piano.voci), barre_per_fascio)
+
+    def numero_prima_barra(self, posizione_passo):
+        """Numero (1-based) della prima barra del passo in posizione data"""
+        return self._cumulate[posizione_passo] + 1
+
+    @staticmethod
+    def ordine_copia(ordine, fascio):
+        """Ordine dei tagli del fascio-esimo fascio di un passo (0-based)"""
+        return ordine[::-1] if fascio % 2 else ordine
+
+    def fasci(self, copie):
+        """Numero di fasci in cui si tagliano le copie di un passo"""
+        return -(-copie // self.barre_per_fascio)
+
+    @property
+    def num_tagli(self):
+        """Tagli eseguiti alla sega (un taglio attraversa tutto il fascio)"""
+        return sum(pattern.num_tagli * self.fasci(copie) for pattern, copie, _ in self.passi)
+
+    @property
+    def cambi_battuta(self):
+        """Spostamenti della battuta, compreso il posizionamento iniziale"""
+        cambi = 0
+        battuta = None
+        for _, copie, ordine in self.passi:
+            if not ordine:
+                continue
+            # Dentro ogni fascio si cambia battuta a ogni nuova lunghezza;
+            # tra fasci alternati la battuta resta dove si trova
+            fasci = self.fasci(copie)
+            interni = sum(1 for a, b in zip(ordine, ordine[1:]) if a != b)
+            cambi += interni * fasci + (ordine[0] != battuta)
+            battuta = self.ordine_copia(ordine, fasci - 1)[-1]
+        return cambi
+
+    @property
+    def cambi_barra(self):
+        """Cambi di lunghezza o profilo delle barre da prelevare, compreso il primo"""
+        cambi = 0
+        barra = None
+        for pattern, _, _ in self.passi:
+            if (pattern.profilo, pattern.lunghezza) != barra:
+                barra = (pattern.profilo, pattern.lunghezza)
+                cambi += 1
+        return cambi
+
+    def tempo_macchina(self, parametri=None):
+        """Tempo macchina stimato in secondi"""
+        parametri = parametri or ParametriSega()
+        return (len(self) * parametri.carico_barra + self.num_tagli * parametri.taglio
+                + self.cambi_battuta * parametri.cambio_battuta
+                + self.cambi_barra * parametri.cambio_barra)
+
+
+def formatta_durata(secondi):
+    """Durata leggibile, es. "2h 05m" oppure "12m" """
+    minuti = int(round(secondi / 60))
+    if minuti >= 60:
+        return f"{minuti // 60}h {minuti % 60:02d}m"
+    return f"{minuti}m"
+
+
+def _ordine_tagli(pattern, fasci, battuta, uscite):
+    """Ordine dei tagli di un pattern per la sequenza alla sega
+
+    Le lunghezze uguali restano consecutive; si parte dalla battuta corrente
+    se il pattern la contiene e si termina sulla lunghezza condivisa dal
+    maggior numero di pattern ancora da tagliare (uscite: lunghezza -> conteggio).
+    Con un numero pari di fasci alternati l'ultimo finisce sulla prima
+    lunghezza: è quella da scegliere in base alle uscite.
+    """
+    gruppi = sorted(set(pattern.tagli), reverse=True)
+    condivisa = lambda g: (uscite.get(g, 0), -g)
+    primo = battuta if battuta in gruppi else None
+    if primo is None and fasci % 2 == 0:
+        primo = max(gruppi, key=condivisa)
+    altri = [g for g in gruppi if g != primo]
+    if primo is None and len(altri) > 1:
+        # Senza battuta da riusare conviene partire dalla lunghezza meno condivisa
+        primo = min(altri, key=condivisa)
+        altri.remove(primo)
+    if altri and fasci % 2:
+        ultimo = max(altri, key=condivisa)
+        altri.remove(ultimo)
+        altri.append(ultimo)
+    if primo is not None:
+        altri.insert(0, primo)
+    conteggi = {}
+    for taglio in pattern.tagli:
+        conteggi[taglio] = conteggi.get(taglio, 0) + 1
+    return tuple(g for g in altri for _ in range(conteggi[g]))
+
+
+@_misurato("sequenza")
+def sequenzia_piano(piano, barre_per_fascio=1):
+    """Ordina barre e tagli di un piano per ridurre i cambi di battuta alla sega
+
+    Le barre restano raggruppate per profilo e lunghezza (un cambio di barra
+    costa più di un cambio di battuta); dentro ogni gruppo, euristica nearest
+    neighbour: dopo ogni pattern si sceglie tra quelli rimasti uno che contiene
+    la lunghezza su cui è ferma la battuta. Le copie di un pattern si tagliano
+    di seguito, a fasci di barre_per_fascio barre, alternando l'ordine.
+    Il costo è O(pattern × candidati), trascurabile rispetto all'ottimizzazione.
+
+    Returns:
+        SequenzaTaglio con gli stessi pattern e copie del piano
+    """
+    voci = piano.voci  # ordine canonico: i gruppi (profilo, lunghezza) sono contigui
+    rimasti = set(range(len(voci)))
+    per_taglio = {}  # (profilo, lunghezza barra, lunghezza taglio) -> indici delle voci che la contengono
+    for i, (pattern, _) in enumerate(voci):
+        for taglio in set(pattern.tagli):
+            per_taglio.setdefault((pattern.profilo, pattern.lunghezza, taglio), set()).add(i)
+
+    sequenza = SequenzaTaglio((), barre_per_fascio)
+    passi = []
+    battuta = None
+    prossima = 0  # prima voce in ordine canonico ancora da tagliare
+    while rimasti:
+        while prossima not in rimasti:
+            prossima += 1
+        gruppo = (voci[prossima][0].profilo, voci[prossima][0].lunghezza)
+        candidati = per_taglio.get(gruppo + (battuta,))
+        i = min(candidati) if candidati else prossima
+
+        pattern, copie = voci[i]
+        rimasti.discard(i)
+        distinti = set(pattern.tagli)
+        for taglio in distinti:
+            per_taglio[gruppo + (taglio,)].discard(i)
+
+        uscite = {taglio: len(per_taglio[gruppo + (taglio,)]) for taglio in distinti}
+        fasci = sequenza.fasci(copie)
+        ordine = _ordine_tagli(pattern, fasci, battuta, uscite)
+        passi.append((pattern, copie, ordine))
+        if ordine:
+            battuta = SequenzaTaglio.ordine_copia(ordine, fasci - 1)[-1]
+    return SequenzaTaglio(passi, barre_per_fascio)
+
+
+class Sega:
+    """Sega della linea: velocità relativa ai ParametriSega e preparazione per ogni lotto"""
+
+    def __init__(self, nome, velocita=1.0, setup=0.0):
+        """
+        Args:
+            nome: Nome mostrato nei report
+            velocita: Velocità relativa (2.0 = impiega metà del tempo)
+            setup: Secondi di preparazione per ogni lotto (pattern) assegnato
+        """
+        if velocita <= 0:
+            raise ValueError(f"Velocità non valida per la sega {nome}: {velocita}")
+        self.nome = nome
+        self.velocita = velocita
+        self.setup = setup
+
+
+def leggi_seghe(testo):
+    """Seghe da un testo come "1, 1, 0.8:120" (velocità relativa[:setup in secondi] per sega)
+
+    Raises:
+        ValueError: se il testo non è valido
+    """
+    seghe = []
+    for numero, voce in enumerate((v.strip() for v in testo.split(",") if v.strip()), 1):
+        velocita, _, setup = voce.partition(":")
+        setup = float(setup) if setup else 0.0
+        if setup < 0:
+            raise ValueError(f"Setup negativo per la sega {numero}")
+        seghe.append(Sega(f"Sega {numero}", float(velocita), setup))
+    if not seghe:
+        raise ValueError("Indicare almeno una sega")
+    return seghe
+
+
+class PianificazioneSeghe:
+    """Piano di taglio ripartito su più seghe in parallelo
+
+    Per ogni sega: la sequenza dei lotti assegnati e la timeline
+    (pattern, copie, ordine, inizio_s, fine_s). Il makespan è la fine
+    dell'ultima sega.
+    """
+
+    def __init__(self, seghe, sequenze, timeline):
+        self.seghe = seghe
+        self.sequenze = sequenze
+        self.timeline = timeline
+
+    @property
+    def fine_seghe(self):
+        return [righe[-1][4] if righe else 0.0 for righe in self.timeline]
+
+    @property
+    def makespan(self):
+        return max(self.fine_seghe, default=0.0)
+
+
+def _tempo_lotto(pattern, copie, ordine, barre_per_fascio, parametri):
+    """Tempo base di un lotto alla velocità di riferimento (una battuta iniziale compresa)"""
+    fasci = -(-copie // barre_per_fascio)
+    interni = sum(1 for a, b in zip(ordine, ordine[1:]) if a != b)
+    return (copie * parametri.carico_barra + fasci * pattern.num_tagli * parametri.taglio
+            + (interni * fasci + 1) * parametri.cambio_battuta)
+
+
+# Giri di ribilanciamento sulle sequenze effettive, mosse valutate per giro e
+# candidati provati per ogni scambio nella ricerca locale di pianifica_seghe
+GIRI_SEGHE = 3
+VALUTAZIONI_SEGHE = 200000
+CANDIDATI_SCAMBIO = 16
+
+
+def _timeline_sega(lotti_sega, velocita, setup, fascio, parametri):
+    """Sequenza e timeline effettive dei lotti di una sega (cambi battuta tra lotti e cambi barra)"""
+    sequenza = sequenzia_piano(PianoTaglio((pattern, copie) for _, pattern, copie in lotti_sega), fascio)
+    righe = []
+    tempo = 0.0
+    battuta = barra = None
+    for pattern, copie, ordine in sequenza.passi:
+        durata_passo = _tempo_lotto(pattern, copie, ordine, fascio, parametri)
+        if ordine and ordine[0] == battuta:
+            durata_passo -= parametri.cambio_battuta
+        if (pattern.profilo, pattern.lunghezza) != barra:
+            durata_passo += parametri.cambio_barra
+        inizio = tempo
+        tempo += durata_passo / velocita + setup
+        righe.append((pattern, copie, ordine, inizio, tempo))
+        if ordine:
+            battuta = SequenzaTaglio.ordine_copia(ordine, sequenza.fasci(copie) - 1)[-1]
+        barra = (pattern.profilo, pattern.lunghezza)
+    return sequenza, righe
+
+
+@_misurato("seghe")
+def pianifica_seghe(piano, seghe, parametri=None):
+    """Ripartisce un piano su più seghe minimizzando il makespan
+
+    I lotti sono i passi della sequenza (pattern con le sue copie); quelli più
+    lunghi di metà del makespan ideale vengono divisi per copie. Il carico
+    stimato di una sega somma i lotti (velocità e setup compresi) e un cambio
+    barra per ogni lunghezza di barra diversa, aggiornato in modo incrementale
+    contando i lotti per gruppo. Assegnazione LPT (lotto più lungo alla sega
+    che lo finirebbe prima), poi ricerca locale sulla sega più carica:
+    spostamenti e scambi, con i candidati allo scambio cercati per tempo con
+    una ricerca binaria e al più VALUTAZIONI_SEGHE mosse valutate per giro.
+
+    Ogni sega riceve poi la propria sequenza di taglio (sequenzia_piano), il
+    cui tempo effettivo è più basso della stima (battuta già in posizione tra
+    un lotto e l'altro, lotti dello stesso pattern riuniti): lo scarto per
+    lotto di ogni sega corregge la stima e la ricerca locale riparte, per
+    GIRI_SEGHE giri. Si tiene la ripartizione con il makespan effettivo minore.
+
+    Args:
+        piano: PianoTaglio da ripartire
+        seghe: Lista di Sega
+        parametri: ParametriSega di riferimento (default: valori tipici)
+
+    Returns:
+        PianificazioneSeghe
+    """
+    parametri = parametri or ParametriSega()
+    fascio = parametri.barre_per_fascio
+    velocita = [sega.velocita for sega in seghe]
+    setup = [sega.setup for sega in seghe]
+    num_seghe = len(seghe)
+
+    lotti = []  # (tempo base, pattern, copie)
+    for pattern, copie, ordine in sequenzia_piano(piano, fascio).passi:
+        lotti.append((_tempo_lotto(pattern, copie, ordine, fascio, parametri), pattern, copie, ordine))
+    ideale = sum(l[0] for l in lotti) / sum(velocita) if lotti else 0.0
+
+    # I lotti troppo lunghi impedirebbero di bilanciare: si dividono per copie (a fasci interi)
+    divisi = []
+    for tempo, pattern, copie, ordine in lotti:
+        parti = min(-(-copie // fascio), int(tempo // (ideale / 2)) if ideale > 0 else 1)
+        if parti <= 1:
+            divisi.append((tempo, pattern, copie))
+            continue
+        fasci = -(-copie // fascio)
+        for k in range(parti):
+            copie_parte = min(copie, (fasci * (k + 1) // parti) * fascio) - min(copie, (fasci * k // parti) * fascio)
+            if copie_parte:
+                divisi.append((_tempo_lotto(pattern, copie_parte, ordine, fascio, parametri), pattern, copie_parte))
+    gruppi_lotti = [(pattern.profilo, pattern.lunghezza) for _, pattern, _ in divisi]
+
+    # Stato di ogni sega: lotti (tempo base, indice) ordinati, lotti per gruppo di barra, carico stimato
+    assegnati = [[] for _ in seghe]
+    gruppi = [{} for _ in seghe]
+    carichi = [0.0] * num_seghe
+    # Risparmio medio per lotto (secondi alla velocità di riferimento) misurato sulle sequenze effettive
+    sconto = [0.0] * num_seghe
+
+    def durata(k, m):
+        return (divisi[k][0] - sconto[m]) / velocita[m] + setup[m]
+
+    def carico_con(m, togli=None, metti=None):
+        """Carico stimato della sega m togliendo e/o aggiungendo un lotto"""
+        carico = carichi[m]
+        if togli is not None:
+            carico -= durata(togli, m)
+        if metti is not None:
+            carico += durata(metti, m)
+        gruppo_tolto = gruppi_lotti[togli] if togli is not None else None
+        gruppo_messo = gruppi_lotti[metti] if metti is not None else None
+        if gruppo_tolto != gruppo_messo:
+            if gruppo_tolto is not None and gruppi[m][gruppo_tolto] == 1:
+                carico -= parametri.cambio_barra / velocita[m]
+            if gruppo_messo is not None and not gruppi[m].get(gruppo_messo):
+                carico += parametri.cambio_barra / velocita[m]
+        return carico
+
+    def aggiungi(k, m):
+        carichi[m] = carico_con(m, metti=k)
+        gruppi[m][gruppi_lotti[k]] = gruppi[m].get(gruppi_lotti[k], 0) + 1
+        bisect.insort(assegnati[m], (divisi[k][0], k))
+
+    def togli(k, m):
+        carichi[m] = carico_con(m, togli=k)
+        gruppi[m][gruppi_lotti[k]] -= 1
+        if not gruppi[m][gruppi_lotti[k]]:
+            del gruppi[m][gruppi_lotti[k]]
+        del assegnati[m][bisect.bisect_left(assegnati[m], (divisi[k][0], k))]
+
+    def ricerca_locale():
+        """Primo miglioramento sulla sega critica, fino a convergenza o al limite di valutazioni"""
+        valutazioni = 0
+        while valutazioni < VALUTAZIONI_SEGHE:
+            critica = max(range(num_seghe), key=lambda m: carichi[m])
+            soglia = carichi[critica] - 1e-9
+            mossa = None
+            for tempo, k in reversed(assegnati[critica]):
+                for altra in range(num_seghe):
+                    if altra == critica:
+                        continue
+                    valutazioni += 1
+                    if max(carico_con(critica, togli=k), carico_con(altra, metti=k)) < soglia:
+                        mossa = (k, None, altra)
+                        break
+                    # Scambio con un lotto più corto: migliora solo se il suo tempo base sta
+                    # nell'intervallo (tempo - divario * velocità, tempo), allargato di un cambio barra
+                    divario = (carichi[critica] - carichi[altra]) * velocita[altra]
+                    lista = assegnati[altra]
+                    inizio = bisect.bisect_right(lista, (tempo - divario - parametri.cambio_barra, len(divisi)))
+                    fine = bisect.bisect_left(lista, (tempo + parametri.cambio_barra, -1), inizio)
+                    for _, j in lista[inizio:min(fine, inizio + CANDIDATI_SCAMBIO)]:
+                        valutazioni += 1
+                        if max(carico_con(critica, k, j), carico_con(altra, j, k)) < soglia:
+                            mossa = (k, j, altra)
+                            break
+                    if mossa:
+                        break
+                if mossa or valutazioni >= VALUTAZIONI_SEGHE:
+                    break
+            if mossa is None:
+                return
+            k, j, altra = mossa
+            togli(k, critica)
+            if j is not None:
+                togli(j, altra)
+                aggiungi(j, critica)
+            aggiungi(k, altra)
+
+    # LPT su macchine con velocità diverse
+    for k in sorted(range(len(divisi)), key=lambda k: divisi[k][0], reverse=True):
+        aggiungi(k, min(range(num_seghe), key=lambda m: (carico_con(m, metti=k), m)))
+
+    migliore = None  # (makespan, sequenze, timeline)
+    for giro in range(GIRI_SEGHE if num_seghe > 1 else 1):
+        if giro:
+            # Stima corretta con lo sconto misurato: carichi ricalcolati da zero
+            for m in range(num_seghe):
+                carichi[m] = (sum(durata(k, m) for _, k in assegnati[m])
+                              + len(gruppi[m]) * parametri.cambio_barra / velocita[m])
+        if num_seghe > 1:
+            ricerca_locale()
+
+        # Sequenza e timeline effettive di ogni sega
+        sequenze, timeline = [], []
+        for m in range(num_seghe):
+            sequenza, righe = _timeline_sega([divisi[k] for _, k in assegnati[m]], velocita[m], setup[m],
+                                             fascio, parametri)
+            sequenze.append(sequenza)
+            timeline.append(righe)
+            if righe:
+                # Scarto tra la stima senza sconto e il tempo effettivo, per lotto
+                stima = carichi[m] + sconto[m] * len(assegnati[m]) / velocita[m]
+                sconto[m] = (stima - righe[-1][4]) * velocita[m] / len(assegnati[m])
+        makespan = max((righe[-1][4] for righe in timeline if righe), default=0.0)
+        if migliore is None or makespan < migliore[0]:
+            migliore = (makespan, sequenze, timeline)
+    return PianificazioneSeghe(list(seghe), migliore[1], migliore[2])
+
+
+class _DomandaPezzi:
+    """Pezzi richiesti raggruppati per lunghezza (classi) in ordine decrescente
+
+    Sostituisce la lista espansa di tutti i pezzi: le quantità residue stanno in
+    un array('i') e le classi esaurite vengono saltate con una struttura
+    union-find, così cercare il prossimo pezzo o riempire una barra non
+    richiede di scorrere i pezzi già assegnati.
+    """
+    __slots__ = ('lunghezze', 'residui', 'rimanenti', '_negative', '_successiva', '_ultima')
+
+    def __init__(self, pezzi_richiesti=()):
+        conteggi = {}
+        for qty, lunghezza in pezzi_richiesti:
+            conteggi[lunghezza] = conteggi.get(lunghezza, 0) + qty
+        lunghezze = tuple(sorted((l for l, q in conteggi.items() if q > 0), reverse=True))
+        self._inizializza(lunghezze, array('i', (conteggi[l] for l in lunghezze)))
+
+    def _inizializza(self, lunghezze, residui):
+        self.lunghezze = lunghezze
+        self.residui = residui
+        self.rimanenti = sum(residui)
+        # Lunghezze negate (crescenti) per trovare con bisect la prima classe che entra in uno spazio
+        self._negative = tuple(-l for l in lunghezze)
+        # _successiva[i] punta verso la prima classe non esaurita con indice >= i
+        self._successiva = array('i', (i if q else i + 1 for i, q in enumerate(residui)))
+        self._successiva.append(len(lunghezze))
+        self._ultima = len(lunghezze) - 1
+
+    def copia(self):
+        """Restituisce una copia indipendente delle quantità residue"""
+        nuova = _DomandaPezzi.__new__(_DomandaPezzi)
+        nuova._inizializza(self.lunghezze, array('i', self.residui))
+        return nuova
+
+    def successiva(self, indice):
+        """Indice della prima classe non esaurita a partire da indice (len se nessuna)"""
+        successiva = self._successiva
+        radice = indice
+        while successiva[radice] != radice:
+            radice = successiva[radice]
+        # Compressione del cammino
+        while successiva[indice] != radice:
+            successiva[indice], indice = radice, successiva[indice]
+        return radice
+
+    def primo(self):
+        """Classe del pezzo più lungo ancora da assegnare"""
+        return self.successiva(0)
+
+    def minimo(self):
+        """Lunghezza del pezzo più corto ancora da assegnare (inf se finiti)"""
+        while self._ultima >= 0 and self.residui[self._ultima] == 0:
+            self._ultima -= 1
+        return self.lunghezze[self._ultima] if self._ultima >= 0 else float('inf')
+
+    def preleva(self, classe, quantita=1):
+        self.residui[classe] -= quantita
+        self.rimanenti -= quantita
+        if self.residui[classe] == 0:
+            self._successiva[classe] = classe + 1
+
+    def applica(self, prelievi):
+        """Preleva una lista di (classe, quantità) restituita da riempi"""
+        for classe, quantita in prelievi:
+            self.preleva(classe, quantita)
+
+    def riempi(self, spazio, spessore_lama, massimo=-1):
+        """Simula il riempimento first-fit decrescente di uno spazio libero
+
+        Non modifica le quantità residue: il risultato va confermato con applica.
+
+        Args:
+            spazio: Spazio disponibile nella barra
+            spessore_lama: Spessore della lama in mm
+            massimo: Numero massimo di pezzi da inserire (-1 = nessun limite)
+
+        Returns:
+            Tupla (prelievi, spazio_rimanente) con prelievi lista di (classe, quantità)
+        """
+        _conta(simulazioni_riempimento=1)
+        prelievi = []
+        aggiunti = 0
+        lunghezze = self.lunghezze
+        residui = self.residui
+        negative = self._negative
+        n = len(lunghezze)
+
+        classe = self.successiva(bisect.bisect_left(negative, -spazio))
+        while classe < n and aggiunti != massimo:
+            pezzo = lunghezze[classe]
+            disponibili = residui[classe]
+            presi = 0
+            while presi < disponibili and pezzo <= spazio and aggiunti != massimo:
+                spazio -= pezzo + spessore_lama
+                presi += 1
+                aggiunti += 1
+            if presi:
+                prelievi.append((classe, presi))
+            # Salta le classi che non entrano più nello spazio rimasto
+            classe = self.successiva(max(classe + 1, bisect.bisect_left(negative, -spazio)))
+
+        return prelievi, spazio
+
+
+class _Barra:
+    """Barra in costruzione: i tagli stanno nei buffer condivisi di _CostruttorePiano"""
+    __slots__ = ('lunghezza', 'spazio_rimanente', 'primo', 'ultimo')
+
+    def __init__(self, lunghezza, spazio_rimanente):
+        self.lunghezza = lunghezza
+        self.spazio_rimanente = spazio_rimanente
+        self.primo = -1
+        self.ultimo = -1
+
+
+class _BarreAperte:
+    """Barre aperte ordinate per spazio rimanente, divise in blocchi ordinati
+
+    Sostituisce la lista ordinata con bisect.insort, che sposta in memoria
+    tutte le barre successive ad ogni inserimento o estrazione (O(n) per
+    pezzo). Gli elementi stanno in blocchi di al più 2 * CARICO elementi e un
+    albero di Fenwick sulle dimensioni dei blocchi traduce le posizioni
+    globali: ricerca, inserimento ed estrazione costano O(log n) più lo
+    spostamento dentro un solo blocco di dimensione limitata.
+    Gli elementi sono tuple che iniziano con lo spazio rimanente.
+    """
+    __slots__ = ('_blocchi', '_massimi', '_albero', '_n')
+
+    CARICO = 256
+
+    def __init__(self):
+        self._blocchi = []
+        self._massimi = []
+        self._albero = [0]
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    def _ricostruisci(self):
+        """Ricalcola massimi e albero di Fenwick dopo che i blocchi sono cambiati"""
+        self._massimi = [blocco[-1] for blocco in self._blocchi]
+        albero = [0] * (len(self._blocchi) + 1)
+        for i, blocco in enumerate(self._blocchi, 1):
+            albero[i] += len(blocco)
+            padre = i + (i & -i)
+            if padre < len(albero):
+                albero[padre] += albero[i]
+        self._albero = albero
+
+    def _varia(self, indice_blocco, delta):
+        albero = self._albero
+        i = indice_blocco + 1
+        while i < len(albero):
+            albero[i] += delta
+            i += i & -i
+
+    def posizione(self, chiave):
+        """Posizione globale del primo elemento >= chiave (len se non ce ne sono)"""
+        b = bisect.bisect_left(self._massimi, chiave)
+        if b == len(self._blocchi):
+            return self._n
+        blocco = self._blocchi[b]
+        precedenti = 0
+        albero = self._albero
+        while b:
+            precedenti += albero[b]
+            b -= b & -b
+        return precedenti + bisect.bisect_left(blocco, chiave)
+
+    def aggiungi(self, elemento):
+        """Inserisce un elemento mantenendo l'ordine"""
+        self._n += 1
+        if not self._blocchi:
+            self._blocchi.append([elemento])
+            self._ricostruisci()
+            return
+        b = bisect.bisect_left(self._massimi, elemento)
+        if b == len(self._blocchi):
+            b -= 1
+        blocco = self._blocchi[b]
+        bisect.insort(blocco, elemento)
+        self._massimi[b] = blocco[-1]
+        if len(blocco) > 2 * self.CARICO:
+            self._blocchi[b:b + 1] = [blocco[:self.CARICO], blocco[self.CARICO:]]
+            self._ricostruisci()
+        else:
+            self._varia(b, 1)
+
+    def estrai(self, posizione):
+        """Toglie e restituisce l'elemento nella posizione globale indicata"""
+        albero = self._albero
+        b = 0
+        if len(albero) > 2:
+            passo = 1 << (len(albero) - 1).bit_length()
+            while passo:
+                if b + passo < len(albero) and albero[b + passo] <= posizione:
+                    b += passo
+                    posizione -= albero[b]
+                passo >>= 1
+        blocco = self._blocchi[b]
+        elemento = blocco.pop(posizione)
+        self._n -= 1
+        if blocco:
+            self._massimi[b] = blocco[-1]
+            self._varia(b, -1)
+        else:
+            del self._blocchi[b]
+            self._ricostruisci()
+        return elemento
+
+    def pota(self, chiave):
+        """Toglie tutti gli elementi < chiave (le barre in cui non entra più nessun pezzo)"""
+        blocchi = self._blocchi
+        if not blocchi or blocchi[0][0] >= chiave:
+            return
+        b = bisect.bisect_left(self._massimi, chiave)
+        self._n -= sum(len(blocco) for blocco in blocchi[:b])
+        del blocchi[:b]
+        if blocchi:
+            k = bisect.bisect_left(blocchi[0], chiave)
+            del blocchi[0][:k]
+            self._n -= k
+        self._ricostruisci()
+
+
+class _CostruttorePiano:
+    """Piano di taglio in costruzione con memorizzazione compatta dei tagli
+
+    I tagli di tutte le barre sono registrati run-length (classe di lunghezza,
+    quantità) in array('i') condivisi e concatenati per barra tramite l'indice
+    del run successivo. Alla fine le barre identiche vengono fuse in un PianoTaglio.
+    """
+    __slots__ = ('lunghezze', 'barre', 'classi', 'quantita', 'successivo')
+
+    def __init__(self, lunghezze):
+        """
+        Args:
+            lunghezze: Lunghezze delle classi di pezzi (indicizzate dai tagli)
+        """
+        self.lunghezze = lunghezze
+        self.barre = []
+        self.classi = array('i')
+        self.quantita = array('i')
+        self.successivo = array('i')
+
+    def apri_barra(self, lunghezza, spazio_rimanente, prelievi):
+        """Crea una nuova barra con i tagli indicati come lista di (classe, quantità)"""
+        barra = _Barra(lunghezza, spazio_rimanente)
+        for classe, quantita in prelievi:
+            self.aggiungi_tagli(barra, classe, quantita)
+        self.barre.append(barra)
+        return barra
+
+    def aggiungi_tagli(self, barra, classe, quantita=1):
+        """Aggiunge tagli di una classe alla barra (non aggiorna lo spazio rimanente)"""
+        ultimo = barra.ultimo
+        if ultimo >= 0 and self.classi[ultimo] == classe:
+            self.quantita[ultimo] += quantita
+            return
+
+        posizione = len(self.classi)
+        self.classi.append(classe)
+        self.quantita.append(quantita)
+        self.successivo.append(-1)
+        if ultimo >= 0:
+            self.successivo[ultimo] = posizione
+        else:
+            barra.primo = posizione
+        barra.ultimo = posizione
+
+    def piano(self):
+        """Converte le barre costruite in un PianoTaglio (sfrido = spazio rimanente)"""
+        _conta(barre_aperte=len(self.barre))
+        conteggi = {}
+        classi, quantita, successivo = self.classi, self.quantita, self.successivo
+        for barra in self.barre:
+            run = []
+            posizione = barra.primo
+            while posizione >= 0:
+                run.append((classi[posizione], quantita[posizione]))
+                posizione = successivo[posizione]
+            chiave = (barra.lunghezza, tuple(run), barra.spazio_rimanente)
+            conteggi[chiave] = conteggi.get(chiave, 0) + 1
+
+        voci = []
+        for (lunghezza, run, spazio), copie in conteggi.items():
+            tagli = []
+            for classe, q in run:
+                tagli.extend([self.lunghezze[classe]] * q)
+            voci.append((PatternTaglio(lunghezza, tagli, spazio), copie))
+        return PianoTaglio(voci)
+
+
+def limite_inferiore_barre(pezzi_richiesti, lunghezza_barra, spessore_lama):
+    """Numero minimo teorico di barre per tagliare tutti i pezzi
+
+    Ogni pezzo occupa la sua lunghezza più un taglio di lama, e una barra da L
+    contiene pezzi per L + spessore_lama (l'ultimo taglio non serve). Il limite
+    è quindi ceil(Σ(p + λ) / (L + λ)), calcolato sulla barra più lunga usabile.
+
+    Args:
+        pezzi_richiesti: Lista di tuple (quantità, lunghezza)
+        lunghezza_barra: Lunghezza della barra (la più lunga del catalogo)
+        spessore_lama: Spessore della lama in mm
+
+    Returns:
+        Numero intero di barre; 0 se non ci sono pezzi
+    """
+    totale = sum(qty * (lunghezza + spessore_lama) for qty, lunghezza in pezzi_richiesti)
+    capacita = lunghezza_barra + spessore_lama
+    barre = int(totale // capacita)
+    # Tolleranza sugli arrotondamenti dei float
+    if totale - barre * capacita > 1e-6:
+        barre += 1
+    return barre
+
+
+def _limite_cardinalita(pezzi_richiesti, lunghezza_barra, spessore_lama):
+    """Limite inferiore sul numero di pezzi per barra
+
+    I pezzi lunghi almeno p occupano almeno p + λ ciascuno, quindi una barra
+    ne contiene al più floor(C / (p + λ)) (C = L + λ): servono almeno
+    ceil(n_p / floor(C / (p + λ))) barre, dove n_p è il numero di quei pezzi.
+    Vale il massimo su tutte le lunghezze dei pezzi; più forte del limite del
+    materiale quando i pezzi non riempiono bene la barra (es. tre pezzi da un
+    terzo di barra che non entrano per la lama).
+    """
+    capacita = lunghezza_barra + spessore_lama
+    limite = contati = 0
+    for lunghezza in sorted({l for q, l in pezzi_richiesti if q > 0}, reverse=True):
+        contati += sum(q for q, l in pezzi_richiesti if l == lunghezza and q > 0)
+        per_barra = int(capacita // (lunghezza + spessore_lama))
+        if per_barra:
+            limite = max(limite, -(-contati // per_barra))
+    return limite
+
+
+def stima_fabbisogno(pezzi_richiesti, lunghezze_catalogo, spessore_lama, costi_barre=None):
+    """Stima immediata delle barre necessarie per ogni lunghezza di catalogo, senza piano
+
+    Per ogni lunghezza L (capacità C = L + λ, ogni pezzo occupa p + λ):
+    - minimo: il maggiore tra il limite del materiale ceil(Σ(p + λ) / C) e il
+      numero di pezzi oltre C / 2, che non possono stare due in una barra;
+    - massimo: barre piene di pezzi tutti uguali (floor(C / (p + λ)) per barra),
+      con i pezzi più corti nello spazio che avanza in quelle delle altre
+      lunghezze, più le barre per i pezzi rimasti: al più una per lunghezza di
+      pezzo e al più floor(2R / C) + 1 con First Fit (R = ingombro dei rimasti).
+    Il massimo è il numero di barre di un piano realizzabile, quindi un vero
+    limite superiore. Le righe si raggruppano per lunghezza una volta sola;
+    l'ingombro e i pezzi oltre metà barra (somme suffisse e ricerca binaria)
+    non dipendono dalla barra. Le lunghezze richieste una sola volta (tipiche
+    con lunghezze decimali) si contano in blocco con somme prefisse e ricerche
+    binarie; il massimo scorre solo le D lunghezze con più pezzi per ogni
+    lunghezza di catalogo: O(righe + D log D + K·D) con K lunghezze di
+    catalogo, indipendente dalle quantità.
+
+    Args:
+        pezzi_richiesti: Lista di tuple (quantità, lunghezza)
+        lunghezze_catalogo: Lunghezze delle barre da stimare
+        spessore_lama: Spessore della lama in mm
+        costi_barre: Dict opzionale {lunghezza: costo} per l'intervallo di costo
+
+    Returns:
+        Lista di dict, uno per lunghezza crescente, con chiavi lunghezza,
+        barre_min, barre_max, costo_min, costo_max (barre None se un pezzo è
+        più lungo della barra, costi None senza prezzo)
+    """
+    classi = {}
+    for quantita, lunghezza in pezzi_richiesti:
+        if quantita > 0:
+            classi[lunghezza] = classi.get(lunghezza, 0) + quantita
+    costi_barre = costi_barre or {}
+
+    # Ingombri crescenti (p + λ) con le quantità; il più corto riempie lo spazio delle barre piene
+    lunghezze = sorted(classi)
+    ingombri = [l + spessore_lama for l in lunghezze]
+    quantita_classi = [classi[l] for l in lunghezze]
+    ingombro = sum(q * pezzo for q, pezzo in zip(quantita_classi, ingombri))
+    # Pezzi con ingombro >= ingombri[i]: i "grandi" di una barra sono un suffisso
+    suffisse = list(itertools.accumulate(reversed(quantita_classi)))[::-1] + [0]
+    # Lunghezze con un solo pezzo (escluso il più corto), crescenti, e le altre
+    singoli = [pezzo for pezzo, q in zip(ingombri[1:], quantita_classi[1:]) if q == 1]
+    somme_singoli = [0] + list(itertools.accumulate(singoli))
+    multipli = [(pezzo, q) for pezzo, q in zip(ingombri[1:], quantita_classi[1:]) if q > 1]
+
+    stime = []
+    for lunghezza_barra in sorted(set(lunghezze_catalogo)):
+        capacita = lunghezza_barra + spessore_lama
+        stima = {'lunghezza': lunghezza_barra, 'barre_min': None, 'barre_max': None,
+                 'costo_min': None, 'costo_max': None}
+        stime.append(stima)
+        if lunghezze and lunghezze[-1] > lunghezza_barra:
+            continue
+
+        piene = posti_corti = classi_avanzate = 0
+        avanzi = 0.0
+        if lunghezze:
+            pezzo_corto = ingombri[0]
+            # Un pezzo singolo fino a metà barra avanza; oltre riempie una barra da solo
+            # e accanto entrano floor((C - p) / pezzo_corto) pezzi corti, non crescente in p
+            meta = bisect.bisect_right(singoli, capacita / 2)
+            classi_avanzate += meta
+            avanzi += somme_singoli[meta]
+            piene += len(singoli) - meta
+            accanto = lambda pezzo: -((capacita - pezzo) // pezzo_corto)
+            posti, fine = 1, len(singoli)
+            while fine > meta:
+                # Singoli con almeno "posti" pezzi corti accanto: un prefisso di quelli grandi
+                fine = bisect.bisect_right(singoli, -posti, meta, fine, key=accanto)
+                posti_corti += fine - meta
+                posti += 1
+            for pezzo, quantita in multipli:
+                per_barra = int(capacita // pezzo)
+                barre_piene, resto = divmod(quantita, per_barra)
+                if barre_piene:
+                    piene += barre_piene
+                    posti_corti += barre_piene * int((capacita - per_barra * pezzo) // pezzo_corto)
+                if resto:
+                    classi_avanzate += 1
+                    avanzi += resto * pezzo
+            per_barra = int(capacita // pezzo_corto)
+            barre_piene, resto = divmod(max(0, quantita_classi[0] - posti_corti), per_barra)
+            piene += barre_piene
+            if resto:
+                classi_avanzate += 1
+                avanzi += resto * pezzo_corto
+
+        minimo = int(ingombro // capacita)
+        # Tolleranza sugli arrotondamenti dei float, come in limite_inferiore_barre
+        if ingombro - minimo * capacita > 1e-6:
+            minimo += 1
+        minimo = max(minimo, suffisse[bisect.bisect_right(ingombri, capacita / 2)])
+        massimo = piene + min(classi_avanzate, int(2 * avanzi // capacita) + 1 if avanzi else 0)
+
+        stima['barre_min'], stima['barre_max'] = minimo, max(minimo, massimo)
+        costo = costi_barre.get(lunghezza_barra)
+        if costo is not None:
+            stima['costo_min'], stima['costo_max'] = costo * minimo, costo * stima['barre_max']
+    return stime
+
+
+# Nodi massimi esplorati per riempire una barra nella riduzione dei pattern
+NODI_RIEMPIMENTO = 400
+
+# Sfrido accettato (frazione della barra) per un pattern ripetuto, allentato per passi.
+# Ogni sequenza produce un piano candidato: partire più larghi dà meno pattern e più sfrido
+TOLLERANZE_SFRIDO_PATTERN = (
+    (0.005, 0.01, 0.03, 0.06, 0.12, 1.0),
+    (0.02, 0.05, 0.1, 1.0),
+    (0.05, 0.1, 0.2, 1.0),
+    (0.1, 0.2, 1.0),
+)
+
+
+def costo_con_setup(piano, peso_pattern):
+    """Obiettivo della riduzione pattern: materiale più un costo fisso per pattern
+
+    Il peso è espresso in barre: peso_pattern=0.5 significa che regolare la
+    sega per un nuovo pattern costa quanto mezza barra (la più lunga del piano).
+    """
+    if not piano.voci:
+        return 0
+    lunghezza_max = max(pattern.lunghezza for pattern, _ in piano.voci)
+    return piano.lunghezza_totale + peso_pattern * piano.num_pattern * lunghezza_max
+
+
+def _riempimento_limitato(lunghezze, limiti, spazio, spessore_lama, nodi=NODI_RIEMPIMENTO):
+    """Riempie una barra con al più limiti[i] pezzi di lunghezza lunghezze[i]
+
+    Branch and bound in profondità (classi in ordine decrescente, prima il
+    numero di pezzi più alto) con limite sui nodi; esaurito il limite si
+    completa first-fit decrescente.
+
+    Returns:
+        Tupla (conteggi, spazio_rimanente) del riempimento con meno sfrido
+    """
+    n = len(lunghezze)
+    # Lunghezza massima ancora inseribile dalla classe i in poi (per il bound)
+    residuo_max = [0.0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        residuo_max[i] = residuo_max[i + 1] + limiti[i] * (lunghezze[i] + spessore_lama)
+    minima = min(lunghezze) if lunghezze else float('inf')
+
+    conteggi = [0] * n
+    migliore = [spazio, tuple(conteggi)]
+    budget = [nodi]
+
+    def completa(i, spazio):
+        presi = list(conteggi)
+        for j in range(i, n):
+            k = min(limiti[j], int((spazio + spessore_lama) // (lunghezze[j] + spessore_lama)))
+            presi[j] = k
+            spazio -= k * (lunghezze[j] + spessore_lama)
+        if spazio < migliore[0]:
+            migliore[0], migliore[1] = spazio, tuple(presi)
+
+    def visita(i, spazio):
+        if spazio < migliore[0]:
+            migliore[0], migliore[1] = spazio, tuple(conteggi)
+        if i == n or spazio < minima or spazio - residuo_max[i] >= migliore[0]:
+            return
+        if budget[0] <= 0:
+            completa(i, spazio)
+            return
+        budget[0] -= 1
+        passo = lunghezze[i] + spessore_lama
+        for k in range(min(limiti[i], int((spazio + spessore_lama) // passo)), -1, -1):
+            conteggi[i] = k
+            visita(i + 1, spazio - k * passo)
+            if migliore[0] < minima:
+                break  # nessun pezzo entra più nello sfrido: non si può fare meglio
+        conteggi[i] = 0
+
+    visita(0, spazio)
+    return migliore[1], migliore[0]
+
+
+def _piano_pochi_pattern(pezzi, spessore_lama, barre, tolleranze):
+    """Procedura sequenziale (Haessler) che privilegia pattern ripetuti molte volte
+
+    A ogni passo si cerca, per frequenze f decrescenti, un pattern che usi al
+    massimo residuo // f pezzi di ogni lunghezza con sfrido entro la
+    tolleranza; il pattern viene poi ripetuto finché la domanda lo consente.
+    Se nessuna frequenza dà un pattern abbastanza pulito la tolleranza viene
+    allentata (l'ultima accetta qualunque sfrido).
+
+    Args:
+        pezzi: Dict {lunghezza: quantità} dei pezzi da tagliare
+        spessore_lama: Spessore della lama in mm
+        barre: Dict {lunghezza barra: quantità disponibile} (None = illimitate)
+        tolleranze: Sfridi relativi accettati, dal più stretto; l'ultimo deve essere 1.0
+
+    Returns:
+        PianoTaglio oppure None se le barre non bastano
+    """
+    lunghezze = sorted(pezzi, reverse=True)
+    residui = [pezzi[l] for l in lunghezze]
+    barre = dict(barre)
+    voci = []
+
+    while any(residui):
+        frequenze = []
+        f = max(residui)
+        while f >= 1:
+            frequenze.append(f)
+            f = min(f - 1, int(f * 0.7))
+        riempimenti = {}  # frequenza -> (sfrido relativo, lunghezza barra, conteggi, spazio)
+
+        scelta = None
+        for tolleranza in tolleranze:
+            for f in frequenze:
+                if f not in riempimenti:
+                    limiti = [r // f for r in residui]
+                    attive = [i for i, q in enumerate(limiti) if q]
+                    riempimenti[f] = None
+                    for lunghezza_barra, disponibili in barre.items():
+                        if disponibili is not None and disponibili <= 0:
+                            continue
+                        conteggi, spazio = _riempimento_limitato(
+                            [lunghezze[i] for i in attive], [limiti[i] for i in attive],
+                            lunghezza_barra, spessore_lama)
+                        if not any(conteggi):
+                            continue
+                        candidato = (spazio / lunghezza_barra, lunghezza_barra,
+                                     dict(zip(attive, conteggi)), spazio)
+                        if riempimenti[f] is None or candidato[:2] < riempimenti[f][:2]:
+                            riempimenti[f] = candidato
+                if riempimenti[f] is not None and riempimenti[f][0] <= tolleranza:
+                    scelta = riempimenti[f]
+                    break
+            if scelta is not None:
+                break
+        if scelta is None:
+            return None
+
+        _, lunghezza_barra, conteggi, spazio = scelta
+        copie = min(residui[i] // q for i, q in conteggi.items() if q)
+        if barre[lunghezza_barra] is not None:
+            copie = min(copie, barre[lunghezza_barra])
+            barre[lunghezza_barra] -= copie
+        for i, q in conteggi.items():
+            residui[i] -= q * copie
+        tagli = [lunghezze[i] for i, q in conteggi.items() for _ in range(q)]
+        voci.append((PatternTaglio(lunghezza_barra, tagli, spazio), copie))
+
+    return PianoTaglio(voci)
+
+
+@_misurato("riduzione_pattern")
+def riduci_pattern(piano, spessore_lama, peso_pattern, barre_disponibili=None):
+    """Riduce il numero di pattern distinti accettando un po' più di sfrido
+
+    Ogni pattern diverso richiede di riposizionare le battute della sega
+    (cutting stock con costi di setup). Il piano viene ricostruito con la
+    procedura sequenziale di _piano_pochi_pattern, sulle stesse lunghezze di
+    barra e con tolleranze di sfrido via via più larghe; si tiene il piano
+    migliore secondo costo_con_setup, quindi il peso decide quanto sfrido
+    scambiare per pattern in meno.
+
+    Args:
+        piano: PianoTaglio da ridurre (a profilo singolo)
+        spessore_lama: Spessore della lama in mm
+        peso_pattern: Costo di un pattern in barre (0 = nessuna riduzione)
+        barre_disponibili: Lista opzionale di (quantità, lunghezza) da rispettare;
+            senza, le lunghezze del piano sono considerate illimitate
+
+    Returns:
+        Il piano ridotto, oppure il piano originale se non conviene
+    """
+    if peso_pattern <= 0 or piano.num_pattern <= 1 or piano.profili:
+        return piano
+
+    pezzi = {}
+    for pattern, copie in piano.voci:
+        for taglio in pattern.tagli:
+            pezzi[taglio] = pezzi.get(taglio, 0) + copie
+
+    if barre_disponibili is None:
+        barre = {lunghezza: None for lunghezza in piano.fabbisogno()}
+    else:
+        barre = {}
+        for qty, lunghezza in barre_disponibili:
+            barre[lunghezza] = barre.get(lunghezza, 0) + qty
+
+    migliore, costo_migliore = piano, costo_con_setup(piano, peso_pattern)
+    for tolleranze in TOLLERANZE_SFRIDO_PATTERN:
+        ridotto = _piano_pochi_pattern(pezzi, spessore_lama, barre, tolleranze)
+        if ridotto is not None and costo_con_setup(ridotto, peso_pattern) < costo_migliore:
+            migliore, costo_migliore = ridotto, costo_con_setup(ridotto, peso_pattern)
+    return migliore
+
+
+def semplifica_istanza(pezzi_richiesti, barre_disponibili, spessore_lama):
+    """Pre-elaborazione: fissa le barre obbligate e riduce l'istanza prima della ricerca
+
+    Regole, applicate alle quantità per lunghezza (mai pezzo per pezzo):
+    - con una sola lunghezza di barra, due pezzi che la riempiono esattamente
+      (p1 + λ + p2 = L) vengono tagliati insieme;
+    - dominanza (Martello-Toth): se accanto al pezzo j non entrano due pezzi, nella sua barra
+      ci sarà al più un altro pezzo e conviene il più lungo che entra, k. Con una sola
+      lunghezza di barra si fissa la coppia (j, k); con più lunghezze solo il caso in cui
+      non entra nessun pezzo (compresi i pezzi lunghi come la barra più lunga), e j va da
+      solo nella barra più corta che lo contiene.
+    Con barre tutte uguali le regole sono esatte (scambiando i pezzi non si perde mai una
+    barra); con più lunghezze un pezzo, anche lungo esattamente come una barra corta, può
+    stare meglio in una barra più lunga insieme ad altri, e togliere le coppie lascia alle
+    euristiche pezzi residui più difficili da combinare, quindi lì si fissano solo i pezzi
+    da soli. Ogni barra fissata consuma le barre disponibili di quella lunghezza.
+
+    Args:
+        pezzi_richiesti: Lista di tuple (quantità, lunghezza)
+        barre_disponibili: Lista di tuple (quantità, lunghezza); per un catalogo senza
+            limiti una quantità pari al numero di pezzi
+        spessore_lama: Spessore della lama in mm
+
+    Returns:
+        Tupla (piano_fissato, pezzi_residui, barre_residue): il PianoTaglio delle barre
+        fissate, da unire con PianoTaglio.unisci al piano dei pezzi residui, e le liste
+        (quantità, lunghezza) residue
+    """
+    residui = {}
+    for qty, lunghezza in pezzi_richiesti:
+        if qty > 0:
+            residui[lunghezza] = residui.get(lunghezza, 0) + qty
+    scorta = {}
+    for qty, lunghezza in barre_disponibili:
+        if qty > 0:
+            scorta[lunghezza] = scorta.get(lunghezza, 0) + qty
+    lunghezze_barre = sorted(scorta)
+    # Classi indicizzate per lunghezza arrotondata: le coppie esatte si cercano in O(1)
+    per_chiave = {round(l, 6): l for l in residui}
+    fissate = {}  # (lunghezza barra, tagli) -> copie
+
+    def fissa(lunghezza_barra, tagli, copie):
+        for taglio in tagli:
+            residui[taglio] -= copie
+        scorta[lunghezza_barra] -= copie
+        chiave = (lunghezza_barra, tagli)
+        fissate[chiave] = fissate.get(chiave, 0) + copie
+
+    # Coppie che riempiono esattamente una barra
+    barra_unica = len(lunghezze_barre) == 1
+    for lunghezza_barra in (lunghezze_barre if barra_unica else ()):
+        for pezzo in sorted(residui, reverse=True):
+            compagno = per_chiave.get(round(lunghezza_barra - spessore_lama - pezzo, 6))
+            if compagno is None or compagno > pezzo or not residui[pezzo]:
+                continue
+            copie = residui[pezzo] // 2 if compagno == pezzo else min(residui[pezzo], residui[compagno])
+            copie = min(copie, scorta[lunghezza_barra])
+            if copie:
+                fissa(lunghezza_barra, (pezzo, compagno), copie)
+
+    # Dominanza: pezzi accanto ai quali entra al più un altro pezzo
+    barra_max = lunghezze_barre[-1] if lunghezze_barre else 0
+    cambiato = True
+    while cambiato:
+        cambiato = False
+        crescenti = sorted(l for l, q in residui.items() if q > 0)
+        for pezzo in reversed(crescenti):
+            if not residui[pezzo] or pezzo > barra_max:
+                continue
+            spazio = barra_max - pezzo - spessore_lama
+            # I due pezzi più corti, escluso il pezzo stesso
+            corti = []
+            for lunghezza in crescenti:
+                disponibili = residui[lunghezza] - (lunghezza == pezzo)
+                corti.extend([lunghezza] * min(max(disponibili, 0), 2 - len(corti)))
+                if len(corti) == 2:
+                    break
+            if len(corti) == 2 and corti[0] + spessore_lama + corti[1] <= spazio:
+                continue
+            # Il pezzo più lungo che entra accanto
+            compagno = None
+            for indice in range(bisect.bisect_right(crescenti, spazio) - 1, -1, -1):
+                if residui[crescenti[indice]] - (crescenti[indice] == pezzo) > 0:
+                    compagno = crescenti[indice]
+                    break
+            if compagno is not None and not barra_unica:
+                continue
+            if compagno is not None:
+                copie = residui[pezzo] // 2 if compagno == pezzo else min(residui[pezzo], residui[compagno])
+                tagli = (pezzo, compagno)
+                lunghezza_barra = barra_max
+            else:
+                tagli = (pezzo,)
+                lunghezza_barra = next((l for l in lunghezze_barre if l >= pezzo and scorta[l]), None)
+                if lunghezza_barra is None:
+                    continue
+                copie = residui[pezzo]
+            copie = min(copie, scorta[lunghezza_barra])
+            if copie:
+                fissa(lunghezza_barra, tagli, copie)
+                cambiato = True
+
+    voci = [(PatternTaglio(lunghezza_barra, tagli, lunghezza_barra - sum(t + spessore_lama for t in tagli)), copie)
+            for (lunghezza_barra, tagli), copie in fissate.items()]
+    piano_fissato = PianoTaglio(voci)
+    _conta(pezzi_fissati=sum(len(p.tagli) * c for p, c in voci))
+    pezzi_residui = [(q, l) for l, q in residui.items() if q > 0]
+    barre_residue = [(q, l) for l, q in scorta.items() if q > 0]
+    return piano_fissato, pezzi_residui, barre_residue
+
+
 class OttimizzatoreTaglio:
     """Algoritmo per ottimizzare il taglio di barre minimizzando gli scarti"""
 
-    def __init__(self, barre_disponibili: List[Tuple[int, float]], spessore_lama: float):
+    def __init__(self, barre_disponibili: List[Tuple[int, float]], spessore_lama: float,
+                 scarti: List[float] = (), semplifica=True):
         """
         Args:
             barre_disponibili: Lista di tuple (quantità, lunghezza) delle barre disponibili
             spessore_lama: Spessore della lama in mm
+            scarti: Lunghezze degli scarti in magazzino, usati prima delle barre nuove
+            semplifica: Fissa prima le barre obbligate (semplifica_istanza); non si applica
+                se ci sono scarti, che vanno usati per primi
         """
         self.barre_disponibili = sorted(barre_disponibili, key=lambda x: x[1], reverse=True)
         self.spessore_lama = spessore_lama
+        self.scarti = sorted(scarti)
+        self.semplifica = semplifica
+        self.scarti_usati = []  # Lunghezze degli scarti impiegati dall'ultima ottimizzazione
+        self.piano_scarti = PianoTaglio()  # Barre dell'ultimo piano tagliate dagli scarti
 
-    def ottimizza(self, pezzi_richiesti: List[Tuple[int, float]]) -> List[Dict]:
+    @_misurato("ottimizza")
+    def ottimizza(self, pezzi_richiesti: List[Tuple[int, float]]) -> PianoTaglio:
         """
         Ottimizza i tagli usando algoritmo First Fit Decreasing con supporto per barre di lunghezze diverse
         Ad ogni chiamata genera un pattern diverso introducendo variabilità nell'ordine dei pezzi
@@ -36,113 +1590,3135 @@ class OttimizzatoreTaglio:
             pezzi_richiesti: Lista di tuple (quantità, lunghezza)
 
         Returns:
-            Lista di barre con i tagli ottimizzati
+            PianoTaglio con i pattern di taglio ottimizzati
         """
-        # Espandi i pezzi in base alla quantità
-        tutti_pezzi = []
-        for qty, lunghezza in pezzi_richiesti:
-            tutti_pezzi.extend([lunghezza] * qty)
-
-        # Ordina per lunghezza decrescente con piccola variazione casuale
-        # Raggruppa pezzi per lunghezza e mescola all'interno dei gruppi
-        pezzi_per_lunghezza = {}
-        for pezzo in tutti_pezzi:
-            if pezzo not in pezzi_per_lunghezza:
-                pezzi_per_lunghezza[pezzo] = []
-            pezzi_per_lunghezza[pezzo].append(pezzo)
-
-        # Ricostruisci la lista con ordine variabile
-        tutti_pezzi = []
-        lunghezze_ordinate = sorted(pezzi_per_lunghezza.keys(), reverse=True)
-
-        # Mescola le lunghezze simili per creare variabilità
+        fissato = PianoTaglio()
+        barre_disponibili = self.barre_disponibili
+        if self.semplifica and not self.scarti:
+            fissato, pezzi_richiesti, barre_disponibili = semplifica_istanza(pezzi_richiesti, barre_disponibili,
+                                                                             self.spessore_lama)
+        domanda = _DomandaPezzi(pezzi_richiesti)
+        lunghezze = domanda.lunghezze
+
+        # Ordina per lunghezza decrescente con piccola variazione casuale:
+        # le lunghezze entro il 10% di differenza vengono mescolate tra loro
+        ordine_classi = []
         i = 0
-        while i < len(lunghezze_ordinate):
-            gruppo = [lunghezze_ordinate[i]]
+        while i < len(lunghezze):
+            gruppo = [i]
             j = i + 1
-            # Raggruppa lunghezze entro il 10% di differenza
-            while j < len(lunghezze_ordinate) and lunghezze_ordinate[j] >= lunghezze_ordinate[i] * 0.9:
-                gruppo.append(lunghezze_ordinate[j])
+            while j < len(lunghezze) and lunghezze[j] >= lunghezze[i] * 0.9:
+                gruppo.append(j)
                 j += 1
 
             # Mescola il gruppo
             random.shuffle(gruppo)
-            for lung in gruppo:
-                tutti_pezzi.extend(pezzi_per_lunghezza[lung])
+            ordine_classi.extend(gruppo)
 
             i = j
 
-        # Crea pool di barre disponibili
-        barre_pool = []
+        # Pool di barre disponibili: lunghezze distinte crescenti con le quantità
+        pool = {}
+        for qty, lunghezza in barre_disponibili:
+            pool[lunghezza] = pool.get(lunghezza, 0) + qty
+        lunghezze_pool = sorted(pool)
+        quantita_pool = array('i', (pool[l] for l in lunghezze_pool))
+        barre_rimaste = sum(quantita_pool)
+
+        costruttore = _CostruttorePiano(lunghezze)
+        self.scarti_usati, self.piano_scarti = [], PianoTaglio()
+        if self.scarti:
+            # Le barre tagliate dagli scarti restano distinguibili da quelle nuove
+            da_scarti = _CostruttorePiano(lunghezze)
+            self.scarti_usati = self._taglia_da_scarti(domanda, da_scarti)
+            self.piano_scarti = da_scarti.piano()
+
+        # Barre aperte ordinate per spazio rimanente: (spazio, progressivo, barra)
+        aperte = _BarreAperte()
+        minimo = domanda.minimo()
+        # Una ricerca binaria tra le barre aperte per ogni pezzo
+        _conta(ricerche=domanda.rimanenti)
+
+        for classe in ordine_classi:
+            pezzo = lunghezze[classe]
+            for _ in range(domanda.residui[classe]):
+                # Le barre in cui non entra più nessun pezzo rimanente (compreso quello
+                # corrente) escono dalla ricerca
+                if domanda.minimo() != minimo:
+                    minimo = domanda.minimo()
+                    aperte.pota((minimo, -1))
+                domanda.preleva(classe)
+
+                # Barre già in uso con spazio sufficiente: sono in fondo all'ordinamento
+                posizione = aperte.posizione((pezzo, -1))
+                if posizione < len(aperte):
+                    # Scegli una barra casualmente tra quelle con spazio sufficiente
+                    # Questo crea pattern diversi ad ogni ottimizzazione
+                    _, progressivo, barra = aperte.estrai(random.randrange(posizione, len(aperte)))
+                    costruttore.aggiungi_tagli(barra, classe)
+                    barra.spazio_rimanente -= (pezzo + self.spessore_lama)
+                else:
+                    # Prendi dal pool la barra più piccola che può contenere il pezzo
+                    # Questo risparmia le barre più lunghe per pezzi più grandi
+                    idx = bisect.bisect_left(lunghezze_pool, pezzo)
+                    while idx < len(lunghezze_pool) and quantita_pool[idx] == 0:
+                        idx += 1
+
+                    if idx == len(lunghezze_pool):
+                        if not barre_rimaste:
+                            raise ValueError(
+                                f"Barre disponibili esaurite!\n\n"
+                                f"Servono più barre per completare tutti i tagli.\n"
+                                f"Pezzo da inserire: {pezzo}mm\n"
+                                f"Barre rimaste: 0\n\n"
+                                f"Soluzione: Aggiungi più barre disponibili"
+                            )
+                        else:
+                            barra_piu_lunga = max(l for l, q in zip(lunghezze_pool, quantita_pool) if q)
+                            raise ValueError(
+                                f"Nessuna barra disponibile può contenere il pezzo da {pezzo}mm!\n\n"
+                                f"Barra più lunga disponibile: {barra_piu_lunga}mm\n"
+                                f"Pezzo richiesto: {pezzo}mm\n\n"
+                                f"Soluzione: Aggiungi barre più lunghe di almeno {pezzo}mm"
+                            )
+
+                    quantita_pool[idx] -= 1
+                    barre_rimaste -= 1
+                    lunghezza_barra = lunghezze_pool[idx]
+                    barra = costruttore.apri_barra(lunghezza_barra,
+                                                   lunghezza_barra - pezzo - self.spessore_lama,
+                                                   [(classe, 1)])
+                    progressivo = len(costruttore.barre)
+
+                if barra.spazio_rimanente >= minimo:
+                    aperte.aggiungi((barra.spazio_rimanente, progressivo, barra))
+
+        # Lo sfrido è lo spazio rimanente dopo l'ultimo pezzo
+        # Non si aggiunge lo spessore lama perché dopo l'ultimo pezzo non si taglia più
+        if len(fissato):
+            return fissato.unisci(costruttore.piano())
+        if len(self.piano_scarti):
+            return self.piano_scarti.unisci(costruttore.piano())
+        return costruttore.piano()
+
+    def _taglia_da_scarti(self, domanda, costruttore):
+        """Pre-passaggio deterministico: taglia dagli scarti prima di usare barre nuove
+
+        Prende il pezzo più lungo che entra nello scarto più lungo, lo assegna allo
+        scarto più corto che lo contiene (best fit, ricerca binaria sulla lista
+        ordinata in memoria) e riempie il resto dello scarto first-fit decrescente.
+        Si ferma quando nessun pezzo rimanente entra negli scarti rimasti.
+        Togliere uno scarto dalla lista costa O(scarti), trascurabile rispetto
+        al riempimento anche con migliaia di scarti.
+
+        Returns:
+            Lista delle lunghezze degli scarti utilizzati
+        """
+        scarti = list(self.scarti)
+        usati = []
+        while scarti and domanda.rimanenti:
+            primo, _ = domanda.riempi(scarti[-1], self.spessore_lama, 1)
+            if not primo:
+                break
+            pezzo = domanda.lunghezze[primo[0][0]]
+            scarto = scarti.pop(bisect.bisect_left(scarti, pezzo))
+            prelievi, spazio = domanda.riempi(scarto, self.spessore_lama)
+            domanda.applica(prelievi)
+            costruttore.apri_barra(scarto, spazio, prelievi)
+            usati.append(scarto)
+        _conta(scarti_usati=len(usati))
+        return usati
+
+
+# Numero indicativo di geni (blocchi di pezzi uguali) nel cromosoma dell'algoritmo genetico
+GENI_GENETICO = 300
+
+
+def _decodifica_genetica(problema, ordine, scelte, costruttore=None):
+    """Decoder best fit di un cromosoma dell'algoritmo genetico
+
+    I blocchi di pezzi si inseriscono nell'ordine del cromosoma, ogni pezzo
+    nella barra aperta con meno spazio sufficiente; quando serve una barra
+    nuova, il gene di scelta del blocco indica quale tra le lunghezze
+    compatibili ancora disponibili aprire (0 = la più corta).
+
+    Args:
+        problema: Tupla (lunghezze, blocchi, lunghezze_pool, quantita_pool, spessore_lama, minimo)
+        ordine: Permutazione degli indici dei blocchi
+        scelte: Gene di scelta della barra per ogni blocco
+        costruttore: _CostruttorePiano facoltativo in cui costruire il piano
+
+    Returns:
+        Tupla (lunghezza totale delle barre, numero di barre); None se le barre non bastano
+    """
+    lunghezze, blocchi, lunghezze_pool, quantita_pool, spessore_lama, minimo = problema
+    residue = list(quantita_pool)
+    aperte = _BarreAperte()  # (spazio, progressivo) ordinate
+    barre = []
+    totale = 0
+    progressivo = 0
+    for blocco in ordine:
+        classe, quantita = blocchi[blocco]
+        pezzo = lunghezze[classe]
+        ingombro = pezzo + spessore_lama
+        for _ in range(quantita):
+            posizione = aperte.posizione((pezzo, -1))
+            if posizione < len(aperte):
+                spazio, i = aperte.estrai(posizione)
+                spazio -= ingombro
+                if costruttore is not None:
+                    costruttore.aggiungi_tagli(barre[i], classe)
+                    barre[i].spazio_rimanente = spazio
+            else:
+                compatibili = [j for j in range(bisect.bisect_left(lunghezze_pool, pezzo), len(lunghezze_pool))
+                               if residue[j]]
+                if not compatibili:
+                    return None
+                j = compatibili[scelte[blocco] % len(compatibili)]
+                residue[j] -= 1
+                totale += lunghezze_pool[j]
+                spazio = lunghezze_pool[j] - ingombro
+                i = progressivo
+                progressivo += 1
+                if costruttore is not None:
+                    barre.append(costruttore.apri_barra(lunghezze_pool[j], spazio, [(classe, 1)]))
+            if spazio >= minimo:
+                aperte.aggiungi((spazio, i))
+    return totale, progressivo
+
+
+def _incrocio_ordinato(padre, madre, rng):
+    """Order crossover (OX): un tratto del padre, il resto nell'ordine della madre"""
+    n = len(padre)
+    a, b = sorted(rng.sample(range(n + 1), 2))
+    tratto = padre[a:b]
+    presenti = set(tratto)
+    resto = [g for g in madre if g not in presenti]
+    return resto[:a] + tratto + resto[a:]
+
+
+def _evolvi_isola(problema, popolazione, seme, durata, generazioni=None):
+    """Evolve la popolazione di un'isola per un'epoca (eseguita nei processi del pool)
+
+    Prima si valutano gli individui ancora senza fitness, poi ogni generazione
+    produce tanti figli quanti individui (torneo, order crossover sull'ordine,
+    crossover uniforme sulle scelte, mutazioni per scambio e per gene di
+    scelta); sopravvivono i migliori tra genitori e figli. La scadenza si
+    controlla a ogni figlio: con istanze grandi una generazione può essere lunga.
+
+    Args:
+        problema: Vedi _decodifica_genetica
+        popolazione: Lista di individui (fitness o None, ordine, scelte)
+        seme: Seme del generatore casuale dell'epoca
+        durata: Secondi a disposizione
+        generazioni: Numero massimo di generazioni (None = fino allo scadere della durata)
+
+    Returns:
+        Tupla (popolazione ordinata per fitness, generazioni eseguite)
+    """
+    rng = random.Random(seme)
+    scadenza = time.perf_counter() + durata
+    peggiore = (float('inf'), float('inf'))
+    valutata = []
+    for valore, ordine, scelte in popolazione:
+        if valore is None:
+            # Senza tempo l'individuo resta in fondo e viene scartato alla prima selezione
+            valore = (_decodifica_genetica(problema, ordine, scelte) if time.perf_counter() < scadenza
+                      else None) or peggiore
+        valutata.append((valore, ordine, scelte))
+    popolazione = sorted(valutata, key=lambda individuo: individuo[0])
+    dimensione = len(popolazione)
+    fatte = 0
+    while (generazioni is None or fatte < generazioni) and time.perf_counter() < scadenza:
+        figli = []
+        for _ in range(dimensione):
+            if generazioni is None and time.perf_counter() >= scadenza:
+                break
+            padre = min(rng.sample(popolazione, min(3, dimensione)))
+            madre = min(rng.sample(popolazione, min(3, dimensione)))
+            ordine = _incrocio_ordinato(padre[1], madre[1], rng) if len(padre[1]) > 1 else list(padre[1])
+            scelte = [p if rng.random() < 0.5 else m for p, m in zip(padre[2], madre[2])]
+            if len(ordine) > 1 and rng.random() < 0.5:
+                i, j = rng.sample(range(len(ordine)), 2)
+                ordine[i], ordine[j] = ordine[j], ordine[i]
+            if scelte and rng.random() < 0.3:
+                scelte[rng.randrange(len(scelte))] = rng.randrange(3)
+            figli.append((_decodifica_genetica(problema, ordine, scelte) or peggiore, ordine, scelte))
+        popolazione = sorted(popolazione + figli, key=lambda individuo: individuo[0])[:dimensione]
+        fatte += 1
+    return popolazione, fatte
+
+
+class OttimizzatoreGenetico:
+    """Algoritmo genetico a isole sull'ordine dei pezzi e sulla scelta delle barre
+
+    Alternativa guidata alla variabilità casuale di OttimizzatoreTaglio per
+    istanze grandi. Il cromosoma è una permutazione di blocchi di pezzi uguali
+    (circa GENI_GENETICO blocchi, indipendentemente dal numero di pezzi) con un
+    gene di scelta della barra per blocco, decodificato con best fit
+    (_decodifica_genetica); la fitness è la lunghezza totale delle barre, poi
+    il numero di barre. Le isole evolvono in parallelo su un pool di processi e
+    dopo ogni epoca i migliori individui di ogni isola migrano nella successiva
+    (anello). Ogni popolazione contiene l'ordine decrescente (best fit
+    decreasing), quindi il risultato non è peggiore di quello.
+    """
+
+    def __init__(self, barre_disponibili: List[Tuple[int, float]], spessore_lama: float, isole=None,
+                 popolazione=30, tempo=10.0, epoche=5, generazioni=None, seme=None, processi=None):
+        """
+        Args:
+            barre_disponibili: Lista di tuple (quantità, lunghezza) delle barre disponibili
+            spessore_lama: Spessore della lama in mm
+            isole: Numero di isole (None = numero di CPU, almeno 2)
+            popolazione: Individui per isola
+            tempo: Tempo totale a disposizione in secondi
+            epoche: Numero di epoche; tra un'epoca e l'altra avviene la migrazione
+            generazioni: Generazioni massime per epoca (None = fino allo scadere del tempo);
+                con un seme e un limite di generazioni raggiunto entro il tempo il risultato è riproducibile
+            seme: Seme del generatore casuale (None = casuale)
+            processi: Numero massimo di processi (None = numero di CPU, 1 = nessun pool)
+        """
+        self.barre_disponibili = sorted(barre_disponibili, key=lambda x: x[1], reverse=True)
+        self.spessore_lama = spessore_lama
+        self.isole = isole or max(2, os.cpu_count() or 1)
+        self.popolazione = max(2, popolazione)
+        self.tempo = tempo
+        self.epoche = max(1, epoche)
+        self.generazioni = generazioni
+        self.seme = seme
+        self.processi = processi
+        self.generazioni_eseguite = 0  # Generazioni complessive dell'ultima ottimizzazione
+
+    def _problema(self, domanda, num_pezzi):
+        """Tupla del problema per _decodifica_genetica, con i pezzi divisi in blocchi"""
+        dimensione_blocco = max(1, -(-num_pezzi // GENI_GENETICO))
+        blocchi = []
+        for classe, quantita in enumerate(domanda.residui):
+            while quantita > 0:
+                blocchi.append((classe, min(dimensione_blocco, quantita)))
+                quantita -= dimensione_blocco
+        pool = {}
         for qty, lunghezza in self.barre_disponibili:
-            for _ in range(qty):
-                barre_pool.append(lunghezza)
+            pool[lunghezza] = pool.get(lunghezza, 0) + qty
+        lunghezze_pool = tuple(sorted(pool))
+        return (domanda.lunghezze, tuple(blocchi), lunghezze_pool, tuple(pool[l] for l in lunghezze_pool),
+                self.spessore_lama, domanda.lunghezze[-1])
+
+    @_misurato("genetico")
+    def ottimizza(self, pezzi_richiesti: List[Tuple[int, float]], progresso=None, interrompi=None,
+                  incumbente=None) -> PianoTaglio:
+        """
+        Args:
+            pezzi_richiesti: Lista di tuple (quantità, lunghezza)
+            progresso: Callback opzionale progresso(epoche_fatte, epoche_totali)
+            interrompi: Evento opzionale (is_set()); se impostato la ricerca termina alla fine dell'epoca
+            incumbente: Callback opzionale incumbente(piano), chiamata dopo ogni epoca che migliora il risultato
 
-        barre_utilizzate = []
+        Returns:
+            PianoTaglio del miglior individuo trovato
 
-        for pezzo in tutti_pezzi:
-            # Cerca una barra già in uso dove il pezzo può essere inserito
-            inserito = False
+        Raises:
+            ValueError: se le barre disponibili non bastano o non contengono un pezzo
+        """
+        # Il tempo comprende la preparazione e le decodifiche dei piani pubblicati
+        fine = time.perf_counter() + self.tempo
+        domanda = _DomandaPezzi(pezzi_richiesti)
+        if not domanda.rimanenti:
+            return PianoTaglio()
+        problema = self._problema(domanda, domanda.rimanenti)
+        pezzo_max = domanda.lunghezze[0]
+        if not problema[2] or problema[2][-1] < pezzo_max:
+            raise ValueError(f"Nessuna barra disponibile può contenere il pezzo da {pezzo_max}mm!")
+
+        seme = self.seme if self.seme is not None else random.randrange(2 ** 32)
+        rng = random.Random(seme)
+        geni = len(problema[1])
+        decrescente = list(range(geni))
+        costruttore = _CostruttorePiano(domanda.lunghezze)
+        partenza = time.perf_counter()
+        base = _decodifica_genetica(problema, decrescente, [0] * geni, costruttore)
+        decodifica = time.perf_counter() - partenza
+        if base is None:
+            raise ValueError("Barre disponibili esaurite!\n\nServono più barre per completare tutti i tagli.")
+
+        # Popolazioni iniziali: l'ordine decrescente e sue perturbazioni
+        isole = []
+        for _ in range(self.isole):
+            popolazione = [(base, decrescente, [0] * geni)]
+            while len(popolazione) < self.popolazione:
+                ordine = list(decrescente)
+                for _ in range(max(1, geni // 10)):
+                    i, j = rng.randrange(geni), rng.randrange(geni)
+                    ordine[i], ordine[j] = ordine[j], ordine[i]
+                scelte = [rng.randrange(3) if rng.random() < 0.1 else 0 for _ in range(geni)]
+                # La fitness si calcola nell'isola, entro il tempo dell'epoca
+                popolazione.append((None, ordine, scelte))
+            isole.append(popolazione)
+
+        paralleli = 1 if self.processi == 1 else min(self.processi or os.cpu_count() or 1, self.isole)
+        migranti = max(1, self.popolazione // 10)
+        generazioni = 0
+        # Fitness e piano del miglior individuo già decodificato: le decodifiche non si ripetono
+        migliore, piano_migliore = base, costruttore.piano()
+        if incumbente is not None:
+            incumbente(piano_migliore)
+        pool = ProcessPoolExecutor(max_workers=paralleli) if paralleli > 1 else None
+        try:
+            for epoca in range(self.epoche):
+                # Un'epoca serve solo se c'è tempo per decodificare almeno un figlio e il piano migliore
+                rimasto = fine - time.perf_counter()
+                if rimasto < 2 * decodifica:
+                    break
+                # Tempo rimasto diviso tra le epoche mancanti; le isole oltre il numero
+                # di processi aspettano in coda, quindi l'epoca si accorcia di conseguenza
+                durata = rimasto / (self.epoche - epoca) * paralleli / self.isole
+                semi = [seme * 1000003 + epoca * 1009 + k for k in range(self.isole)]
+                if pool is None:
+                    risultati = [_evolvi_isola(problema, p, s, durata, self.generazioni)
+                                 for p, s in zip(isole, semi)]
+                else:
+                    futuri = [pool.submit(_evolvi_isola, problema, p, s, durata, self.generazioni)
+                              for p, s in zip(isole, semi)]
+                    risultati = [futuro.result() for futuro in futuri]
+                isole = [popolazione for popolazione, _ in risultati]
+                generazioni += sum(fatte for _, fatte in risultati)
+
+                # Migrazione ad anello: i migliori di ogni isola sostituiscono i peggiori della successiva
+                if self.isole > 1 and epoca < self.epoche - 1:
+                    migliori = [popolazione[:migranti] for popolazione in isole]
+                    for k, popolazione in enumerate(isole):
+                        popolazione[-migranti:] = migliori[k - 1]
+                        popolazione.sort(key=lambda individuo: individuo[0])
+                if progresso is not None:
+                    progresso(epoca + 1, self.epoche)
+                if incumbente is not None:
+                    valore, ordine, scelte = min((popolazione[0] for popolazione in isole),
+                                                 key=lambda individuo: individuo[0])
+                    if valore < migliore:
+                        costruttore = _CostruttorePiano(domanda.lunghezze)
+                        _decodifica_genetica(problema, ordine, scelte, costruttore)
+                        migliore, piano_migliore = valore, costruttore.piano()
+                        incumbente(piano_migliore)
+                if interrompi is not None and interrompi.is_set():
+                    break
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        self.generazioni_eseguite = generazioni
+        _conta(generazioni=generazioni)
+        valore, ordine, scelte = min((popolazione[0] for popolazione in isole), key=lambda individuo: individuo[0])
+        if not valore < migliore:
+            return piano_migliore
+        costruttore = _CostruttorePiano(domanda.lunghezze)
+        _decodifica_genetica(problema, ordine, scelte, costruttore)
+        return costruttore.piano()
+
+
+# Scenari tenuti dall'enumerazione dei sottoinsiemi del catalogo e suo tempo massimo (secondi)
+MIGLIORI_SCENARI = 10
+TEMPO_ENUMERAZIONE = 1.0
+
+
+class FronteScenari:
+    """Scenari distinti e non dominati, indicizzati per impronta del piano
+
+    Il PianoTaglio è canonico e hashable (pattern internati): due scenari con
+    lo stesso piano sono lo stesso scenario e il controllo dei duplicati è un
+    accesso a un set, O(1). Uno scenario entra nel fronte se nessun altro è
+    almeno altrettanto buono su tutti i criteri (barre, sfrido, costo, pattern
+    distinti e, da massimizzare, la lunghezza degli scarti riutilizzabili);
+    quelli che domina ne escono. Il controllo di dominanza confronta lo
+    scenario con tutto il fronte: O(dimensione del fronte) per inserimento.
+    """
+    __slots__ = ('_visti', '_fronte')
+
+    def __init__(self, scenari=()):
+        self._visti = set()  # Impronte dei piani già considerati, anche se poi dominati
+        self._fronte = {}  # PianoTaglio -> (criteri, scenario)
+        for scenario in scenari:
+            self.aggiungi(scenario)
+
+    def __len__(self):
+        return len(self._fronte)
+
+    @staticmethod
+    def criteri(scenario):
+        """Criteri da minimizzare di uno scenario"""
+        return (scenario['num_barre_totale'], round(scenario['spreco_totale'], 6),
+                round(scenario['costo_totale'] or 0, 6), scenario['num_pattern'],
+                -round(scenario['scarti_utili'], 6))
+
+    def aggiungi(self, scenario):
+        """Aggiunge uno scenario; False se è un duplicato o è dominato"""
+        piano = scenario['piano']
+        if piano in self._visti:
+            return False
+        self._visti.add(piano)
+        criteri = self.criteri(scenario)
+        for altri, _ in self._fronte.values():
+            if all(a <= c for a, c in zip(altri, criteri)):
+                return False
+        for altro in [p for p, (altri, _) in self._fronte.items() if all(c <= a for c, a in zip(criteri, altri))]:
+            del self._fronte[altro]
+        self._fronte[piano] = (criteri, scenario)
+        return True
+
+    def scenari(self):
+        """Scenari del fronte per sfrido crescente"""
+        return sorted((scenario for _, scenario in self._fronte.values()), key=lambda s: s['spreco_totale'])
+
+
+class GeneratoreScenari:
+    """Genera scenari di acquisto confrontando diverse strategie di taglio
+
+    Ogni strategia lavora sulla domanda raggruppata per lunghezza (_DomandaPezzi)
+    e costruisce le barre con _CostruttorePiano, senza liste espanse di pezzi.
+    """
+
+    @_misurato("scenari")
+    def genera_tutti_scenari(self, pezzi_richiesti, lunghezze_catalogo, spessore_lama, costi_barre=None,
+                             peso_pattern=0, semplifica=True, tempo_enumerazione=TEMPO_ENUMERAZIONE,
+                             pareto=True, scadenza=None):
+        """
+        Genera tutti gli scenari possibili di taglio provando diverse combinazioni di barre.
 
-            # Trova tutte le barre compatibili
-            barre_compatibili = [(idx, barra) for idx, barra in enumerate(barre_utilizzate)
-                                 if pezzo <= barra['spazio_rimanente']]
+        Args:
+            pezzi_richiesti: Lista di tuple (quantità, lunghezza)
+            lunghezze_catalogo: Lista delle lunghezze disponibili nel catalogo
+            spessore_lama: Spessore della lama in mm
+            costi_barre: Dict opzionale {lunghezza: costo} per calcolare il costo totale
+            peso_pattern: Costo di un pattern distinto in barre (vedi riduci_pattern, 0 = nessuna riduzione)
+            semplifica: Fissa prima le barre obbligate (semplifica_istanza), comuni a tutti gli scenari
+            tempo_enumerazione: Secondi per i sottoinsiemi del catalogo e gli ordini di
+                preferenza (vedi _scenari_enumerati, 0 = nessuna enumerazione)
+            pareto: Tiene solo gli scenari non dominati; False per tenere tutti gli
+                scenari distinti, ad esempio se verranno riprezzati con altri listini
+            scadenza: Istante opzionale (time.perf_counter()) entro cui finire: una strategia
+                parte solo se, lunga quanto la precedente, finisce entro la scadenza; la prima
+                (greedy) si calcola sempre
+
+        Returns:
+            Lista degli scenari non dominati (vedi FronteScenari) ordinati per spreco
+            crescente (tutti gli scenari distinti se pareto è False). Ogni scenario contiene:
+            - fabbisogno: dict {lunghezza: quantità}
+            - spreco_totale: float
+            - scarti: lista delle lunghezze degli scarti
+            - scarti_utili: float, lunghezza totale degli scarti riutilizzabili
+            - num_barre_totale: int
+            - num_pattern: int
+            - costo_totale: float (solo se costi_barre è fornito)
+            - piano: PianoTaglio con i pattern di taglio
+        """
+        # Le barre obbligate sono uguali in ogni scenario: le strategie lavorano sui pezzi residui
+        fissato = PianoTaglio()
+        if semplifica:
+            num_pezzi = sum(q for q, _ in pezzi_richiesti)
+            fissato, pezzi_richiesti, _ = semplifica_istanza(
+                pezzi_richiesti, [(num_pezzi, l) for l in lunghezze_catalogo], spessore_lama)
+            if len(fissato) and not pezzi_richiesti:
+                return [self._crea_scenario(fissato, lunghezze_catalogo, costi_barre)]
+
+        # Raggruppa i pezzi per lunghezza (classi in ordine decrescente);
+        # ogni strategia consuma una copia delle quantità residue
+        domanda = _DomandaPezzi(pezzi_richiesti)
+
+        scenari = []
+        piani = set()  # Impronte dei piani già tenuti: il controllo dei duplicati è O(1)
+
+        inizio_strategia = time.perf_counter()
+        fuori_tempo = False
+
+        def scaduto():
+            nonlocal inizio_strategia, fuori_tempo
+            adesso = time.perf_counter()
+            durata, inizio_strategia = adesso - inizio_strategia, adesso
+            fuori_tempo = fuori_tempo or (scadenza is not None and adesso + durata > scadenza)
+            return fuori_tempo
+
+        def aggiungi(scenario):
+            if scenario and scenario['piano'] not in piani:
+                piani.add(scenario['piano'])
+                scenari.append(scenario)
+
+        # Strategia 1: Scenario con spreco minimo (algoritmo greedy esistente)
+        aggiungi(self._calcola_scenario_greedy(domanda.copia(), lunghezze_catalogo, spessore_lama, costi_barre))
+
+        # Strategia 2: Prova diverse combinazioni forzando l'uso di barre diverse
+        # Per ogni lunghezza di barra, prova a creare scenari che privilegiano quella lunghezza
+        for lung_preferita in sorted(lunghezze_catalogo, reverse=True):
+            if scaduto():
+                break
+            aggiungi(self._calcola_scenario_con_preferenza(domanda.copia(), lunghezze_catalogo,
+                                                           spessore_lama, lung_preferita, costi_barre))
+
+        # Strategia 3: Scenario con numero minimo di barre (privilegia barre lunghe)
+        if not scaduto():
+            aggiungi(self._calcola_scenario_min_barre(domanda.copia(), lunghezze_catalogo, spessore_lama,
+                                                      costi_barre))
+
+        # Strategia 4: Scenario con scarti più lunghi
+        if not scaduto():
+            aggiungi(self._calcola_scenario_scarti_lunghi(domanda.copia(), lunghezze_catalogo,
+                                                          spessore_lama, costi_barre))
+
+        # Strategia 5: sottoinsiemi del catalogo e ordini di preferenza delle lunghezze
+        if scadenza is not None:
+            tempo_enumerazione = min(tempo_enumerazione, scadenza - time.perf_counter())
+        if tempo_enumerazione > 0 and len(set(lunghezze_catalogo)) > 1:
+            for scenario in self._scenari_enumerati(domanda, lunghezze_catalogo, spessore_lama, costi_barre,
+                                                    scenari, tempo_enumerazione):
+                aggiungi(scenario)
+
+        # Si tengono solo gli scenari non dominati, sui piani completi
+        fronte = FronteScenari()
+        distinti = {}  # PianoTaglio -> scenario, se non si scartano i dominati
+        for scenario in scenari:
+            if len(fissato):
+                scenario = self._crea_scenario(fissato.unisci(scenario['piano']), lunghezze_catalogo, costi_barre)
+            # Meno pattern distinti a parità di costo con setup (può cambiare il fabbisogno)
+            if peso_pattern > 0:
+                piano = riduci_pattern(scenario['piano'], spessore_lama, peso_pattern)
+                if piano is not scenario['piano']:
+                    scenario = self._crea_scenario(piano, lunghezze_catalogo, costi_barre)
+            if pareto:
+                fronte.aggiungi(scenario)
+            else:
+                distinti.setdefault(scenario['piano'], scenario)
+        if not pareto:
+            return sorted(distinti.values(), key=lambda s: s['spreco_totale'])
+        _conta(scenari_dominati=len(scenari) - len(fronte))
+
+        return fronte.scenari()
+
+    def _scenari_enumerati(self, domanda, lunghezze_catalogo, spessore_lama, costi_barre, scenari, tempo):
+        """Scenari con sottoinsiemi del catalogo e ordini di preferenza delle lunghezze
+
+        Le strategie fisse provano solo "preferisci la lunghezza X" sull'intero
+        catalogo: qui si enumerano i sottoinsiemi (es. "solo 6000 e 4000, niente
+        7500"), ognuno con la strategia greedy e con un ordine di preferenza.
+        Un ordine conta solo per la lunghezza preferita (la prima) e per la barra
+        nuova scelta per ogni pezzo (la prima lunghezza ≥ pezzo): le lunghezze che
+        seguono una più lunga non vengono mai scelte, quindi ogni ordine di un
+        sottoinsieme equivale all'ordine crescente di un altro sottoinsieme e
+        basta provare l'ordine crescente di ciascuno, senza permutazioni. Gli
+        ordini equivalenti rimasti (stessa chiave) e i sottoinsiemi con lunghezze
+        in cui non entra nessun pezzo si valutano una volta sola.
+
+        Limite inferiore dello sfrido di un sottoinsieme: una barra L contiene al
+        più r(L) di ingombro Σ(p + λ) (miglior riempimento, subset-sum su bitset),
+        quindi lo sfrido è almeno ingombro × min(L / r(L)) - ingombro. Il limite
+        dipende solo dal sottoinsieme: ordinando le lunghezze per L / r(L), i
+        sottoinsiemi il cui minimo è la i-esima lunghezza hanno tutti lo stesso
+        limite e si generano, pigramente, dopo quelli delle lunghezze precedenti.
+        I candidati si valutano così per limite crescente contro un heap dei
+        MIGLIORI_SCENARI sfridi (compresi quelli delle strategie fisse): ci si
+        ferma quando il limite non può più entrare nell'heap o allo scadere del
+        tempo, controllato anche durante la generazione, per cui il lavoro resta
+        entro il tempo concesso anche con cataloghi di molte lunghezze.
+
+        Args:
+            domanda: _DomandaPezzi dei pezzi (non modificata)
+            scenari: Scenari già calcolati dalle strategie fisse
+            tempo: Secondi a disposizione
+
+        Returns:
+            Lista dei nuovi scenari entrati tra i migliori
+        """
+        scadenza = time.perf_counter() + tempo
+        catalogo = sorted(set(lunghezze_catalogo))
+        pezzi = [(q, domanda.lunghezze[classe]) for classe, q in enumerate(domanda.residui) if q]
+        if not pezzi:
+            return []
+        pezzo_max, pezzo_min = pezzi[0][1], pezzi[-1][1]
+        ingombro = sum(q * (l + spessore_lama) for q, l in pezzi)
+        bitset, tolleranza = _riempimenti_possibili(pezzi, spessore_lama, int(catalogo[-1] + spessore_lama))
+        rapporti = {}
+        for lunghezza in catalogo:
+            capacita = lunghezza + spessore_lama
+            riempimento = min(capacita, (bitset & ((1 << (int(capacita) + 1)) - 1)).bit_length() - 1 + tolleranza)
+            if lunghezza >= pezzo_min and riempimento > 0:
+                rapporti[lunghezza] = lunghezza / riempimento
+
+        def chiave_ordine(ordine):
+            """Lunghezza preferita e barra nuova scelta per ogni pezzo: ordini con la stessa chiave coincidono"""
+            return ordine[0], tuple(next((l for l in ordine if l >= p), None) for _, p in pezzi)
+
+        # Candidati già calcolati dalle strategie fisse
+        usabili = sorted(rapporti)
+        visti = {('greedy', tuple(usabili))}
+        for preferita in catalogo:
+            visti.add(('ordine', chiave_ordine([preferita] + [l for l in catalogo if l != preferita])))
+
+        def candidati():
+            """(limite, progressivo, (strategia, lunghezze)) per limite crescente, fino alla scadenza"""
+            per_rapporto = sorted(usabili, key=lambda l: rapporti[l])
+            progressivo = 0
+            for i, minima in enumerate(per_rapporto):
+                limite = ingombro * rapporti[minima] - ingombro
+                altre = per_rapporto[i + 1:]
+                for k in range(len(altre) + 1):
+                    for aggiunte in itertools.combinations(altre, k):
+                        if time.perf_counter() >= scadenza:
+                            return
+                        sottoinsieme = tuple(sorted((minima,) + aggiunte))
+                        if sottoinsieme[-1] < pezzo_max:
+                            continue
+                        for chiave, candidato in ((('greedy', sottoinsieme), ('greedy', sottoinsieme)),
+                                                  (('ordine', chiave_ordine(sottoinsieme)), ('ordine', sottoinsieme))):
+                            if chiave not in visti:
+                                visti.add(chiave)
+                                progressivo += 1
+                                yield limite, progressivo, candidato
+
+        # Max-heap (-sfrido, progressivo, scenario) dei migliori; None per gli scenari delle strategie fisse
+        migliori = [(-s['spreco_totale'], -1 - i, None) for i, s in enumerate(scenari)]
+        heapq.heapify(migliori)
+        while len(migliori) > MIGLIORI_SCENARI:
+            heapq.heappop(migliori)
+        generati = valutati = 0
+        for limite, progressivo, (strategia, lunghezze) in candidati():
+            generati = progressivo
+            soglia = -migliori[0][0] if len(migliori) >= MIGLIORI_SCENARI else float('inf')
+            if limite >= soglia or time.perf_counter() >= scadenza:
+                break
+            valutati += 1
+            if strategia == 'greedy':
+                scenario = self._calcola_scenario_greedy(domanda.copia(), list(lunghezze), spessore_lama, None)
+            else:
+                scenario = self._calcola_scenario_con_preferenza(domanda.copia(), lunghezze_catalogo, spessore_lama,
+                                                                 lunghezze[0], None, ordine=lunghezze)
+            if scenario is None or scenario['spreco_totale'] >= soglia:
+                continue
+            scenario = self._crea_scenario(scenario['piano'], lunghezze_catalogo, costi_barre)
+            if len(migliori) < MIGLIORI_SCENARI:
+                heapq.heappush(migliori, (-scenario['spreco_totale'], progressivo, scenario))
+            else:
+                heapq.heapreplace(migliori, (-scenario['spreco_totale'], progressivo, scenario))
+        _conta(scenari_candidati=generati, scenari_enumerati=valutati)
+        return [scenario for _, _, scenario in sorted(migliori, reverse=True) if scenario is not None]
+
+    @staticmethod
+    def _pota_aperte(aperte, domanda):
+        """Toglie dalle barre aperte quelle in cui non entra più nessun pezzo rimanente"""
+        if aperte:
+            minimo = domanda.minimo()
+            aperte[:] = [b for b in aperte if b.spazio_rimanente >= minimo]
+
+    @_misurato("greedy")
+    def _calcola_scenario_greedy(self, domanda, lunghezze_catalogo, spessore_lama, costi_barre):
+        """Algoritmo greedy: minimizza lo spreco per singola barra"""
+        lunghezze_ord = sorted(lunghezze_catalogo)
+        costruttore = _CostruttorePiano(domanda.lunghezze)
+        # Barre aperte ordinate per spazio rimanente: (spazio, progressivo, barra)
+        aperte = _BarreAperte()
+
+        # Ottimizzazione: limita quanti pezzi aggiuntivi cercare per ogni nuova barra
+        max_pezzi_extra = 10
+        ricerche = 0
+
+        while domanda.rimanenti:
+            classe = domanda.primo()
+            pezzo = domanda.lunghezze[classe]
+            ricerche += 1
+
+            # Scarta le barre in cui non entra più nessun pezzo
+            aperte.pota((domanda.minimo(), -1))
+
+            # Best fit tra le barre aperte: quella con meno spazio che contiene il pezzo
+            posizione = aperte.posizione((pezzo, -1))
+            if posizione < len(aperte):
+                _, progressivo, barra = aperte.estrai(posizione)
+                domanda.preleva(classe)
+                costruttore.aggiungi_tagli(barra, classe)
+                barra.spazio_rimanente -= (pezzo + spessore_lama)
+                aperte.aggiungi((barra.spazio_rimanente, progressivo, barra))
+                continue
+
+            # Apri nuova barra
+            barre_compatibili = [lung for lung in lunghezze_ord if pezzo <= lung]
+            if not barre_compatibili:
+                raise ValueError(f"Nessuna barra può contenere il pezzo da {pezzo}mm")
+
+            domanda.preleva(classe)
+            migliore_barra = barre_compatibili[0]
+            miglior_spreco = float('inf')
+            migliori_prelievi = []
+
+            # Ottimizzazione: limita il numero di barre da testare per grandi dataset
+            max_test = min(3, len(barre_compatibili))
+
+            for lung_barra in barre_compatibili[:max_test]:
+                prelievi, spazio_sim = domanda.riempi(lung_barra - pezzo - spessore_lama,
+                                                      spessore_lama, max_pezzi_extra)
+                if spazio_sim < miglior_spreco:
+                    miglior_spreco = spazio_sim
+                    migliore_barra = lung_barra
+                    migliori_prelievi = prelievi
+
+            domanda.applica(migliori_prelievi)
+            barra = costruttore.apri_barra(migliore_barra, miglior_spreco,
+                                           [(classe, 1)] + migliori_prelievi)
+            aperte.aggiungi((barra.spazio_rimanente, len(costruttore.barre), barra))
+
+        _conta(ricerche=ricerche)
+        return self._crea_scenario(costruttore.piano(), lunghezze_catalogo, costi_barre)
+
+    @_misurato("preferenza")
+    def _calcola_scenario_con_preferenza(self, domanda, lunghezze_catalogo, spessore_lama,
+                                        lung_preferita, costi_barre, ordine=None):
+        """Calcola scenario privilegiando una specifica lunghezza di barra
+
+        ordine: Ordine in cui provare le lunghezze per le barre nuove (default: la
+        preferita, poi le altre crescenti); le lunghezze escluse non si usano.
+        """
+        if ordine is not None:
+            lunghezze_ord = list(ordine)
+        else:
+            lunghezze_ord = [lung_preferita] + [l for l in sorted(lunghezze_catalogo) if l != lung_preferita]
+        costruttore = _CostruttorePiano(domanda.lunghezze)
+        aperte = []
+        ricerche = candidati = 0
+
+        while domanda.rimanenti:
+            classe = domanda.primo()
+            pezzo = domanda.lunghezze[classe]
+            self._pota_aperte(aperte, domanda)
+            ricerche += 1
+            candidati += len(aperte)
+
+            # Cerca barra già aperta
+            barre_compatibili = [b for b in aperte if pezzo <= b.spazio_rimanente]
+
+            if barre_compatibili:
+                # Privilegia barre della lunghezza preferita
+                barre_preferite = [b for b in barre_compatibili if b.lunghezza == lung_preferita]
+                if barre_preferite:
+                    barre_compatibili = barre_preferite
+
+                barra_scelta = min(barre_compatibili, key=lambda b: b.spazio_rimanente - pezzo - spessore_lama)
+                domanda.preleva(classe)
+                costruttore.aggiungi_tagli(barra_scelta, classe)
+                barra_scelta.spazio_rimanente -= (pezzo + spessore_lama)
+                continue
+
+            # Usa la lunghezza preferita se possibile
+            barre_compatibili = [lung for lung in lunghezze_ord if pezzo <= lung]
+            if not barre_compatibili:
+                return None
+
+            lung_barra = barre_compatibili[0]
+            domanda.preleva(classe)
+            prelievi, spazio_sim = domanda.riempi(lung_barra - pezzo - spessore_lama, spessore_lama)
+            domanda.applica(prelievi)
+            aperte.append(costruttore.apri_barra(lung_barra, spazio_sim, [(classe, 1)] + prelievi))
+
+        _conta(ricerche=ricerche, candidati_esaminati=candidati)
+        return self._crea_scenario(costruttore.piano(), lunghezze_catalogo, costi_barre)
+
+    @_misurato("min_barre")
+    def _calcola_scenario_min_barre(self, domanda, lunghezze_catalogo, spessore_lama, costi_barre):
+        """Calcola scenario che minimizza il numero di barre (usa barre più lunghe)"""
+        lunghezze_ord = sorted(lunghezze_catalogo, reverse=True)  # Privilegia barre lunghe
+        costruttore = _CostruttorePiano(domanda.lunghezze)
+        aperte = []
+        ricerche = candidati = 0
+
+        while domanda.rimanenti:
+            classe = domanda.primo()
+            pezzo = domanda.lunghezze[classe]
+            self._pota_aperte(aperte, domanda)
+            ricerche += 1
+            candidati += len(aperte)
+
+            # Cerca barra già aperta
+            barre_compatibili = [b for b in aperte if pezzo <= b.spazio_rimanente]
+
+            if barre_compatibili:
+                # Privilegia barre più lunghe con più spazio
+                barra_scelta = min(barre_compatibili, key=lambda b: (-b.lunghezza, b.spazio_rimanente - pezzo))
+                domanda.preleva(classe)
+                costruttore.aggiungi_tagli(barra_scelta, classe)
+                barra_scelta.spazio_rimanente -= (pezzo + spessore_lama)
+                continue
+
+            # Usa sempre la barra più lunga possibile
+            barre_compatibili = [lung for lung in lunghezze_ord if pezzo <= lung]
+            if not barre_compatibili:
+                return None
+
+            lung_barra = barre_compatibili[0]  # La più lunga
+            domanda.preleva(classe)
+            prelievi, spazio_sim = domanda.riempi(lung_barra - pezzo - spessore_lama, spessore_lama)
+            domanda.applica(prelievi)
+            aperte.append(costruttore.apri_barra(lung_barra, spazio_sim, [(classe, 1)] + prelievi))
+
+        _conta(ricerche=ricerche, candidati_esaminati=candidati)
+        return self._crea_scenario(costruttore.piano(), lunghezze_catalogo, costi_barre)
+
+    @_misurato("scarti_lunghi")
+    def _calcola_scenario_scarti_lunghi(self, domanda, lunghezze_catalogo, spessore_lama, costi_barre):
+        """Calcola scenario che privilegia scarti più lunghi e riutilizzabili"""
+        lunghezze_ord = sorted(lunghezze_catalogo)
+        costruttore = _CostruttorePiano(domanda.lunghezze)
+        aperte = []
+        ricerche = candidati = 0
+
+        while domanda.rimanenti:
+            classe = domanda.primo()
+            pezzo = domanda.lunghezze[classe]
+            self._pota_aperte(aperte, domanda)
+            ricerche += 1
+            candidati += len(aperte)
+
+            # Cerca barra già aperta - ma evita di riempirle completamente se possibile
+            barre_compatibili = [b for b in aperte if pezzo <= b.spazio_rimanente]
 
             if barre_compatibili:
-                # Scegli una barra casualmente tra quelle con spazio sufficiente
-                # Questo crea pattern diversi ad ogni ottimizzazione
-                idx_scelto, barra_scelta = random.choice(barre_compatibili)
-                barra_scelta['tagli'].append(pezzo)
-                barra_scelta['spazio_rimanente'] -= (pezzo + self.spessore_lama)
-                barra_scelta['num_tagli'] += 1
-                inserito = True
-
-            # Se non è stato inserito, prendi una nuova barra dal pool
-            if not inserito:
-                # Trova la barra più piccola che può contenere il pezzo
-                # Questo risparmia le barre più lunghe per pezzi più grandi
-                barra_scelta = None
-                barre_compatibili = [b for b in barre_pool if pezzo <= b]
-
-                if not barre_compatibili:
-                    if not barre_pool:
-                        raise ValueError(
-                            f"Barre disponibili esaurite!\n\n"
-                            f"Servono più barre per completare tutti i tagli.\n"
-                            f"Pezzo da inserire: {pezzo}mm\n"
-                            f"Barre rimaste: 0\n\n"
-                            f"Soluzione: Aggiungi più barre disponibili"
-                        )
+                # Preferisci barre che dopo il taglio lasciano scarti > 500mm oppure < 100mm
+                # (o molto riutilizzabili o quasi zero)
+                def priorita_scarto(b):
+                    scarto_dopo = b.spazio_rimanente - pezzo - spessore_lama
+                    if scarto_dopo > 500:
+                        return 0  # Ottimo, scarto riutilizzabile
+                    elif scarto_dopo < 100:
+                        return 1  # Buono, quasi zero spreco
                     else:
-                        raise ValueError(
-                            f"Nessuna barra disponibile può contenere il pezzo da {pezzo}mm!\n\n"
-                            f"Barra più lunga disponibile: {max(barre_pool)}mm\n"
-                            f"Pezzo richiesto: {pezzo}mm\n\n"
-                            f"Soluzione: Aggiungi barre più lunghe di almeno {pezzo}mm"
-                        )
-
-                # Scegli la barra più piccola tra quelle compatibili
-                barra_scelta = min(barre_compatibili)
-
-                # Rimuovi la barra dal pool
-                barre_pool.remove(barra_scelta)
-
-                nuova_barra = {
-                    'lunghezza': barra_scelta,
-                    'tagli': [pezzo],
-                    'spazio_rimanente': barra_scelta - pezzo - self.spessore_lama,
-                    'num_tagli': 1,
-                    'sfrido': 0
-                }
-                barre_utilizzate.append(nuova_barra)
-
-        # Calcola lo sfrido per ogni barra
-        # Lo sfrido è lo spazio rimanente dopo l'ultimo pezzo
-        # Non si aggiunge lo spessore lama perché dopo l'ultimo pezzo non si taglia più
-        for barra in barre_utilizzate:
-            barra['sfrido'] = barra['spazio_rimanente']
+                        return 2  # Peggiore, scarto medio inutilizzabile
+
+                barra_scelta = min(barre_compatibili, key=priorita_scarto)
+                domanda.preleva(classe)
+                costruttore.aggiungi_tagli(barra_scelta, classe)
+                barra_scelta.spazio_rimanente -= (pezzo + spessore_lama)
+                continue
+
+            # Scegli barra che massimizza lo scarto finale riutilizzabile
+            barre_compatibili = [lung for lung in lunghezze_ord if pezzo <= lung]
+            if not barre_compatibili:
+                return None
+
+            domanda.preleva(classe)
+            migliore_barra = barre_compatibili[0]  # Default: prima barra compatibile
+            miglior_score = -float('inf')  # Score iniziale molto basso
+            migliori_prelievi = []  # Default: solo il pezzo corrente
+
+            for lung_barra in barre_compatibili:
+                prelievi, spazio_sim = domanda.riempi(lung_barra - pezzo - spessore_lama, spessore_lama)
+
+                # Score: privilegia scarti > 500mm
+                if spazio_sim > 500:
+                    score = spazio_sim  # Più lungo è meglio
+                else:
+                    score = -spazio_sim  # Più corto è meglio
+
+                if score > miglior_score:
+                    miglior_score = score
+                    migliore_barra = lung_barra
+                    migliori_prelievi = prelievi
+
+            domanda.applica(migliori_prelievi)
+            lunghezze = domanda.lunghezze
+            somma_pezzi = pezzo + sum(lunghezze[c] * q for c, q in migliori_prelievi)
+            num_pezzi = 1 + sum(q for _, q in migliori_prelievi)
+            spazio_rimanente = migliore_barra - somma_pezzi - num_pezzi * spessore_lama
+            aperte.append(costruttore.apri_barra(migliore_barra, spazio_rimanente,
+                                                 [(classe, 1)] + migliori_prelievi))
+
+        _conta(ricerche=ricerche, candidati_esaminati=candidati)
+        return self._crea_scenario(costruttore.piano(), lunghezze_catalogo, costi_barre)
+
+    def _crea_scenario(self, piano, lunghezze_catalogo, costi_barre):
+        """Crea un oggetto scenario da un PianoTaglio"""
+        # Conta fabbisogno
+        fabbisogno = {lung: 0 for lung in lunghezze_catalogo}
+        fabbisogno.update(piano.fabbisogno())
+
+        # Calcola spreco totale e scarti
+        spreco_totale = piano.sfrido_totale
+        scarti = piano.scarti()
+        scarti_utili = sum(p.sfrido * copie for p, copie in piano.voci if p.sfrido >= LUNGHEZZA_MINIMA_SCARTO)
+
+        # Calcola costo se fornito
+        costo_totale = None
+        if costi_barre:
+            costo_totale = sum(costi_barre.get(lung, 0) * qty for lung, qty in fabbisogno.items())
+
+        return {
+            'fabbisogno': fabbisogno,
+            'spreco_totale': spreco_totale,
+            'scarti': scarti,
+            'scarti_utili': scarti_utili,
+            'num_barre_totale': len(piano),
+            'num_pattern': piano.num_pattern,
+            'costo_totale': costo_totale,
+            'piano': piano
+        }
+
+
+def _ottimizza_profilo(profilo, pezzi, barre, spessore_lama):
+    """Ottimizza un singolo profilo di una commessa (eseguita nei processi del pool)
+
+    Returns:
+        Tupla (profilo, PianoTaglio) con i pattern assegnati al profilo
+    """
+    piano = OttimizzatoreTaglio(barre, spessore_lama).ottimizza(pezzi)
+    return profilo, PianoTaglio((pattern.con_profilo(profilo), copie) for pattern, copie in piano.voci)
+
+
+class Commessa:
+    """Commessa con più profili (materiali o sezioni), ognuno con pezzi, barre e lama propri
+
+    Ogni profilo è un problema indipendente: i profili vengono ottimizzati in
+    parallelo su un pool di processi e i piani uniti in un unico PianoTaglio,
+    in cui il profilo fa parte della chiave dei pattern. Il tempo totale è
+    circa quello del profilo più grande.
+    """
+
+    def __init__(self, spessore_lama=3.0):
+        """
+        Args:
+            spessore_lama: Spessore lama dei profili senza un valore specifico
+        """
+        self.spessore_lama = spessore_lama
+        self.pezzi = {}  # profilo -> [(quantità, lunghezza)]
+        self.barre = {}  # profilo -> [(quantità o None se illimitate, lunghezza)]
+        self.spessori_lama = {}  # profilo -> spessore lama
+        self.costi = {}  # (profilo, lunghezza) -> costo
+
+    def aggiungi_pezzi(self, profilo, quantita, lunghezza):
+        self.pezzi.setdefault(profilo, []).append((quantita, lunghezza))
+
+    def aggiungi_barre(self, profilo, quantita, lunghezza, costo=None):
+        """Aggiunge barre a un profilo (quantita None = barre da catalogo, illimitate)"""
+        self.barre.setdefault(profilo, []).append((quantita, lunghezza))
+        if costo is not None:
+            self.costi[(profilo, lunghezza)] = costo
+
+    def imposta_spessore_lama(self, profilo, spessore_lama):
+        self.spessori_lama[profilo] = spessore_lama
+
+    @property
+    def profili(self):
+        return sorted(self.pezzi)
+
+    @property
+    def num_pezzi(self):
+        return sum(q for pezzi in self.pezzi.values() for q, _ in pezzi)
+
+    def sottoproblemi(self):
+        """Argomenti di _ottimizza_profilo per ogni profilo, dal più grande al più piccolo
+
+        I profili più grandi partono per primi, così il pool resta bilanciato.
+        """
+        sottoproblemi = []
+        for profilo in self.profili:
+            pezzi = self.pezzi[profilo]
+            if profilo not in self.barre:
+                raise ValueError(f"Profilo {profilo}: nessuna barra disponibile")
+            num_pezzi = sum(q for q, _ in pezzi)
+            barre = [(num_pezzi if q is None else q, l) for q, l in self.barre[profilo]]
+            spessore_lama = self.spessori_lama.get(profilo, self.spessore_lama)
+            sottoproblemi.append((profilo, pezzi, barre, spessore_lama))
+        sottoproblemi.sort(key=lambda argomenti: sum(q for q, _ in argomenti[1]), reverse=True)
+        return sottoproblemi
+
+    def ottimizza(self, processi=None, progresso=None):
+        """Ottimizza tutti i profili e restituisce il piano unificato
+
+        Args:
+            processi: Numero massimo di processi (None = numero di CPU, 1 = nessun pool)
+            progresso: Callback opzionale progresso(profili_fatti, profili_totali)
+
+        Returns:
+            PianoTaglio con i pattern di tutti i profili
+
+        Raises:
+            ValueError: se un profilo non può essere tagliato con le sue barre
+        """
+        sottoproblemi = self.sottoproblemi()
+        totale = len(sottoproblemi)
+        voci = []
+
+        # Per commesse piccole l'avvio dei processi costa più del calcolo
+        if processi == 1 or totale < 2 or self.num_pezzi < SOGLIA_PEZZI_PARALLELO:
+            for fatti, argomenti in enumerate(sottoproblemi, 1):
+                try:
+                    _, piano = _ottimizza_profilo(*argomenti)
+                except ValueError as e:
+                    raise ValueError(f"Profilo {argomenti[0]}: {e}") from e
+                voci.extend(piano.voci)
+                if progresso is not None:
+                    progresso(fatti, totale)
+            return PianoTaglio(voci)
+
+        max_processi = min(processi or os.cpu_count() or 1, totale)
+        with ProcessPoolExecutor(max_workers=max_processi) as pool:
+            futuri = {pool.submit(_ottimizza_profilo, *argomenti): argomenti[0] for argomenti in sottoproblemi}
+            for fatti, futuro in enumerate(as_completed(futuri), 1):
+                try:
+                    _, piano = futuro.result()
+                except ValueError as e:
+                    for altro in futuri:
+                        altro.cancel()
+                    raise ValueError(f"Profilo {futuri[futuro]}: {e}") from e
+                voci.extend(piano.voci)
+                if progresso is not None:
+                    progresso(fatti, totale)
+        return PianoTaglio(voci)
+
+
+class OrdineTaglio:
+    """Ordine in coda da tagliare: pezzi richiesti e scadenza facoltativa"""
+    __slots__ = ('codice', 'pezzi', 'scadenza')
+
+    def __init__(self, codice, pezzi, scadenza=None):
+        """
+        Args:
+            codice: Codice dell'ordine, riportato su ogni taglio
+            pezzi: Lista di tuple (quantità, lunghezza)
+            scadenza: Giorni alla consegna (None = nessuna urgenza)
+        """
+        self.codice = codice
+        self.pezzi = list(pezzi)
+        self.scadenza = scadenza
+
+    def __repr__(self):
+        return f"OrdineTaglio({self.codice!r}, {self.num_pezzi} pezzi, scadenza={self.scadenza!r})"
+
+    @property
+    def num_pezzi(self):
+        return sum(q for q, _ in self.pezzi)
+
+    def chiave_urgenza(self):
+        """Prima le scadenze più vicine, gli ordini senza scadenza per ultimi"""
+        return (self.scadenza is None, self.scadenza or 0)
+
+
+def _pezzi_ordini(ordini):
+    """Domanda complessiva di più ordini: lista di tuple (quantità, lunghezza)"""
+    pezzi = {}
+    for ordine in ordini:
+        for quantita, lunghezza in ordine.pezzi:
+            pezzi[lunghezza] = pezzi.get(lunghezza, 0) + quantita
+    return [(q, l) for l, q in pezzi.items()]
+
+
+def attribuisci_ordini(sequenza, ordini):
+    """Assegna ogni taglio di una sequenza all'ordine da cui proviene
+
+    A parità di lunghezza i pezzi vanno prima agli ordini più urgenti, che
+    escono così dalle prime barre tagliate.
+
+    Args:
+        sequenza: SequenzaTaglio del piano del lotto
+        ordini: Ordini del lotto (OrdineTaglio)
+
+    Yields:
+        Per ogni barra, nell'ordine della sequenza, la coppia (tagli, codici):
+        i tagli nell'ordine di esecuzione e il codice ordine di ciascuno
+        (None per i pezzi non richiesti da nessun ordine)
+    """
+    code = {}  # lunghezza -> [posizione, [[codice, quantità residua], ...]]
+    for ordine in sorted(ordini, key=OrdineTaglio.chiave_urgenza):
+        for quantita, lunghezza in ordine.pezzi:
+            code.setdefault(lunghezza, [0, []])[1].append([ordine.codice, quantita])
+
+    def preleva(lunghezza):
+        coda = code.get(lunghezza)
+        if coda is None or coda[0] == len(coda[1]):
+            return None
+        voce = coda[1][coda[0]]
+        voce[1] -= 1
+        if voce[1] <= 0:
+            coda[0] += 1
+        return voce[0]
+
+    for _, copie, ordine_tagli in sequenza.passi:
+        for k in range(copie):
+            tagli = SequenzaTaglio.ordine_copia(ordine_tagli, k // sequenza.barre_per_fascio)
+            yield tagli, tuple(preleva(t) for t in tagli)
+
+
+def barre_per_ordine(sequenza, ordini):
+    """Numeri (1-based, nell'ordine della sequenza) delle barre che contengono pezzi di ogni ordine
+
+    Returns:
+        Dict {codice: lista crescente dei numeri di barra}
+    """
+    barre = {ordine.codice: [] for ordine in ordini}
+    for numero, (_, codici) in enumerate(attribuisci_ordini(sequenza, ordini), 1):
+        for codice in set(codici):
+            if codice is not None:
+                barre[codice].append(numero)
+    return barre
+
+
+def formatta_intervalli(numeri):
+    """Numeri crescenti in forma compatta, es. [1, 2, 3, 7] -> "1-3, 7" """
+    intervalli = []
+    for numero in numeri:
+        if intervalli and numero == intervalli[-1][1] + 1:
+            intervalli[-1][1] = numero
+        else:
+            intervalli.append([numero, numero])
+    return ", ".join(str(a) if a == b else f"{a}-{b}" for a, b in intervalli)
+
+
+def _riempi_sfridi(piano, ordini, spessore_lama):
+    """Inserisce negli sfridi di un piano gli ordini che vi trovano posto per intero
+
+    Gli ordini sono provati nell'ordine dato, i pezzi dal più lungo con
+    best fit sugli sfridi; un ordine entra solo se tutti i suoi pezzi trovano
+    posto. Il numero di barre del piano non cambia.
+
+    Returns:
+        Tupla (piano, ordini inseriti)
+    """
+    lunghezze = [l for ordine in ordini for q, l in ordine.pezzi if q > 0]
+    if not lunghezze:
+        return piano, list(ordini)
+    minimo = min(lunghezze)
+
+    barre = [[p.lunghezza, list(p.tagli), p.sfrido] for p in piano]
+    # Solo le barre con spazio per almeno un pezzo partecipano alla ricerca
+    liberi = sorted((b[2], i) for i, b in enumerate(barre) if b[2] >= minimo)
+    inseriti = []
+
+    for ordine in ordini:
+        prova = list(liberi)
+        aggiunte = []
+        for quantita, lunghezza in sorted(ordine.pezzi, key=lambda p: p[1], reverse=True):
+            for _ in range(quantita):
+                posizione = bisect.bisect_left(prova, (lunghezza, -1))
+                if posizione == len(prova):
+                    break
+                spazio, i = prova.pop(posizione)
+                aggiunte.append((i, lunghezza))
+                spazio -= lunghezza + spessore_lama
+                if spazio >= minimo:
+                    bisect.insort(prova, (spazio, i))
+            else:
+                continue
+            break
+        else:
+            liberi = prova
+            for i, lunghezza in aggiunte:
+                barre[i][1].append(lunghezza)
+                barre[i][2] -= lunghezza + spessore_lama
+            inseriti.append(ordine)
+
+    if not any(ordine.pezzi for ordine in inseriti):
+        return piano, inseriti
+    return PianoTaglio.da_barre(barre), inseriti
+
+
+class PianoLotto:
+    """Risultato di LottoOrdini.pianifica"""
+    __slots__ = ('piano', 'inclusi', 'rinviati', 'barre_separate', 'lunghezza_separata')
+
+    def __init__(self, piano, inclusi, rinviati, barre_separate=None, lunghezza_separata=None):
+        """
+        Args:
+            piano: PianoTaglio dell'intero lotto
+            inclusi: Ordini tagliati nel lotto, dal più urgente
+            rinviati: Ordini lasciati in coda dall'orizzonte
+            barre_separate: Barre necessarie ottimizzando gli ordini inclusi uno alla volta
+            lunghezza_separata: Materiale (mm) necessario ottimizzando gli ordini uno alla volta
+        """
+        self.piano = piano
+        self.inclusi = inclusi
+        self.rinviati = rinviati
+        self.barre_separate = barre_separate
+        self.lunghezza_separata = lunghezza_separata
+
+    @property
+    def barre_risparmiate(self):
+        if self.barre_separate is None:
+            return None
+        return self.barre_separate - len(self.piano)
+
+
+class LottoOrdini:
+    """Ottimizzazione congiunta degli ordini in coda per lo stesso profilo
+
+    Ottimizzati uno alla volta, gli ordini piccoli lasciano ognuno una barra
+    parzialmente usata; in un lotto condividono le barre. Il lotto usa lo
+    stesso motore dell'interfaccia: OttimizzatoreTaglio con le barre in
+    magazzino oppure GeneratoreScenari con le lunghezze di catalogo.
+    Con un orizzonte gli ordini poco urgenti entrano nel lotto solo se trovano
+    posto negli sfridi delle barre comunque necessarie, altrimenti restano in
+    coda per un lotto successivo.
+    """
+
+    def __init__(self, spessore_lama=3.0, barre_disponibili=None, lunghezze_catalogo=None, costi_barre=None):
+        """
+        Args:
+            spessore_lama: Spessore della lama in mm
+            barre_disponibili: Lista di tuple (quantità, lunghezza) delle barre in magazzino
+            lunghezze_catalogo: Lunghezze acquistabili (usate se non ci sono barre disponibili)
+            costi_barre: Dict opzionale {lunghezza: costo}; in modalità catalogo sceglie
+                lo scenario più economico invece di quello con meno sfrido
+        """
+        if not barre_disponibili and not lunghezze_catalogo:
+            raise ValueError("Servono barre disponibili o lunghezze di catalogo")
+        self.spessore_lama = spessore_lama
+        self.barre_disponibili = list(barre_disponibili or [])
+        self.lunghezze_catalogo = list(lunghezze_catalogo or [])
+        self.costi_barre = costi_barre or {}
+        self.ordini = []
+
+    def aggiungi(self, ordine):
+        self.ordini.append(ordine)
+
+    @property
+    def num_pezzi(self):
+        return sum(ordine.num_pezzi for ordine in self.ordini)
+
+    def _ottimizza(self, pezzi):
+        if self.barre_disponibili:
+            return OttimizzatoreTaglio(self.barre_disponibili, self.spessore_lama).ottimizza(pezzi)
+        scenari = GeneratoreScenari().genera_tutti_scenari(pezzi, self.lunghezze_catalogo, self.spessore_lama,
+                                                           self.costi_barre)
+        if not scenari:
+            raise ValueError("Nessuno scenario valido con le lunghezze di catalogo")
+        if self.costi_barre:
+            return min(scenari, key=lambda s: s['costo_totale'])['piano']
+        return scenari[0]['piano']
+
+    @_misurato("lotto")
+    def pianifica(self, orizzonte=None, confronta=True, progresso=None):
+        """Ottimizza il lotto e restituisce il piano con gli ordini inclusi e rinviati
+
+        Args:
+            orizzonte: Giorni entro cui gli ordini vanno tagliati in ogni caso;
+                gli altri entrano solo negli sfridi (None = tutti gli ordini)
+            confronta: Se True ottimizza anche ogni ordine incluso da solo,
+                per misurare il risparmio del lotto
+            progresso: Callback opzionale progresso(ordini_confrontati, ordini_inclusi)
+
+        Returns:
+            PianoLotto
+
+        Raises:
+            ValueError: se i pezzi obbligatori non possono essere tagliati con le barre date
+        """
+        ordini = sorted(self.ordini, key=OrdineTaglio.chiave_urgenza)
+        if orizzonte is None:
+            obbligatori, facoltativi = ordini, []
+        else:
+            obbligatori = [o for o in ordini if o.scadenza is not None and o.scadenza <= orizzonte]
+            facoltativi = [o for o in ordini if o.scadenza is None or o.scadenza > orizzonte]
+        if not obbligatori:
+            return PianoLotto(PianoTaglio(), [], facoltativi, 0, 0)
+
+        piano = self._ottimizza(_pezzi_ordini(obbligatori))
+        piano, aggiunti = _riempi_sfridi(piano, facoltativi, self.spessore_lama)
+        inclusi = sorted(obbligatori + aggiunti, key=OrdineTaglio.chiave_urgenza)
+        if aggiunti:
+            # Il lotto riottimizzato per intero può usare meno materiale del riempimento
+            try:
+                congiunto = self._ottimizza(_pezzi_ordini(inclusi))
+                if congiunto.lunghezza_totale < piano.lunghezza_totale:
+                    piano = congiunto
+            except ValueError:
+                pass
+        scelti = {id(o) for o in aggiunti}
+        rinviati = [o for o in facoltativi if id(o) not in scelti]
+
+        barre_separate = lunghezza_separata = None
+        if confronta:
+            barre_separate = lunghezza_separata = 0
+            for fatti, ordine in enumerate(inclusi, 1):
+                if ordine.pezzi:
+                    separato = self._ottimizza(ordine.pezzi)
+                    barre_separate += len(separato)
+                    lunghezza_separata += separato.lunghezza_totale
+                if progresso is not None:
+                    progresso(fatti, len(inclusi))
+        return PianoLotto(piano, inclusi, rinviati, barre_separate, lunghezza_separata)
+
+
+def _scenari_confronto(pezzi, lunghezze_catalogo, spessore_lama, peso_pattern):
+    """Piani degli scenari per un catalogo e uno spessore lama (eseguita nei processi del pool)
+
+    Gli scenari si calcolano senza prezzi e si riprezzano per ogni listino, quindi
+    non si scartano quelli dominati: uno scenario con più sfrido può essere il
+    più economico con un listino.
+
+    Returns:
+        Lista dei PianoTaglio degli scenari, per sfrido crescente
+    """
+    scenari = GeneratoreScenari().genera_tutti_scenari(pezzi, list(lunghezze_catalogo), spessore_lama,
+                                                       None, peso_pattern, pareto=False)
+    return [scenario['piano'] for scenario in scenari]
+
+
+def _costo_piano(piano, costi_barre):
+    """Costo delle barre di un piano, None se una lunghezza usata non ha prezzo nel listino"""
+    costo = 0
+    for lunghezza, quantita in piano.fabbisogno().items():
+        if lunghezza not in costi_barre:
+            return None
+        costo += costi_barre[lunghezza] * quantita
+    return costo
+
+
+def confronta_parametri(pezzi_richiesti, spessori_lama, cataloghi, listini=None, peso_pattern=0,
+                        processi=None, progresso=None):
+    """Analisi what-if: il miglior scenario per ogni combinazione di lama, catalogo e listino
+
+    I piani non dipendono dai prezzi: gli scenari si calcolano una sola volta
+    per ogni coppia (spessore lama, catalogo), in parallelo su un pool di
+    processi, e si riprezzano per ogni listino. Le combinazioni ripetute
+    riusano i piani già calcolati e i cataloghi in cui il pezzo più lungo non
+    entra non vengono calcolati; anche il limite inferiore si calcola una
+    volta per coppia.
+
+    Args:
+        pezzi_richiesti: Lista di tuple (quantità, lunghezza)
+        spessori_lama: Spessori lama da provare
+        cataloghi: Insiemi di lunghezze di catalogo da provare
+        listini: Lista opzionale di coppie (nome, {lunghezza: costo})
+        peso_pattern: Costo di un pattern distinto in barre (vedi riduci_pattern)
+        processi: Numero massimo di processi (None = numero di CPU, 1 = nessun pool)
+        progresso: Callback opzionale progresso(calcoli_fatti, calcoli_totali)
+
+    Returns:
+        Lista di dict nell'ordine della griglia (lama, catalogo, listino) con chiavi
+        spessore_lama, catalogo (tupla crescente), listino (nome o None), fattibile,
+        barre, limite_inferiore, sfrido, efficienza, num_pattern, costo e piano. Il
+        piano è lo scenario più economico se c'è un listino, altrimenti quello con
+        meno sfrido; costo è None se il listino non ha il prezzo di una lunghezza
+        usata. Le combinazioni non fattibili hanno i valori a None.
+    """
+    listini = list(listini or [(None, None)])
+    pezzo_max = max((l for q, l in pezzi_richiesti if q > 0), default=0)
+    num_pezzi = sum(q for q, _ in pezzi_richiesti)
+
+    griglia = [(float(lama), tuple(sorted(set(catalogo)))) for lama in spessori_lama for catalogo in cataloghi]
+    calcoli = [chiave for chiave in dict.fromkeys(griglia) if chiave[1] and chiave[1][-1] >= pezzo_max]
+    # Le coppie più costose (più lunghezze di catalogo) partono per prime
+    calcoli.sort(key=lambda chiave: len(chiave[1]), reverse=True)
+    totale = len(calcoli)
+    piani = {}  # (lama, catalogo) -> piani degli scenari
+
+    if processi == 1 or totale < 2 or num_pezzi * totale < SOGLIA_PEZZI_PARALLELO:
+        for fatti, (lama, catalogo) in enumerate(calcoli, 1):
+            try:
+                piani[(lama, catalogo)] = _scenari_confronto(pezzi_richiesti, catalogo, lama, peso_pattern)
+            except ValueError:
+                piani[(lama, catalogo)] = []
+            if progresso is not None:
+                progresso(fatti, totale)
+    else:
+        max_processi = min(processi or os.cpu_count() or 1, totale)
+        with ProcessPoolExecutor(max_workers=max_processi) as pool:
+            futuri = {pool.submit(_scenari_confronto, pezzi_richiesti, catalogo, lama, peso_pattern): (lama, catalogo)
+                      for lama, catalogo in calcoli}
+            for fatti, futuro in enumerate(as_completed(futuri), 1):
+                try:
+                    piani[futuri[futuro]] = futuro.result()
+                except ValueError:
+                    piani[futuri[futuro]] = []
+                if progresso is not None:
+                    progresso(fatti, totale)
+
+    limiti = {chiave: limite_inferiore_barre(pezzi_richiesti, chiave[1][-1], chiave[0]) for chiave in piani}
+    righe = []
+    for lama, catalogo in griglia:
+        scenari = piani.get((lama, catalogo))
+        for nome, costi in listini:
+            riga = {'spessore_lama': lama, 'catalogo': catalogo, 'listino': nome, 'fattibile': bool(scenari),
+                    'barre': None, 'limite_inferiore': None, 'sfrido': None, 'efficienza': None,
+                    'num_pattern': None, 'costo': None, 'piano': None}
+            righe.append(riga)
+            if not scenari:
+                continue
+            piano = scenari[0]
+            if costi:
+                # Scenario più economico; a parità (o senza prezzi) quello con meno sfrido
+                piano = min(scenari, key=lambda p: (_costo_piano(p, costi) is None, _costo_piano(p, costi) or 0))
+            riga.update(barre=len(piano), limite_inferiore=limiti[(lama, catalogo)],
+                        sfrido=piano.sfrido_totale, efficienza=piano.efficienza,
+                        num_pattern=piano.num_pattern, piano=piano,
+                        costo=_costo_piano(piano, costi) if costi else None)
+    return righe
+
+
+def formatta_confronto(righe):
+    """Tabella di testo delle righe di confronta_parametri"""
+    testo = [f"  {'Lama':>6}  {'Catalogo':<28}{'Listino':<16}{'Barre':>8}{'Lim.inf.':>9}"
+             f"{'Sfrido (mm)':>13}{'Eff. %':>8}{'Pattern':>9}{'Costo':>12}"]
+    for r in righe:
+        catalogo = "+".join(str(int(l)) for l in r['catalogo'])
+        inizio = f"  {r['spessore_lama']:>6.1f}  {catalogo:<28}{(r['listino'] or '-'):<16}"
+        if not r['fattibile']:
+            testo.append(inizio + f"{'non fattibile':>13}")
+            continue
+        costo = f"{r['costo']:>12.2f}" if r['costo'] is not None else f"{'-':>12}"
+        testo.append(inizio + f"{r['barre']:>8}{r['limite_inferiore']:>9}{r['sfrido']:>13.0f}"
+                              f"{r['efficienza']:>8.2f}{r['num_pattern']:>9}" + costo)
+    return "\n".join(testo)
+
+
+# Motori messi in corsa di default da corsa_motori
+MOTORI_CORSA = ("ottimizza", "scenari", "genetico")
+
+def _esegui_motore_corsa(motore, pezzi, barre, spessore_lama, scadenza, limite, canali, seme=None):
+    """Esegue un motore della corsa pubblicando ogni piano migliore (eseguita in un processo dedicato)
+
+    Ogni piano che migliora quello del motore (meno barre, poi meno sfrido) va
+    nella coda come (motore, piano, secondi); alla fine il motore pubblica
+    (motore, None, errore). Un piano che raggiunge il limite inferiore imposta
+    l'evento di interruzione, che i motori controllano tra un passo e l'altro.
+    Ogni motore riceve la scadenza: le ripartenze e le strategie degli scenari
+    non partono se non finirebbero entro la scadenza e il genetico divide il
+    tempo rimasto tra le epoche.
+
+    Args:
+        motore: Nome del motore (vedi MOTORI_CORSA)
+        scadenza: Istante di fine (time.time())
+        limite: Limite inferiore delle barre
+        canali: Coppia (evento di interruzione, coda dei piani pubblicati)
+    """
+    interrompi, incumbenti = canali
+    inizio = time.time()
+    migliore = None
+    errore = None
+
+    def pubblica(piano):
+        nonlocal migliore
+        chiave = (len(piano), piano.sfrido_totale)
+        if migliore is None or chiave < migliore:
+            migliore = chiave
+            incumbenti.put((motore, piano, time.time() - inizio))
+            if len(piano) <= limite:
+                interrompi.set()
+
+    try:
+        if motore == "ottimizza":
+            # Ripartenze di OttimizzatoreTaglio, che ordina i pezzi con variazioni casuali
+            ottimizzatore = OttimizzatoreTaglio(barre, spessore_lama)
+            pubblica(ottimizzatore.ottimizza(pezzi))
+            # Una ripartenza parte solo se, lunga quanto la precedente, finisce entro la scadenza
+            durata = time.time() - inizio
+            while not interrompi.is_set() and time.time() + durata < scadenza:
+                partenza = time.time()
+                pubblica(ottimizzatore.ottimizza(pezzi))
+                durata = time.time() - partenza
+        elif motore == "scenari":
+            pool = {}
+            for qty, lunghezza in barre:
+                pool[lunghezza] = pool.get(lunghezza, 0) + qty
+            fine = time.perf_counter() + max(0.0, scadenza - time.time())
+            for scenario in GeneratoreScenari().genera_tutti_scenari(pezzi, sorted(pool), spessore_lama,
+                                                                     scadenza=fine):
+                # Gli scenari comprano dal catalogo: valgono solo se le barre disponibili bastano
+                if all(q <= pool[l] for l, q in scenario['fabbisogno'].items()):
+                    pubblica(scenario['piano'])
+        elif motore == "genetico":
+            genetico = OttimizzatoreGenetico(barre, spessore_lama, isole=2, tempo=max(0.0, scadenza - time.time()),
+                                             seme=seme, processi=1)
+            pubblica(genetico.ottimizza(pezzi, interrompi=interrompi, incumbente=pubblica))
+        else:
+            raise ValueError(f"Motore sconosciuto: {motore}")
+    except ValueError as e:
+        errore = str(e)
+    finally:
+        incumbenti.put((motore, None, errore))
+
+
+class EsitoCorsa:
+    """Risultato di corsa_motori"""
+    __slots__ = ('piano', 'motore', 'limite_inferiore', 'secondi', 'esiti')
+
+    def __init__(self, piano, motore, limite_inferiore, secondi, esiti):
+        """
+        Args:
+            piano: Miglior PianoTaglio trovato
+            motore: Nome del motore che l'ha trovato
+            limite_inferiore: Limite inferiore delle barre (materiale e pezzi per barra)
+            secondi: Secondi dall'inizio della corsa al ritrovamento del piano
+            esiti: Dict {motore: {'barre', 'secondi', 'concluso', 'errore'}} con il miglior
+                risultato di ogni motore (barre None se non ha prodotto piani)
+        """
+        self.piano = piano
+        self.motore = motore
+        self.limite_inferiore = limite_inferiore
+        self.secondi = secondi
+        self.esiti = esiti
+
+    @property
+    def ottimo(self):
+        """True se il piano raggiunge il limite inferiore: nessun motore può fare meglio"""
+        return len(self.piano) <= self.limite_inferiore
+
+
+@_misurato("corsa")
+def corsa_motori(pezzi_richiesti, barre_disponibili, spessore_lama, motori=MOTORI_CORSA, tempo=30.0,
+                 seme=None, processi=None, progresso=None):
+    """Portafoglio di motori in gara sulla stessa istanza: vince il piano migliore
+
+    Ordini di forma diversa favoriscono motori diversi: i motori partono in
+    parallelo su un pool di processi e pubblicano ogni piano migliore su una
+    coda comune, dove si tiene il migliore (meno barre, poi meno sfrido). Al
+    primo piano che raggiunge il limite inferiore o allo scadere del tempo la
+    corsa finisce: ogni motore ha un processo dedicato e quelli ancora in corso
+    vengono terminati. Con un solo processo i motori si eseguono in sequenza
+    dividendosi il tempo rimasto; ognuno riceve la propria scadenza e la
+    rispetta a meno di un passo (una ripartenza, una strategia degli scenari o
+    una decodifica del genetico), che ha sempre modo di produrre un piano.
+
+    Args:
+        pezzi_richiesti: Lista di tuple (quantità, lunghezza)
+        barre_disponibili: Lista di tuple (quantità, lunghezza) delle barre disponibili
+        spessore_lama: Spessore della lama in mm
+        motori: Nomi dei motori in gara (vedi MOTORI_CORSA)
+        tempo: Tempo massimo in secondi
+        seme: Seme del motore genetico (None = casuale)
+        processi: Numero massimo di processi (None = numero di CPU, 1 = nessun pool)
+        progresso: Callback opzionale progresso(motori_conclusi, motori_totali)
+
+    Returns:
+        EsitoCorsa con il piano migliore e il motore che l'ha trovato
+
+    Raises:
+        ValueError: se nessun motore produce un piano (con l'errore del primo motore)
+    """
+    pezzi = [(q, l) for q, l in pezzi_richiesti if q > 0]
+    motori = list(dict.fromkeys(motori))
+    if not pezzi:
+        return EsitoCorsa(PianoTaglio(), None, 0, 0.0, {})
+    barra_max = max((l for q, l in barre_disponibili if q > 0), default=0)
+    limite = max(limite_inferiore_barre(pezzi, barra_max, spessore_lama),
+                 _limite_cardinalita(pezzi, barra_max, spessore_lama))
+    inizio = time.time()
+    scadenza = inizio + tempo
+    esiti = {motore: {'barre': None, 'secondi': None, 'concluso': False, 'errore': None} for motore in motori}
+    migliore = None  # (chiave, motore, piano, secondi)
+    conclusi = 0
+    pubblicati = 0
+
+    def ricevi(motore, piano, dato):
+        """Registra un messaggio della coda; True se la corsa è finita"""
+        nonlocal migliore, conclusi, pubblicati
+        if piano is None:
+            esiti[motore]['concluso'] = True
+            esiti[motore]['errore'] = dato
+            conclusi += 1
+            if progresso is not None:
+                progresso(conclusi, len(motori))
+        else:
+            pubblicati += 1
+            esiti[motore]['barre'] = len(piano)
+            esiti[motore]['secondi'] = round(dato, 3)
+            chiave = (len(piano), piano.sfrido_totale)
+            if migliore is None or chiave < migliore[0]:
+                migliore = (chiave, motore, piano, time.time() - inizio)
+        return conclusi == len(motori) or (migliore is not None and migliore[0][0] <= limite)
+
+    paralleli = 1 if processi == 1 else min(processi or os.cpu_count() or 1, len(motori))
+    if paralleli > 1:
+        # Un processo per motore invece di un pool: allo scadere i motori in corso si terminano
+        contesto = multiprocessing.get_context()
+        interrompi, incumbenti = contesto.Event(), contesto.Queue()
+        in_attesa = list(motori)
+        avviati = []
+
+        def avvia():
+            processo = contesto.Process(target=_esegui_motore_corsa, daemon=True,
+                                        args=(in_attesa.pop(0), pezzi, barre_disponibili, spessore_lama,
+                                              scadenza, limite, (interrompi, incumbenti), seme))
+            processo.start()
+            avviati.append(processo)
+
+        try:
+            for _ in range(paralleli):
+                avvia()
+            while True:
+                try:
+                    messaggio = incumbenti.get(timeout=max(0.0, scadenza - time.time()))
+                except queue.Empty:
+                    break
+                if ricevi(*messaggio):
+                    break
+                if messaggio[1] is None and in_attesa:
+                    avvia()
+        finally:
+            interrompi.set()
+            # Il risultato c'è già: i motori ancora in corso non si aspettano
+            for processo in avviati:
+                if processo.is_alive():
+                    processo.terminate()
+            for processo in avviati:
+                processo.join()
+    else:
+        interrompi, incumbenti = threading.Event(), queue.Queue()
+        for k, motore in enumerate(motori):
+            rimasto = scadenza - time.time()
+            if rimasto <= 0 or interrompi.is_set():
+                break
+            _esegui_motore_corsa(motore, pezzi, barre_disponibili, spessore_lama,
+                                 time.time() + rimasto / (len(motori) - k), limite,
+                                 (interrompi, incumbenti), seme)
+            finita = False
+            while not incumbenti.empty():
+                finita = ricevi(*incumbenti.get())
+            if finita:
+                break
+
+    _conta(piani_pubblicati=pubblicati)
+    if migliore is None:
+        errori = [esiti[motore]['errore'] for motore in motori if esiti[motore]['errore']]
+        raise ValueError(errori[0] if errori else "Nessun motore ha prodotto un piano entro il tempo")
+    _, motore, piano, secondi = migliore
+    return EsitoCorsa(piano, motore, limite, round(secondi, 3), esiti)
+
+
+# Lunghezze candidate di default per la scelta delle barre da tenere a magazzino (mm)
+LUNGHEZZE_CANDIDATE = tuple(range(3000, 7501, 250))
+
+
+def _riempimenti_possibili(pezzi, spessore_lama, capacita_massima):
+    """Ingombri Σ(p + λ) realizzabili in una barra, come bitset (bit i = ingombro i mm)
+
+    Programmazione dinamica subset-sum su un intero Python usato come bitset,
+    con le quantità spezzate in potenze di due. Gli ingombri non interi sono
+    arrotondati per difetto.
+
+    Returns:
+        Tupla (bitset, tolleranza): con ingombri non interi il riempimento vero
+        può superare quello del bitset al più della tolleranza (mm)
+    """
+    maschera = (1 << (capacita_massima + 1)) - 1
+    raggiungibili = 1
+    pezzo_minimo = None
+    interi = True
+    for quantita, lunghezza in pezzi:
+        ingombro = lunghezza + spessore_lama
+        peso = int(ingombro)
+        interi = interi and peso == ingombro
+        if peso <= 0 or peso > capacita_massima:
+            continue
+        pezzo_minimo = peso if pezzo_minimo is None else min(pezzo_minimo, peso)
+        # Oltre capacita // peso copie non entrano comunque in una barra
+        rimanenti = min(quantita, capacita_massima // peso)
+        blocco = 1
+        while rimanenti > 0:
+            copie = min(blocco, rimanenti)
+            raggiungibili |= (raggiungibili << (peso * copie)) & maschera
+            rimanenti -= copie
+            blocco *= 2
+    tolleranza = 0 if interi or pezzo_minimo is None else capacita_massima // pezzo_minimo + 1
+    return raggiungibili, tolleranza
+
+
+def raccomanda_lunghezze(ordini, spessore_lama, candidate=LUNGHEZZE_CANDIDATE, max_lunghezze=2,
+                         costo_metro=1.0, costo_barra=0.0, migliori=10, attuale=None, progresso=None):
+    """Sceglie le lunghezze di barra da tenere a magazzino sullo storico degli ordini
+
+    Ogni insieme di al più max_lunghezze lunghezze candidate è valutato
+    tagliando tutti gli ordini dello storico con la strategia greedy degli
+    scenari; il costo è costo_metro per metro di barra acquistata più
+    costo_barra per barra (con i default: i metri acquistati, cioè lo sfrido).
+
+    Per ogni ordine e lunghezza L un subset-sum su bitset dà il miglior
+    riempimento possibile di una barra, quindi un costo minimo per mm di
+    pezzi; il limite inferiore di un insieme è la somma sugli ordini del
+    minimo tra le sue lunghezze. Gli insiemi si valutano per limite crescente
+    e la ricerca si ferma quando il limite supera il peggiore tra i migliori
+    richiesti, ma questo esclude pochi insiemi: lo sfrido della strategia
+    greedy (qualche punto percentuale sopra il limite) supera di solito la
+    differenza tra un insieme e l'altro. Il risparmio viene dall'interruzione:
+    la valutazione di un insieme si ferma appena costo parziale più limite
+    degli ordini rimanenti supera il peggiore tra i migliori (circa il 40% del
+    tempo su uno storico di 600 ordini). Il tempo resta proporzionale a
+    insiemi × ordini: con le 19 candidate di default sono circa 190 insiemi con
+    max_lunghezze=2 (alcuni secondi per 600 ordini) e circa 1160 con 3 (decine di
+    secondi). Gli ordini con la stessa domanda sono valutati una volta sola,
+    con il loro peso.
+
+    Args:
+        ordini: Storico degli ordini (OrdineTaglio)
+        spessore_lama: Spessore della lama in mm
+        candidate: Lunghezze candidate in mm
+        max_lunghezze: Numero massimo di lunghezze a magazzino
+        costo_metro: Costo di un metro di barra
+        costo_barra: Costo fisso per barra (movimentazione, taglio)
+        migliori: Quanti insiemi restituire
+        attuale: Catalogo attuale da valutare per confronto (facoltativo)
+        progresso: Callback opzionale progresso(insiemi_considerati, insiemi_totali)
+
+    Returns:
+        Tupla (classifica, attuale, statistiche): classifica è la lista dei
+        migliori insiemi per costo crescente, ognuno un dict con lunghezze,
+        costo, costo_medio (per ordine), barre, sfrido e limite_inferiore;
+        attuale è lo stesso dict per il catalogo attuale (o None);
+        statistiche conta insiemi totali, valutati e interrotti
+
+    Raises:
+        ValueError: se nessuna lunghezza candidata contiene il pezzo più lungo
+    """
+    # Ordini con la stessa domanda si valutano una volta sola
+    domande = {}
+    for ordine in ordini:
+        chiave = tuple(sorted((l, q) for q, l in _pezzi_ordini([ordine]) if q > 0))
+        if chiave:
+            domande[chiave] = domande.get(chiave, 0) + 1
+    if not domande:
+        raise ValueError("Nessun ordine con pezzi nello storico")
+
+    candidate = sorted(set(candidate) | set(attuale or ()))
+    pezzo_max = max(chiave[-1][0] for chiave in domande)
+    capacita_massima = int(candidate[-1] + spessore_lama)
+
+    def costo_barre(lunghezza, barre):
+        return costo_metro * lunghezza / 1000 + costo_barra * barre
+
+    # Per ogni domanda: pezzi, peso, ingombro totale e miglior riempimento di una barra per lunghezza
+    gruppi = []
+    for chiave, peso in domande.items():
+        pezzi = [(q, l) for l, q in chiave]
+        ingombro = sum(q * (l + spessore_lama) for q, l in pezzi)
+        bitset, tolleranza = _riempimenti_possibili(pezzi, spessore_lama, capacita_massima)
+        riempimenti = {}
+        for lunghezza in candidate:
+            capacita = lunghezza + spessore_lama
+            riempimento = (bitset & ((1 << (int(capacita) + 1)) - 1)).bit_length() - 1
+            riempimenti[lunghezza] = min(capacita, riempimento + tolleranza)
+        gruppi.append((pezzi, peso, ingombro, riempimenti))
+    # Prima le domande più pesanti: l'interruzione anticipata scatta prima
+    gruppi.sort(key=lambda g: g[1] * g[2], reverse=True)
+
+    def limiti_gruppi(lunghezze):
+        """Limite inferiore del costo di ogni domanda con le lunghezze date
+
+        Il maggiore tra: ingombro per il minimo costo per mm di riempimento, e
+        barre minime (ingombro / miglior riempimento) per la barra usabile più economica.
+        """
+        limiti = []
+        for _, peso, ingombro, riempimenti in gruppi:
+            usabili = [l for l in lunghezze if riempimenti[l] > 0]
+            per_mm = min(costo_barre(l, 1) / riempimenti[l] for l in usabili)
+            barre_minime = -(-ingombro // max(riempimenti[l] for l in usabili))
+            limiti.append(peso * max(ingombro * per_mm, barre_minime * min(costo_barre(l, 1) for l in usabili)))
+        return limiti
+
+    generatore = GeneratoreScenari()
+
+    def valuta(lunghezze, soglia=float('inf')):
+        """Costo dello storico con le lunghezze date, None se supera la soglia"""
+        limiti = limiti_gruppi(lunghezze)
+        residuo = sum(limiti)
+        costo = barre = sfrido = 0
+        for (pezzi, peso, _, _), limite in zip(gruppi, limiti):
+            residuo -= limite
+            piano = generatore._calcola_scenario_greedy(_DomandaPezzi(pezzi), list(lunghezze),
+                                                        spessore_lama, None)['piano']
+            costo += peso * costo_barre(piano.lunghezza_totale, len(piano))
+            barre += peso * len(piano)
+            sfrido += peso * piano.sfrido_totale
+            if costo + residuo > soglia:
+                return None
+        return {'lunghezze': tuple(lunghezze), 'costo': costo, 'costo_medio': costo / len(ordini),
+                'barre': barre, 'sfrido': sfrido, 'limite_inferiore': sum(limiti)}
+
+    insiemi = []
+    for k in range(1, max_lunghezze + 1):
+        for lunghezze in itertools.combinations(candidate, k):
+            if lunghezze[-1] >= pezzo_max:
+                insiemi.append((sum(limiti_gruppi(lunghezze)), lunghezze))
+    if not insiemi:
+        raise ValueError(f"Nessuna lunghezza candidata contiene il pezzo più lungo ({pezzo_max}mm)")
+    insiemi.sort()
+
+    # Min-heap dei migliori come (-costo, progressivo, risultato): in cima il peggiore tenuto
+    classifica = []
+    valutati = interrotti = 0
+    for considerati, (limite, lunghezze) in enumerate(insiemi, 1):
+        soglia = -classifica[0][0] if len(classifica) >= migliori else float('inf')
+        if limite >= soglia:
+            break
+        risultato = valuta(lunghezze, soglia)
+        valutati += 1
+        if risultato is None:
+            interrotti += 1
+        elif len(classifica) < migliori:
+            heapq.heappush(classifica, (-risultato['costo'], considerati, risultato))
+        else:
+            heapq.heapreplace(classifica, (-risultato['costo'], considerati, risultato))
+        if progresso is not None:
+            progresso(considerati, len(insiemi))
+
+    risultato_attuale = None
+    if attuale:
+        attuale = tuple(sorted(set(attuale)))
+        if attuale[-1] >= pezzo_max:
+            risultato_attuale = valuta(attuale)
+
+    statistiche = {'insiemi': len(insiemi), 'valutati': valutati, 'interrotti': interrotti,
+                   'ordini': len(ordini), 'domande_distinte': len(gruppi)}
+    return ([voce[2] for voce in sorted(classifica, key=lambda v: -v[0])], risultato_attuale, statistiche)
+
+
+# Fogli cercati durante l'importazione, in ordine di preferenza
+FOGLI_BARRE = ["Barre", "Magazzino", "Barre Disponibili", "Disponibili"]
+FOGLI_PEZZI = ["Pezzi", "Tagli", "Pezzi Richiesti", "Lista Tagli"]
+FOGLI_PROFILI = ["Profili", "Materiali"]
+FOGLI_ORDINI = ["Ordini", "Coda Ordini"]
+
+# Sotto questo numero di pezzi una commessa multi-profilo viene ottimizzata
+# senza pool di processi (l'avvio dei processi costerebbe più del calcolo)
+SOGLIA_PEZZI_PARALLELO = 20000
+
+# Ogni quante righe lette viene notificato l'avanzamento dell'importazione
+PASSO_PROGRESSO_IMPORT = 2000
+
+# Righe della tabella di taglio per ogni blocco del PDF (circa una pagina A4)
+RIGHE_PER_BLOCCO_PDF = 40
+# Con gli schemi grafici ogni riga è più alta: meno righe per blocco
+RIGHE_PER_BLOCCO_PDF_SCHEMI = 18
+
+# Ogni quante barre scritte viene notificato l'avanzamento dell'esportazione Excel
+PASSO_PROGRESSO_EXCEL = 5000
+
+# Cartella dei dati locali dell'applicazione (storico esecuzioni, ...)
+CARTELLA_DATI = os.path.join(os.path.expanduser("~"), ".ottimizzatore_taglio")
+FILE_STORICO = os.path.join(CARTELLA_DATI, "storico.sqlite3")
+FILE_SCARTI = os.path.join(CARTELLA_DATI, "scarti.sqlite3")
+
+# Lunghezza minima perché uno sfrido venga conservato come scarto riutilizzabile
+LUNGHEZZA_MINIMA_SCARTO = 500
+
+# Classi di dimensione (numero di pezzi) usate nel rapporto dello storico
+CLASSI_DIMENSIONE = ((1000, "< 1k"), (10000, "1k-10k"), (100000, "10k-100k"), (float('inf'), ">= 100k"))
+
+# Criteri di filtro disponibili nella tabella risultati
+FILTRO_PEZZO = "Contiene pezzo (mm)"
+FILTRO_LUNGHEZZA = "Lunghezza barra (mm)"
+FILTRO_SFRIDO = "Sfrido minimo (mm)"
+FILTRI_RISULTATI = (FILTRO_PEZZO, FILTRO_LUNGHEZZA, FILTRO_SFRIDO)
+
+# Intestazioni della tabella risultati (colonna, testo, larghezza)
+COLONNE_RISULTATI = (
+    ("Barra", "Barra #", 110),
+    ("Lunghezza", "Lung. Barra", 100),
+    ("Tagli", "Tagli (mm)", 400),
+    ("Num Tagli", "N° Tagli", 80),
+    ("Sfrido", "Sfrido (mm)", 100),
+)
+
+
+def _apri_foglio(filename, nomi_fogli):
+    """Apre un file Excel in sola lettura e restituisce (workbook, foglio)
+
+    Args:
+        filename: Percorso del file Excel
+        nomi_fogli: Nomi dei fogli da cercare, in ordine di preferenza
+
+    Returns:
+        Tupla (workbook, worksheet). Se nessun foglio corrisponde usa quello attivo
+    """
+    # read_only=True per ottimizzare lettura file grandi
+    wb = load_workbook(filename, data_only=True, read_only=True)
+
+    ws = None
+    for nome_foglio in nomi_fogli:
+        if nome_foglio in wb.sheetnames:
+            ws = wb[nome_foglio]
+            break
+
+    if ws is None:
+        ws = wb.active
+
+    return wb, ws
+
+
+def leggi_pezzi_excel(filename, progresso=None):
+    """Legge i pezzi richiesti da un file Excel (colonne Quantità, Lunghezza)
+
+    Non tocca l'interfaccia grafica: può essere eseguita in un thread separato.
+
+    Args:
+        filename: Percorso del file Excel
+        progresso: Callback opzionale chiamata con il numero di righe lette
+
+    Returns:
+        Tupla (righe, errori) dove righe è una lista di tuple (quantità, lunghezza)
+    """
+    wb, ws = _apri_foglio(filename, FOGLI_PEZZI)
+    righe = []
+    errori = []
+
+    try:
+        # Salta l'intestazione e leggi i dati (Quantità, Lunghezza)
+        for idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
+            if progresso is not None and idx % PASSO_PROGRESSO_IMPORT == 0:
+                progresso(idx - 1)
+
+            if not row or all(cell is None for cell in row):
+                continue
+
+            try:
+                qty = row[0]
+                lunghezza = row[1] if len(row) > 1 else None
+
+                if qty is None or lunghezza is None:
+                    continue
+
+                qty = int(float(qty))
+                lunghezza = float(lunghezza)
+
+                if qty <= 0 or lunghezza <= 0:
+                    if len(errori) < 100:
+                        errori.append(f"Riga {idx}: valori devono essere positivi")
+                    continue
+
+                righe.append((qty, lunghezza))
+
+            except (ValueError, TypeError) as e:
+                if len(errori) < 100:
+                    errori.append(f"Riga {idx}: errore nei dati - {str(e)}")
+                continue
+    finally:
+        wb.close()
+
+    return righe, errori
+
+
+def leggi_commessa_excel(filename, spessore_lama=3.0):
+    """Legge una commessa multi-profilo da un file Excel
+
+    Fogli: Pezzi (Profilo, Quantità, Lunghezza), Barre (Profilo, Quantità,
+    Lunghezza, Costo; quantità vuota = barre da catalogo illimitate) e,
+    facoltativo, Profili (Profilo, Spessore lama).
+
+    Args:
+        filename: Percorso del file Excel
+        spessore_lama: Spessore lama dei profili non elencati nel foglio Profili
+
+    Returns:
+        Tupla (commessa, errori)
+    """
+    commessa = Commessa(spessore_lama)
+    errori = []
+    wb = load_workbook(filename, data_only=True, read_only=True)
+
+    def foglio(nomi):
+        for nome in nomi:
+            if nome in wb.sheetnames:
+                return wb[nome]
+        return None
+
+    def righe(ws):
+        for row in ws.iter_rows(min_row=2, values_only=True):
+            if row and row[0] is not None:
+                yield str(row[0]).strip(), row[1:]
+
+    try:
+        ws_pezzi, ws_barre = foglio(FOGLI_PEZZI), foglio(FOGLI_BARRE)
+        if ws_pezzi is None or ws_barre is None:
+            raise ValueError("Il file della commessa deve contenere i fogli 'Pezzi' e 'Barre'")
+
+        for profilo, valori in righe(ws_pezzi):
+            try:
+                qty, lunghezza = int(float(valori[0])), float(valori[1])
+                if qty <= 0 or lunghezza <= 0:
+                    raise ValueError("valori devono essere positivi")
+                commessa.aggiungi_pezzi(profilo, qty, lunghezza)
+            except (ValueError, TypeError, IndexError) as e:
+                if len(errori) < 100:
+                    errori.append(f"Pezzi, profilo {profilo}: {str(e)}")
+
+        for profilo, valori in righe(ws_barre):
+            try:
+                qty = None if valori[0] is None else int(float(valori[0]))
+                lunghezza = float(valori[1])
+                costo = float(valori[2]) if len(valori) > 2 and valori[2] is not None else None
+                if (qty is not None and qty <= 0) or lunghezza <= 0:
+                    raise ValueError("valori devono essere positivi")
+                commessa.aggiungi_barre(profilo, qty, lunghezza, costo)
+            except (ValueError, TypeError, IndexError) as e:
+                if len(errori) < 100:
+                    errori.append(f"Barre, profilo {profilo}: {str(e)}")
+
+        ws_profili = foglio(FOGLI_PROFILI)
+        if ws_profili is not None:
+            for profilo, valori in righe(ws_profili):
+                try:
+                    commessa.imposta_spessore_lama(profilo, float(valori[0]))
+                except (ValueError, TypeError, IndexError) as e:
+                    if len(errori) < 100:
+                        errori.append(f"Profili, profilo {profilo}: {str(e)}")
+    finally:
+        wb.close()
+
+    return commessa, errori
+
+
+def leggi_ordini_excel(filename, oggi=None):
+    """Legge la coda degli ordini da un file Excel
+
+    Foglio Ordini (o il primo foglio): Ordine, Quantità, Lunghezza, Scadenza;
+    più righe con lo stesso codice formano un unico ordine. La scadenza può
+    essere una data o un numero di giorni; vuota = nessuna urgenza.
+
+    Args:
+        filename: Percorso del file Excel
+        oggi: Data (date) da cui contare i giorni alla scadenza (default: oggi)
+
+    Returns:
+        Tupla (ordini, errori), ordini nell'ordine di comparizione nel file
+    """
+    oggi = oggi or datetime.now().date()
+    ordini = {}
+    errori = []
+    wb, ws = _apri_foglio(filename, FOGLI_ORDINI)
+    try:
+        for row in ws.iter_rows(min_row=2, values_only=True):
+            if not row or row[0] is None:
+                continue
+            codice = str(row[0]).strip()
+            try:
+                qty, lunghezza = int(float(row[1])), float(row[2])
+                if qty <= 0 or lunghezza <= 0:
+                    raise ValueError("valori devono essere positivi")
+                scadenza = row[3] if len(row) > 3 else None
+                if isinstance(scadenza, datetime):
+                    scadenza = (scadenza.date() - oggi).days
+                elif scadenza is not None and str(scadenza).strip():
+                    scadenza = int(float(scadenza))
+                else:
+                    scadenza = None
+                ordine = ordini.get(codice)
+                if ordine is None:
+                    ordine = ordini[codice] = OrdineTaglio(codice, [], scadenza)
+                elif scadenza is not None and (ordine.scadenza is None or scadenza < ordine.scadenza):
+                    ordine.scadenza = scadenza
+                ordine.pezzi.append((qty, lunghezza))
+            except (ValueError, TypeError, IndexError) as e:
+                if len(errori) < 100:
+                    errori.append(f"Ordine {codice}: {str(e)}")
+    finally:
+        wb.close()
+    return list(ordini.values()), errori
+
+
+def leggi_barre_excel(filename, modalita, lunghezze_presenti=(), progresso=None):
+    """Legge barre disponibili o lunghezze di catalogo da un file Excel
+
+    In modalità "disponibili" le colonne sono Quantità, Lunghezza, Costo;
+    in modalità "calcola" sono Lunghezza, Costo. Non tocca l'interfaccia grafica.
+
+    Args:
+        filename: Percorso del file Excel
+        modalita: "disponibili" oppure "calcola"
+        lunghezze_presenti: Lunghezze di catalogo già inserite (scartate come duplicati)
+        progresso: Callback opzionale chiamata con il numero di righe lette
+
+    Returns:
+        Tupla (righe, costi, errori): righe sono tuple (quantità, lunghezza) oppure
+        lunghezze di catalogo, costi è un dict {lunghezza: costo}
+    """
+    wb, ws = _apri_foglio(filename, FOGLI_BARRE)
+    righe = []
+    costi = {}
+    errori = []
+    gia_presenti = set(lunghezze_presenti)
+
+    try:
+        # Salta l'intestazione e leggi i dati
+        for idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
+            if progresso is not None and idx % PASSO_PROGRESSO_IMPORT == 0:
+                progresso(idx - 1)
+
+            if not row or all(cell is None for cell in row):
+                continue
+
+            try:
+                if modalita == "disponibili":
+                    qty = row[0]
+                    lunghezza = row[1] if len(row) > 1 else None
+                    costo = row[2] if len(row) > 2 else None
+
+                    if qty is None or lunghezza is None:
+                        continue
+
+                    qty = int(float(qty))
+                    lunghezza = float(lunghezza)
+
+                    if qty <= 0 or lunghezza <= 0:
+                        if len(errori) < 100:  # Limita errori memorizzati
+                            errori.append(f"Riga {idx}: valori devono essere positivi")
+                        continue
+
+                    if costo is not None and costo != "":
+                        costo = float(costo)
+                        if costo >= 0:
+                            costi[lunghezza] = costo
+
+                    righe.append((qty, lunghezza))
+
+                else:
+                    lunghezza = row[0]
+                    costo = row[1] if len(row) > 1 else None
+
+                    if lunghezza is None:
+                        continue
+
+                    lunghezza = float(lunghezza)
+
+                    if lunghezza <= 0:
+                        if len(errori) < 100:
+                            errori.append(f"Riga {idx}: lunghezza deve essere positiva")
+                        continue
+
+                    if lunghezza in gia_presenti:
+                        if len(errori) < 100:
+                            errori.append(f"Riga {idx}: lunghezza {lunghezza} già presente")
+                        continue
+
+                    if costo is not None and costo != "":
+                        costo = float(costo)
+                        if costo >= 0:
+                            costi[lunghezza] = costo
+
+                    gia_presenti.add(lunghezza)
+                    righe.append(lunghezza)
+
+            except (ValueError, TypeError) as e:
+                if len(errori) < 100:
+                    errori.append(f"Riga {idx}: errore nei dati - {str(e)}")
+                continue
+    finally:
+        wb.close()
+
+    return righe, costi, errori
 
-        return barre_utilizzate
+
+class SchemaTaglio(Flowable):
+    """Schema grafico in scala di un pattern: pezzi, tagli della lama e sfrido
+
+    Il disegno viene costruito una sola volta, al primo utilizzo, e registrato
+    nel PDF come form XObject: ogni altra occorrenza dello stesso schema è un
+    semplice riferimento. Le istanze vanno condivise tra tutte le righe con lo
+    stesso pattern (vedi genera_report_pdf), come flyweight.
+    """
+
+    ALTEZZA_TESTO = 11
+    ALTEZZA_BARRA = 14
+    COLORE_PEZZO = colors.HexColor('#aed6f1')
+    COLORE_LAMA = colors.HexColor('#c0392b')
+    COLORE_SFRIDO = colors.HexColor('#d5d8dc')
+    COLORE_BORDO = colors.HexColor('#2c3e50')
+
+    def __init__(self, pattern, spessore_lama, larghezza, nome_form, ordine=None):
+        """
+        Args:
+            pattern: PatternTaglio da disegnare
+            spessore_lama: Spessore della lama in mm
+            larghezza: Larghezza del disegno in punti
+            nome_form: Nome univoco del form XObject nel documento
+            ordine: Ordine dei tagli alla sega (default: quello del pattern)
+        """
+        Flowable.__init__(self)
+        self.pattern = pattern
+        self.ordine = ordine or pattern.tagli
+        self.spessore_lama = spessore_lama
+        self.larghezza = larghezza
+        self.altezza = self.ALTEZZA_TESTO + self.ALTEZZA_BARRA + 2
+        self.nome_form = nome_form
+
+    def wrap(self, larghezza_disponibile, altezza_disponibile):
+        return self.larghezza, self.altezza
+
+    def _disegno(self):
+        """Costruisce il Drawing del pattern (una volta per documento)"""
+        pattern = self.pattern
+        d = Drawing(self.larghezza, self.altezza)
+        d.add(String(0, self.ALTEZZA_BARRA + 4, " + ".join(str(int(t)) for t in self.ordine),
+                     fontName='Helvetica', fontSize=8))
+
+        scala = self.larghezza / pattern.lunghezza
+        h = self.ALTEZZA_BARRA
+        x = 0.0
+        for taglio in self.ordine:
+            w = taglio * scala
+            d.add(Rect(x, 0, w, h, fillColor=self.COLORE_PEZZO,
+                       strokeColor=self.COLORE_BORDO, strokeWidth=0.4))
+            etichetta = f"{taglio:g}"
+            if stringWidth(etichetta, 'Helvetica', 6) + 2 <= w:
+                d.add(String(x + w / 2, 4.5, etichetta, fontName='Helvetica',
+                             fontSize=6, textAnchor='middle'))
+            x += w
+            # Il taglio della lama, visibile anche quando è sotto il mezzo punto
+            lama = min(self.spessore_lama * scala, self.larghezza - x)
+            if lama > 0:
+                d.add(Rect(x, 0, max(lama, 0.5), h, fillColor=self.COLORE_LAMA,
+                           strokeColor=None))
+                x += lama
+
+        if pattern.sfrido > 0 and x < self.larghezza:
+            w = self.larghezza - x
+            d.add(Rect(x, 0, w, h, fillColor=self.COLORE_SFRIDO,
+                       strokeColor=self.COLORE_BORDO, strokeWidth=0.4,
+                       strokeDashArray=[2, 1]))
+            etichetta = f"{pattern.sfrido:.0f}"
+            if stringWidth(etichetta, 'Helvetica-Oblique', 6) + 2 <= w:
+                d.add(String(x + w / 2, 4.5, etichetta, fontName='Helvetica-Oblique',
+                             fontSize=6, textAnchor='middle'))
+        return d
+
+    def draw(self):
+        canv = self.canv
+        if not canv.hasForm(self.nome_form):
+            canv.beginForm(self.nome_form, 0, 0, self.larghezza, self.altezza)
+            renderPDF.draw(self._disegno(), canv, 0, 0)
+            canv.endForm()
+        canv.doForm(self.nome_form)
+
+
+def _sezione_seghe_pdf(pianificazione, stile_tabella, stili):
+    """Flowable della ripartizione su più seghe: timeline e lista di taglio di ogni sega"""
+    elementi = [PageBreak(), Paragraph("PIANIFICAZIONE SEGHE", stili['Heading2'])]
+    riepilogo = " | ".join(f"{sega.nome}: {formatta_durata(fine)}"
+                           for sega, fine in zip(pianificazione.seghe, pianificazione.fine_seghe))
+    elementi.append(Paragraph(f"Makespan: {formatta_durata(pianificazione.makespan)} | {riepilogo}",
+                              stili['Normal']))
+    elementi.append(Spacer(1, 8))
+
+    # Timeline (Gantt): una riga per sega, un rettangolo per lotto
+    larghezza, margine, altezza_riga = 515, 60, 16
+    d = Drawing(larghezza, altezza_riga * len(pianificazione.seghe) + 14)
+    scala = (larghezza - margine) / pianificazione.makespan if pianificazione.makespan else 0
+    palette = [colors.HexColor('#aed6f1'), colors.HexColor('#a9dfbf')]
+    for m, (sega, righe) in enumerate(zip(pianificazione.seghe, pianificazione.timeline)):
+        y = d.height - (m + 1) * altezza_riga
+        d.add(String(0, y + 4, sega.nome, fontName='Helvetica', fontSize=7))
+        for k, (_, _, _, inizio, fine) in enumerate(righe):
+            d.add(Rect(margine + inizio * scala, y + 1, max((fine - inizio) * scala, 0.3), altezza_riga - 3,
+                       fillColor=palette[k % 2], strokeColor=colors.HexColor('#2c3e50'), strokeWidth=0.2))
+    d.add(String(larghezza, 0, formatta_durata(pianificazione.makespan), fontName='Helvetica',
+                 fontSize=7, textAnchor='end'))
+    elementi.append(d)
+
+    # Lista di taglio di ogni sega, nell'ordine di esecuzione
+    intestazione = ["Barre", "Lung.", "Tagli", "Inizio", "Fine"]
+    for sega, sequenza, righe in zip(pianificazione.seghe, pianificazione.sequenze, pianificazione.timeline):
+        elementi.append(Spacer(1, 10))
+        elementi.append(Paragraph(f"{sega.nome} - {len(sequenza)} barre", stili['Heading3']))
+        if not righe:
+            continue
+        blocco = [intestazione]
+        for j, (pattern, copie, ordine, inizio, fine) in enumerate(righe):
+            primo = sequenza.numero_prima_barra(j)
+            blocco.append([
+                f"#{primo}" if copie == 1 else f"#{primo}-{primo + copie - 1} (×{copie})",
+                f"{pattern.profilo}\n{int(pattern.lunghezza)}" if pattern.profilo else f"{int(pattern.lunghezza)}",
+                " + ".join(str(int(t)) for t in ordine),
+                formatta_durata(inizio),
+                formatta_durata(fine),
+            ])
+            if len(blocco) > RIGHE_PER_BLOCCO_PDF:
+                elementi.append(LongTable(blocco, colWidths=[75, 50, 280, 50, 50], repeatRows=1,
+                                          style=stile_tabella))
+                blocco = [intestazione]
+        if len(blocco) > 1:
+            elementi.append(LongTable(blocco, colWidths=[75, 50, 280, 50, 50], repeatRows=1, style=stile_tabella))
+    return elementi
+
+
+def _sezione_ordini_pdf(sequenza, ordini, stile_tabella, stili):
+    """Flowable del riepilogo ordini di un lotto: pezzi e barre di ogni ordine"""
+    elementi = [Spacer(1, 12), Paragraph("ORDINI NEL LOTTO", stili['Heading2'])]
+    barre = barre_per_ordine(sequenza, ordini)
+    intestazione = ["Ordine", "Scadenza", "Pezzi", "Barre"]
+    blocco = [intestazione]
+    for ordine in sorted(ordini, key=OrdineTaglio.chiave_urgenza):
+        blocco.append([
+            ordine.codice,
+            "-" if ordine.scadenza is None else f"{ordine.scadenza} gg",
+            str(ordine.num_pezzi),
+            Paragraph(formatta_intervalli(barre[ordine.codice]), stili['BodyText']),
+        ])
+        if len(blocco) > RIGHE_PER_BLOCCO_PDF:
+            elementi.append(LongTable(blocco, colWidths=[80, 55, 45, 355], repeatRows=1, style=stile_tabella))
+            blocco = [intestazione]
+    if len(blocco) > 1:
+        elementi.append(LongTable(blocco, colWidths=[80, 55, 45, 355], repeatRows=1, style=stile_tabella))
+    return elementi
+
+
+def genera_report_pdf(filename, piano, nome_progetto, data_progetto, spessore_lama,
+                      costo_barre_intere=0, costo_effettivo=0, progresso=None,
+                      schemi=False, parametri_sega=None, seghe=None, ordini=None):
+    """Genera il report PDF di un piano di taglio
+
+    La tabella di taglio viene emessa in blocchi di circa una pagina
+    (LongTable con intestazione ripetuta), così l'impaginazione di reportlab
+    resta lineare anche con migliaia di righe; le pagine sono compresse.
+    Le righe seguono la sequenza alla sega (vedi sequenzia_piano), con i tagli
+    nell'ordine di esecuzione.
+    Non tocca l'interfaccia grafica: può essere eseguita in un thread separato.
+
+    Args:
+        filename: Percorso del file PDF da creare
+        piano: PianoTaglio da stampare
+        nome_progetto: Titolo del report
+        data_progetto: Data mostrata nell'intestazione
+        spessore_lama: Spessore lama (mostrato così com'è nell'intestazione)
+        costo_barre_intere: Costo delle barre intere (0 = non mostrare i costi)
+        costo_effettivo: Costo del materiale effettivamente utilizzato
+        progresso: Callback opzionale progresso(pagine_fatte, pagine_stimate)
+        schemi: Se True, aggiunge sotto i tagli lo schema grafico in scala della barra
+        parametri_sega: ParametriSega per la stima del tempo macchina (default: valori tipici)
+        seghe: Lista opzionale di Sega; con più seghe aggiunge la ripartizione
+            del piano (vedi pianifica_seghe) con timeline e liste di taglio per sega
+        ordini: Ordini (OrdineTaglio) di un lotto; aggiunge la tabella delle barre
+            in cui si trovano i pezzi di ogni ordine (vedi attribuisci_ordini)
+    """
+    # Crea il PDF con margini ridotti
+    doc = SimpleDocTemplate(
+        filename,
+        pagesize=A4,
+        topMargin=15*mm,
+        bottomMargin=15*mm,
+        leftMargin=15*mm,
+        rightMargin=15*mm,
+        pageCompression=1
+    )
+    story = []
+    styles = getSampleStyleSheet()
+
+    # Calcola statistiche
+    tot_sfrido = piano.sfrido_totale
+    efficienza = piano.efficienza
+    parametri_sega = parametri_sega or ParametriSega()
+    sequenza = sequenzia_piano(piano, parametri_sega.barre_per_fascio)
+
+    # Intestazione compatta
+    header_style = ParagraphStyle(
+        'Header',
+        parent=styles['Heading1'],
+        fontSize=14,
+        textColor=colors.HexColor('#2c3e50'),
+        spaceAfter=8,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    )
+
+    story.append(Paragraph(nome_progetto.upper(), header_style))
+
+    # Info progetto
+    progetto_style = ParagraphStyle('Progetto', parent=styles['Normal'], fontSize=10, alignment=TA_CENTER, textColor=colors.HexColor('#2c3e50'))
+    story.append(Paragraph(f"Data: {data_progetto}", progetto_style))
+    story.append(Spacer(1, 5))
+
+    # Info in una riga
+    info_text = f"Lama: {spessore_lama}mm | Barre: {len(piano)} | Pattern: {piano.num_pattern} | Sfrido: {tot_sfrido:.0f}mm | Efficienza: {efficienza:.1f}%"
+    info_style = ParagraphStyle('Info', parent=styles['Normal'], fontSize=8, alignment=TA_CENTER)
+    story.append(Paragraph(info_text, info_style))
+    sega_text = (f"Tempo macchina stimato: {formatta_durata(sequenza.tempo_macchina(parametri_sega))} | "
+                 f"Cambi battuta: {sequenza.cambi_battuta} | Barre e tagli nell'ordine di esecuzione "
+                 f"(\"alterna\": barre alterne in ordine inverso)")
+    if parametri_sega.barre_per_fascio > 1:
+        sega_text += f" | Fasci da {parametri_sega.barre_per_fascio} barre"
+    story.append(Paragraph(sega_text, info_style))
+
+    # Aggiungi costi se disponibili
+    if costo_barre_intere > 0:
+        costo_text = f"Costo barre intere: €{costo_barre_intere:.2f} | Costo effettivo (materiale utilizzato): €{costo_effettivo:.2f}"
+        costo_style = ParagraphStyle('Costo', parent=styles['Normal'], fontSize=8, alignment=TA_CENTER, textColor=colors.HexColor('#27ae60'))
+        story.append(Paragraph(costo_text, costo_style))
+
+    story.append(Spacer(1, 10))
+
+    # Stile condiviso da tutti i blocchi della tabella
+    stile_tabella = TableStyle([
+        # Header
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495e')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 9),
+        ('ALIGN', (0, 0), (0, -1), 'CENTER'),  # Barra centrata
+        ('ALIGN', (1, 0), (1, -1), 'CENTER'),  # Lunghezza centrata
+        ('ALIGN', (2, 0), (2, -1), 'LEFT'),    # Tagli allineati a sinistra
+        ('ALIGN', (3, 0), (3, -1), 'CENTER'),  # Sfrido centrato
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+        ('TOPPADDING', (0, 0), (-1, 0), 6),
+        # Body
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#ecf0f1')]),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('TOPPADDING', (0, 1), (-1, -1), 4),
+        ('BOTTOMPADDING', (0, 1), (-1, -1), 4),
+        ('LEFTPADDING', (0, 0), (-1, -1), 5),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 5),
+    ])
+
+    if schemi:
+        stile_tabella.add('VALIGN', (0, 1), (-1, -1), 'MIDDLE')
+
+    # Calcola larghezza dinamica per la colonna tagli
+    tagli_width = 380
+    intestazione = ["Barre", "Lung.", "Tagli", "Sfrido"]
+    righe_per_blocco = RIGHE_PER_BLOCCO_PDF_SCHEMI if schemi else RIGHE_PER_BLOCCO_PDF
+
+    # Un solo schema per pattern distinto, condiviso da tutte le righe che lo usano
+    schemi_pattern = {}
+    if schemi:
+        try:
+            lama = float(spessore_lama)
+        except (TypeError, ValueError):
+            lama = 0.0
+        larghezza_schema = tagli_width - 10  # al netto del padding della cella
+
+    def cella_tagli(pattern, ordine):
+        if not schemi:
+            return " + ".join(str(int(t)) for t in ordine)
+        schema = schemi_pattern.get((pattern, ordine))
+        if schema is None:
+            schema = SchemaTaglio(pattern, lama, larghezza_schema, f"schema{len(schemi_pattern)}", ordine)
+            schemi_pattern[(pattern, ordine)] = schema
+        return schema
+
+    # Tabella principale: una riga per passo della sequenza, con l'intervallo di barre,
+    # suddivisa in blocchi da circa una pagina
+    blocco = [intestazione]
+    for j, (pattern, copie, ordine) in enumerate(sequenza.passi):
+        primo = sequenza.numero_prima_barra(j)
+        if copie == 1:
+            barre_str = f"#{primo}"
+        else:
+            barre_str = f"#{primo}-{primo + copie - 1}\n(×{copie})"
+            # I fasci si tagliano alternando l'ordine: la battuta non si sposta tra un fascio e l'altro
+            if sequenza.fasci(copie) > 1 and ordine != ordine[::-1]:
+                barre_str += "\nalterna"
+        blocco.append([
+            barre_str,
+            f"{pattern.profilo}\n{int(pattern.lunghezza)}" if pattern.profilo else f"{int(pattern.lunghezza)}",
+            cella_tagli(pattern, ordine),
+            f"{pattern.sfrido:.0f}"
+        ])
+
+        if len(blocco) > righe_per_blocco:
+            story.append(LongTable(blocco, colWidths=[55, 50, tagli_width, 50], repeatRows=1, style=stile_tabella))
+            blocco = [intestazione]
+
+    if len(blocco) > 1:
+        story.append(LongTable(blocco, colWidths=[55, 50, tagli_width, 50], repeatRows=1, style=stile_tabella))
+
+    if ordini:
+        story.extend(_sezione_ordini_pdf(sequenza, ordini, stile_tabella, styles))
+
+    if seghe and len(seghe) > 1:
+        pianificazione = pianifica_seghe(piano, seghe, parametri_sega)
+        story.extend(_sezione_seghe_pdf(pianificazione, stile_tabella, styles))
+
+    # Avanzamento: una notifica per pagina impaginata
+    pagine_stimate = max(1, -(-piano.num_pattern // righe_per_blocco))
+
+    def su_pagina(canvas, documento):
+        if progresso is not None:
+            progresso(documento.page, max(pagine_stimate, documento.page))
+
+    # Genera il PDF
+    doc.build(story, onFirstPage=su_pagina, onLaterPages=su_pagina)
+
+
+def esporta_excel(filename, piani, costi_barre=None, progresso=None, parametri_sega=None, seghe=None,
+                  ordini=None):
+    """Esporta uno o più piani di taglio in un file Excel
+
+    Il file viene scritto con openpyxl in modalità write-only: le righe
+    vanno direttamente su disco man mano che vengono prodotte, quindi la
+    memoria resta costante anche per piani da centinaia di migliaia di barre.
+    Non tocca l'interfaccia grafica: può essere eseguita in un thread separato.
+
+    Barre e pattern seguono la sequenza alla sega (vedi sequenzia_piano), con
+    i tagli di ogni barra nell'ordine di esecuzione.
+
+    Fogli prodotti:
+        Barre: una riga per barra da tagliare
+        Pattern: una riga per pattern distinto con il numero di copie
+        Fabbisogno: barre da prelevare/ordinare per lunghezza
+        Scenari: riepilogo di confronto (solo se i piani sono più di uno)
+        Seghe: lotti di ogni sega con inizio e fine (solo con più seghe)
+        Ordini: pezzi e barre di ogni ordine (solo per un lotto di ordini)
+
+    Args:
+        filename: Percorso del file .xlsx da creare
+        piani: Lista di coppie (nome, PianoTaglio); con più piani ogni foglio
+            ha una colonna "Scenario" iniziale, con piani multi-profilo una colonna "Profilo"
+        costi_barre: Dict opzionale {lunghezza: costo} oppure {(profilo, lunghezza): costo}
+        progresso: Callback opzionale progresso(barre_scritte, barre_totali)
+        parametri_sega: ParametriSega per la stima del tempo macchina (default: valori tipici)
+        seghe: Lista opzionale di Sega per ripartire ogni piano (vedi pianifica_seghe)
+        ordini: Ordini (OrdineTaglio) di un lotto con un solo piano: aggiunge l'ordine
+            di ogni taglio nel foglio Barre (vedi attribuisci_ordini) e il foglio Ordini
+    """
+    piu_piani = len(piani) > 1
+    con_ordini = bool(ordini) and not piu_piani
+    con_seghe = bool(seghe) and len(seghe) > 1
+    con_profili = any(piano.profili for _, piano in piani)
+    parametri_sega = parametri_sega or ParametriSega()
+    costi_barre = costi_barre or {}
+    barre_totali = sum(len(piano) for _, piano in piani)
+    barre_scritte = 0
+
+    wb = Workbook(write_only=True)
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF")
+
+    def crea_foglio(titolo, intestazioni, larghezze, per_profilo=True):
+        if con_profili and per_profilo:
+            intestazioni = ["Profilo"] + intestazioni
+            larghezze = [14] + larghezze
+        if piu_piani:
+            intestazioni = ["Scenario"] + intestazioni
+            larghezze = [14] + larghezze
+        ws = wb.create_sheet(titolo)
+        for i, larghezza in enumerate(larghezze):
+            ws.column_dimensions[chr(ord('A') + i)].width = larghezza
+        riga = []
+        for testo in intestazioni:
+            cella = WriteOnlyCell(ws, value=testo)
+            cella.fill = header_fill
+            cella.font = header_font
+            cella.alignment = Alignment(horizontal='center', vertical='center')
+            riga.append(cella)
+        ws.append(riga)
+        return ws
+
+    if con_ordini:
+        ws_barre = crea_foglio("Barre", ["Barra", "Lunghezza (mm)", "Ordine Tagli (mm)", "Num Tagli", "Sfrido (mm)",
+                                         "Pattern", "Ordini"], [8, 15, 60, 10, 12, 9, 60])
+    else:
+        ws_barre = crea_foglio("Barre", ["Barra", "Lunghezza (mm)", "Ordine Tagli (mm)", "Num Tagli", "Sfrido (mm)",
+                                         "Pattern"], [8, 15, 60, 10, 12, 9])
+    ws_pattern = crea_foglio("Pattern", ["Pattern", "Prima Barra", "Copie", "Lunghezza (mm)", "Ordine Tagli (mm)",
+                                         "Num Tagli", "Sfrido (mm)", "Sfrido Totale (mm)"],
+                             [9, 11, 8, 15, 60, 10, 12, 18])
+    ws_fabbisogno = crea_foglio("Fabbisogno", ["Lunghezza (mm)", "Quantità", "Costo Unitario (€)", "Costo (€)"],
+                                [15, 10, 18, 12])
+    ws_seghe = None
+    if con_seghe:
+        ws_seghe = crea_foglio("Seghe", ["Sega", "Barre", "Copie", "Lunghezza (mm)", "Ordine Tagli (mm)",
+                                         "Inizio (min)", "Fine (min)"],
+                               [12, 12, 8, 15, 60, 12, 12])
+    ws_scenari = None
+    if piu_piani:
+        ws_scenari = crea_foglio("Scenari", ["Barre", "Pattern", "Sfrido Totale (mm)", "Efficienza (%)",
+                                             "Costo (€)", "Cambi Battuta", "Tempo Macchina (min)",
+                                             "Makespan Seghe (min)", "Fabbisogno"],
+                                 [8, 9, 18, 14, 12, 14, 20, 20, 50], per_profilo=False)
+
+    for nome, piano in piani:
+        prefisso = [nome] if piu_piani else []
+        sequenza = sequenzia_piano(piano, parametri_sega.barre_per_fascio)
+        if con_ordini:
+            attribuzione = attribuisci_ordini(sequenza, ordini)
+            barre_ordine = {ordine.codice: [] for ordine in ordini}
+
+        # Una riga per barra: i dati del pattern si calcolano una sola volta per passo
+        numero = 1
+        for j, (pattern, copie, ordine) in enumerate(sequenza.passi, 1):
+            lunghezza = pattern.lunghezza
+            # I fasci alternano ordine diretto e inverso
+            tagli = [" + ".join(str(int(t)) for t in SequenzaTaglio.ordine_copia(ordine, k)) for k in (0, 1)]
+            num_tagli = pattern.num_tagli
+            sfrido = round(pattern.sfrido, 1)
+            inizio = prefisso + [pattern.profilo] if con_profili else prefisso
+            for k in range(copie):
+                riga = inizio + [numero, lunghezza, tagli[(k // sequenza.barre_per_fascio) % 2], num_tagli, sfrido, j]
+                if con_ordini:
+                    _, codici = next(attribuzione)
+                    riga.append(", ".join(codice or "-" for codice in codici))
+                    for codice in set(codici) - {None}:
+                        barre_ordine[codice].append(numero)
+                ws_barre.append(riga)
+                numero += 1
+                barre_scritte += 1
+                if progresso is not None and barre_scritte % PASSO_PROGRESSO_EXCEL == 0:
+                    progresso(barre_scritte, barre_totali)
+
+            ws_pattern.append(inizio + [j, sequenza.numero_prima_barra(j - 1), copie, lunghezza, tagli[0],
+                                        num_tagli, sfrido, round(pattern.sfrido * copie, 1)])
+
+        costo_piano = 0
+        for (profilo, lunghezza), quantita in sorted(piano.fabbisogno(per_profilo=True).items(),
+                                                      key=lambda voce: (voce[0][0], -voce[0][1])):
+            inizio = prefisso + [profilo] if con_profili else prefisso
+            costo_unitario = costi_barre.get((profilo, lunghezza), costi_barre.get(lunghezza))
+            if costo_unitario is None:
+                ws_fabbisogno.append(inizio + [lunghezza, quantita, None, None])
+            else:
+                costo_piano += costo_unitario * quantita
+                ws_fabbisogno.append(inizio + [lunghezza, quantita, costo_unitario,
+                                               round(costo_unitario * quantita, 2)])
+
+        makespan = None
+        if ws_seghe is not None:
+            pianificazione = pianifica_seghe(piano, seghe, parametri_sega)
+            makespan = round(pianificazione.makespan / 60, 1)
+            for sega, sequenza_sega, righe in zip(pianificazione.seghe, pianificazione.sequenze,
+                                                  pianificazione.timeline):
+                for k, (pattern, copie, ordine, inizio, fine) in enumerate(righe):
+                    primo = sequenza_sega.numero_prima_barra(k)
+                    inizio_riga = prefisso + [pattern.profilo] if con_profili else prefisso
+                    ws_seghe.append(inizio_riga + [sega.nome, f"{primo}-{primo + copie - 1}", copie,
+                                                   pattern.lunghezza, " + ".join(str(int(t)) for t in ordine),
+                                                   round(inizio / 60, 1), round(fine / 60, 1)])
+
+        if ws_scenari is not None:
+            fabbisogno = piano.fabbisogno()
+            fabbisogno_str = ", ".join(f"{q}×{int(l)}mm" for l, q in sorted(fabbisogno.items(), reverse=True))
+            ws_scenari.append(prefisso + [len(piano), piano.num_pattern, round(piano.sfrido_totale, 1),
+                                          round(piano.efficienza, 1),
+                                          round(costo_piano, 2) if costi_barre else None,
+                                          sequenza.cambi_battuta,
+                                          round(sequenza.tempo_macchina(parametri_sega) / 60, 1),
+                                          makespan, fabbisogno_str])
+
+    if con_ordini:
+        ws_ordini = crea_foglio("Ordini", ["Ordine", "Scadenza (giorni)", "Pezzi", "Barre"], [14, 16, 10, 60],
+                                per_profilo=False)
+        for ordine in sorted(ordini, key=OrdineTaglio.chiave_urgenza):
+            ws_ordini.append([ordine.codice, ordine.scadenza, ordine.num_pezzi,
+                              formatta_intervalli(barre_ordine[ordine.codice])])
+
+    if progresso is not None:
+        progresso(barre_totali, barre_totali)
+    wb.save(filename)
+
+
+class MagazzinoScarti:
+    """Magazzino persistente degli scarti riutilizzabili (database SQLite)
+
+    Ogni scarto è una riga con la sua lunghezza; l'indice sulla lunghezza
+    serve alla lettura ordinata, al riepilogo e al prelievo degli scarti usati.
+    L'ottimizzazione non interroga il database: carica tutte le lunghezze
+    (lunghezze()) e cerca in memoria, così il magazzino cambia solo alla
+    conferma del taglio.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS scarti (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lunghezza REAL NOT NULL,
+            data TEXT NOT NULL,
+            origine TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_scarti_lunghezza ON scarti (lunghezza);
+    """
+
+    def __init__(self, percorso=FILE_SCARTI):
+        self.percorso = percorso
+
+    def _connetti(self):
+        cartella = os.path.dirname(self.percorso)
+        if cartella:
+            os.makedirs(cartella, exist_ok=True)
+        connessione = sqlite3.connect(self.percorso, timeout=2)
+        connessione.executescript(self.SCHEMA)
+        return connessione
+
+    def aggiungi(self, lunghezze, origine=""):
+        """Aggiunge uno scarto per ogni lunghezza indicata"""
+        data = datetime.now().isoformat(timespec="seconds")
+        connessione = self._connetti()
+        try:
+            with connessione:
+                connessione.executemany("INSERT INTO scarti (lunghezza, data, origine) VALUES (?, ?, ?)",
+                                        ((float(l), data, origine) for l in lunghezze))
+        finally:
+            connessione.close()
+
+    def registra_piano(self, piano, lunghezza_minima=LUNGHEZZA_MINIMA_SCARTO, origine=""):
+        """Registra gli sfridi di un piano eseguito lunghi almeno lunghezza_minima
+
+        Il magazzino non distingue i profili: gli sfridi dei pattern di una
+        commessa multi-profilo non vengono registrati.
+
+        Returns:
+            Numero di scarti aggiunti al magazzino
+        """
+        lunghezze = [pattern.sfrido for pattern, copie in piano.voci
+                     if not pattern.profilo and pattern.sfrido >= lunghezza_minima for _ in range(copie)]
+        if lunghezze:
+            self.aggiungi(lunghezze, origine)
+        return len(lunghezze)
+
+    def preleva(self, lunghezze):
+        """Toglie dal magazzino uno scarto per ogni lunghezza indicata (scarti usati)
+
+        Returns:
+            Numero di scarti effettivamente tolti
+        """
+        tolti = 0
+        connessione = self._connetti()
+        try:
+            with connessione:
+                for lunghezza in lunghezze:
+                    riga = connessione.execute("SELECT id FROM scarti WHERE lunghezza = ? LIMIT 1",
+                                               (float(lunghezza),)).fetchone()
+                    if riga is not None:
+                        connessione.execute("DELETE FROM scarti WHERE id = ?", riga)
+                        tolti += 1
+        finally:
+            connessione.close()
+        return tolti
+
+    def lunghezze(self):
+        """Lunghezze di tutti gli scarti in magazzino, in ordine crescente"""
+        if not os.path.exists(self.percorso):
+            return []
+        connessione = self._connetti()
+        try:
+            return [r[0] for r in connessione.execute("SELECT lunghezza FROM scarti ORDER BY lunghezza")]
+        finally:
+            connessione.close()
+
+    def riepilogo(self):
+        """Lista di tuple (lunghezza, quantità) in ordine decrescente di lunghezza"""
+        if not os.path.exists(self.percorso):
+            return []
+        connessione = self._connetti()
+        try:
+            return connessione.execute("SELECT lunghezza, COUNT(*) FROM scarti "
+                                       "GROUP BY lunghezza ORDER BY lunghezza DESC").fetchall()
+        finally:
+            connessione.close()
+
+    def svuota(self):
+        """Elimina tutti gli scarti dal magazzino"""
+        connessione = self._connetti()
+        try:
+            with connessione:
+                connessione.execute("DELETE FROM scarti")
+        finally:
+            connessione.close()
+
+
+class StoricoEsecuzioni:
+    """Storico locale delle ottimizzazioni eseguite (database SQLite)
+
+    Ogni esecuzione registra dimensione dell'istanza, modalità, motore, tempo,
+    memoria e qualità del risultato. La registrazione non deve mai disturbare
+    l'utente: qualsiasi errore del database viene ignorato.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS esecuzioni (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data TEXT NOT NULL,
+            pezzi INTEGER NOT NULL,
+            lunghezze_distinte INTEGER NOT NULL,
+            modalita TEXT NOT NULL,
+            motore TEXT NOT NULL,
+            tempo_s REAL NOT NULL,
+            memoria_mb REAL,
+            barre INTEGER,
+            sfrido_mm REAL,
+            costo REAL,
+            limite_inferiore INTEGER,
+            gap_percento REAL,
+            dettagli TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_esecuzioni_data ON esecuzioni (data);
+    """
+
+    def __init__(self, percorso=FILE_STORICO):
+        self.percorso = percorso
+
+    def _connetti(self):
+        cartella = os.path.dirname(self.percorso)
+        if cartella:
+            os.makedirs(cartella, exist_ok=True)
+        connessione = sqlite3.connect(self.percorso, timeout=2)
+        connessione.executescript(self.SCHEMA)
+        return connessione
+
+    def registra(self, modalita, motore, pezzi_richiesti, lunghezza_barra_max, spessore_lama,
+                 piano, strumentazione, costo=None):
+        """Registra un'esecuzione; restituisce False (senza sollevare eccezioni) se non riesce
+
+        Args:
+            modalita: "disponibili" oppure "calcola"
+            motore: Nome del motore che ha prodotto il piano
+            pezzi_richiesti: Lista di tuple (quantità, lunghezza)
+            lunghezza_barra_max: Barra più lunga usabile (per il limite inferiore)
+            spessore_lama: Spessore della lama in mm
+            piano: PianoTaglio risultante (None se l'ottimizzazione è fallita)
+            strumentazione: Strumentazione dell'esecuzione (tempi e memoria)
+            costo: Costo del piano, se noto
+        """
+        try:
+            dati = strumentazione.come_dict()
+            picchi = [s["memoria_picco_mb"] for s in dati["sezioni"].values()
+                      if s.get("memoria_picco_mb") is not None]
+            limite = limite_inferiore_barre(pezzi_richiesti, lunghezza_barra_max, spessore_lama)
+            barre = len(piano) if piano is not None else None
+            gap = None
+            if barre is not None and limite:
+                gap = round(100.0 * (barre - limite) / limite, 3)
+
+            connessione = self._connetti()
+            try:
+                with connessione:
+                    connessione.execute(
+                        "INSERT INTO esecuzioni (data, pezzi, lunghezze_distinte, modalita, motore, tempo_s, "
+                        "memoria_mb, barre, sfrido_mm, costo, limite_inferiore, gap_percento, dettagli) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (datetime.now().isoformat(timespec="seconds"),
+                         sum(q for q, _ in pezzi_richiesti),
+                         len({l for _, l in pezzi_richiesti}),
+                         modalita, motore, dati["tempo_totale_s"],
+                         max(picchi) if picchi else None,
+                         barre,
+                         piano.sfrido_totale if piano is not None else None,
+                         costo, limite, gap,
+                         json.dumps(dati["sezioni"])))
+            finally:
+                connessione.close()
+            return True
+        except Exception:
+            return False
+
+    def esecuzioni(self, giorni=None):
+        """Esecuzioni registrate (dalla più vecchia) come lista di dict"""
+        if not os.path.exists(self.percorso):
+            return []
+        connessione = self._connetti()
+        try:
+            connessione.row_factory = sqlite3.Row
+            query = "SELECT * FROM esecuzioni"
+            parametri = ()
+            if giorni is not None:
+                query += " WHERE data >= datetime('now', 'localtime', ?)"
+                parametri = (f"-{int(giorni)} days",)
+            righe = connessione.execute(query + " ORDER BY data, id", parametri).fetchall()
+            return [dict(r) for r in righe]
+        finally:
+            connessione.close()
+
+    @staticmethod
+    def _percentile(valori_ordinati, percentuale):
+        """Percentile con il metodo del rango più vicino"""
+        indice = max(0, -(-len(valori_ordinati) * percentuale // 100) - 1)
+        return valori_ordinati[int(indice)]
+
+    def rapporto(self, giorni=None):
+        """Testo del rapporto: percentili dei tempi e andamento della qualità"""
+        righe_storico = self.esecuzioni(giorni)
+        if not righe_storico:
+            return "Nessuna esecuzione registrata."
+
+        def riga_percentili(etichetta, gruppo):
+            tempi = sorted(r["tempo_s"] for r in gruppo)
+            gap = [r["gap_percento"] for r in gruppo if r["gap_percento"] is not None]
+            gap_medio = f"{sum(gap) / len(gap):8.2f}" if gap else "       -"
+            return (f"  {etichetta:<22}{len(gruppo):>6}"
+                    f"{self._percentile(tempi, 50):>10.3f}{self._percentile(tempi, 90):>10.3f}"
+                    f"{self._percentile(tempi, 99):>10.3f}{tempi[-1]:>10.3f}{gap_medio}")
+
+        intestazione = f"  {'':<22}{'Esec.':>6}{'p50 (s)':>10}{'p90 (s)':>10}{'p99 (s)':>10}{'max (s)':>10}{'Gap %':>8}"
+        testo = [f"Storico: {self.percorso}",
+                 f"Esecuzioni: {len(righe_storico)} (dal {righe_storico[0]['data'][:10]} al {righe_storico[-1]['data'][:10]})",
+                 "", "TEMPI PER MOTORE", intestazione]
+
+        gruppi = {}
+        for r in righe_storico:
+            gruppi.setdefault(f"{r['modalita']}/{r['motore']}", []).append(r)
+        testo.extend(riga_percentili(nome, gruppo) for nome, gruppo in sorted(gruppi.items()))
+
+        testo.extend(["", "TEMPI PER DIMENSIONE (pezzi)", intestazione])
+        dimensioni = {}
+        for r in righe_storico:
+            etichetta = next(e for limite, e in CLASSI_DIMENSIONE if r["pezzi"] < limite)
+            dimensioni.setdefault(etichetta, []).append(r)
+        testo.extend(riga_percentili(etichetta, dimensioni[etichetta])
+                     for _, etichetta in CLASSI_DIMENSIONE if etichetta in dimensioni)
+
+        testo.extend(["", "ANDAMENTO MENSILE", intestazione])
+        mesi = {}
+        for r in righe_storico:
+            mesi.setdefault(r["data"][:7], []).append(r)
+        testo.extend(riga_percentili(mese, gruppo) for mese, gruppo in sorted(mesi.items()))
+        return "\n".join(testo)
+
+
+class TabellaVirtuale:
+    """Tabella virtualizzata basata su ttk.Treeview
+
+    I dati restano in una sequenza Python: la Treeview contiene solo le righe
+    visibili, che vengono riutilizzate durante lo scorrimento. Inserire o
+    scorrere centinaia di migliaia di righe costa quanto mostrarne una pagina.
+    """
+
+    def __init__(self, parent, colonne, intestazioni, larghezze, height=5, formatta=None):
+        """
+        Args:
+            parent: Widget contenitore
+            colonne: Identificativi delle colonne
+            intestazioni: Testi delle intestazioni
+            larghezze: Larghezze delle colonne in pixel
+            height: Numero di righe iniziale (poi adattato all'altezza reale)
+            formatta: Funzione che converte un elemento dei dati nei valori di riga
+        """
+        self.frame = ttk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=colonne, show="headings",
+                                 height=height, selectmode="browse")
+        for colonna, testo, larghezza in zip(colonne, intestazioni, larghezze):
+            self.tree.heading(colonna, text=testo)
+            self.tree.column(colonna, width=larghezza)
+
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self._scorri)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.dati = []
+        self.formatta = formatta if formatta is not None else (lambda riga: riga)
+        self.inizio = 0
+        self.righe_visibili = height
+        self.selezionato = None
+        self._iids = []
+
+        self.tree.bind("<Configure>", self._ridimensiona)
+        self.tree.bind("<<TreeviewSelect>>", self._su_selezione)
+        self.tree.bind("<MouseWheel>", self._rotella)
+        self.tree.bind("<Button-4>", lambda e: self._scorri("scroll", -3, "units") or "break")
+        self.tree.bind("<Button-5>", lambda e: self._scorri("scroll", 3, "units") or "break")
+        self.tree.bind("<Up>", lambda e: self._sposta_selezione(-1))
+        self.tree.bind("<Down>", lambda e: self._sposta_selezione(1))
+        self.tree.bind("<Prior>", lambda e: self._sposta_selezione(-self.righe_visibili))
+        self.tree.bind("<Next>", lambda e: self._sposta_selezione(self.righe_visibili))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def imposta_dati(self, dati):
+        """Sostituisce la sequenza di dati mostrata (senza copiarla)"""
+        self.dati = dati
+        self.inizio = 0
+        self.selezionato = None
+        self.aggiorna()
+
+    def indice_selezionato(self):
+        """Restituisce l'indice nei dati della riga selezionata, oppure None"""
+        if self.selezionato is not None and self.selezionato < len(self.dati):
+            return self.selezionato
+        return None
+
+    def aggiorna(self):
+        """Ridisegna le righe visibili dopo una modifica dei dati"""
+        n = len(self.dati)
+        if self.selezionato is not None and self.selezionato >= n:
+            self.selezionato = n - 1 if n else None
+        self.inizio = max(0, min(self.inizio, n - self.righe_visibili))
+        fine = min(n, self.inizio + self.righe_visibili)
+
+        # Riusa gli item esistenti: ne crea o elimina solo la differenza
+        necessari = fine - self.inizio
+        while len(self._iids) < necessari:
+            self._iids.append(self.tree.insert("", "end"))
+        while len(self._iids) > necessari:
+            self.tree.delete(self._iids.pop())
+
+        for pos, iid in enumerate(self._iids):
+            self.tree.item(iid, values=self.formatta(self.dati[self.inizio + pos]))
+
+        if self.selezionato is not None and self.inizio <= self.selezionato < fine:
+            self.tree.selection_set(self._iids[self.selezionato - self.inizio])
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+
+        if n:
+            self.scrollbar.set(self.inizio / n, fine / n)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _ridimensiona(self, event):
+        """Adatta il numero di righe materializzate all'altezza del widget"""
+        altezza_riga = 20
+        inizio_righe = 24
+        if self._iids:
+            bbox = self.tree.bbox(self._iids[0])
+            if bbox:
+                inizio_righe, altezza_riga = bbox[1], bbox[3]
+        righe = max(1, (event.height - inizio_righe) // max(1, altezza_riga))
+        if righe != self.righe_visibili:
+            self.righe_visibili = righe
+            self.aggiorna()
+
+    def _scorri(self, azione, valore, unita=None):
+        """Gestisce i comandi della scrollbar ('moveto' e 'scroll')"""
+        if azione == "moveto":
+            self.inizio = int(float(valore) * len(self.dati))
+        elif azione == "scroll":
+            passo = int(valore)
+            if unita == "pages":
+                passo *= self.righe_visibili
+            self.inizio += passo
+        self.aggiorna()
+
+    def _rotella(self, event):
+        passi = -1 if event.delta > 0 else 1
+        self._scorri("scroll", passi * 3, "units")
+        return "break"
+
+    def _su_selezione(self, event):
+        selezione = self.tree.selection()
+        if selezione and selezione[0] in self._iids:
+            self.selezionato = self.inizio + self._iids.index(selezione[0])
+
+    def _sposta_selezione(self, delta):
+        """Sposta la selezione con la tastiera scorrendo oltre la pagina visibile"""
+        n = len(self.dati)
+        if not n:
+            return "break"
+        corrente = self.selezionato if self.selezionato is not None else self.inizio - delta
+        self.selezionato = max(0, min(n - 1, corrente + delta))
+        if self.selezionato < self.inizio:
+            self.inizio = self.selezionato
+        elif self.selezionato >= self.inizio + self.righe_visibili:
+            self.inizio = self.selezionato - self.righe_visibili + 1
+        self.aggiorna()
+        return "break"
+
+
+class _VistaBarre:
+    """Sequenza di sola lettura che espande voci (numero, pattern, copie, ordine) in righe per barra
+
+    Le righe vengono create solo quando la tabella virtualizzata le richiede,
+    quindi la vista costa O(pattern) anche per piani con centinaia di migliaia di barre.
+    Ogni barra riporta l'ordine dei tagli del proprio fascio, come nella distinta esportata.
+    """
+    __slots__ = ('voci', 'decrescente', 'barre_per_fascio', '_cumulate')
+
+    def __init__(self, voci, decrescente=False, barre_per_fascio=1):
+        self.voci = voci
+        self.decrescente = decrescente
+        self.barre_per_fascio = barre_per_fascio
+        cumulate = [0]
+        for _, _, copie, _ in voci:
+            cumulate.append(cumulate[-1] + copie)
+        self._cumulate = cumulate
+
+    def __len__(self):
+        return self._cumulate[-1]
+
+    def __getitem__(self, indice):
+        if not 0 <= indice < len(self):
+            raise IndexError(indice)
+        j = bisect.bisect_right(self._cumulate, indice) - 1
+        primo, pattern, copie, ordine = self.voci[j]
+        scostamento = indice - self._cumulate[j]
+        if self.decrescente:
+            scostamento = copie - 1 - scostamento
+        ordine = SequenzaTaglio.ordine_copia(ordine, scostamento // self.barre_per_fascio)
+        return (primo + scostamento, pattern, None, ordine)
 
 
 class ApplicativoGUI:
@@ -157,12 +4733,21 @@ class ApplicativoGUI:
         # Variabili
         self.pezzi_richiesti = []
         self.barre_disponibili = []
-        self.risultati_ottimizzazione = []
+        self.risultati_ottimizzazione = PianoTaglio()
         self.modalita = tk.StringVar(value="disponibili")  # "disponibili" o "calcola"
         self.lunghezze_catalogo = []  # Solo lunghezze per modalità calcola
         self.costi_barre = {}  # Dict {lunghezza: costo} opzionale
+        self.costi_commessa = {}  # Dict {(profilo, lunghezza): costo} dell'ultima commessa multi-profilo
+        self.parametri_sega = ParametriSega()  # Tempi per la stima del tempo macchina
+        self.testo_seghe = "1"  # Seghe in parallelo, vedi leggi_seghe
+        self.seghe = leggi_seghe(self.testo_seghe)
         self.costo_barre_intere = 0  # Costo totale barre intere
         self.costo_effettivo = 0  # Costo effettivo basato su lunghezza utilizzata
+        self._importazione_in_corso = False  # Evita importazioni Excel concorrenti
+        self.ultima_strumentazione = None  # Tempi e contatori dell'ultima ottimizzazione
+        self.usa_scarti = tk.BooleanVar(value=False)  # Usa il magazzino scarti prima delle barre nuove
+        self.scarti_usati = []  # Scarti impiegati dall'ultimo piano calcolato
+        self.ordini_lotto = []  # Ordini del lotto a cui appartiene il piano corrente (vedi LottoOrdini)
 
         # Frame principale
         self.setup_ui()
@@ -208,6 +4793,8 @@ class ApplicativoGUI:
 
         # Pulsante per creare file Excel di esempio
         ttk.Button(frame_params, text="Crea Excel Esempio", command=self.crea_excel_esempio, width=20).grid(row=0, column=7, padx=5)
+        ttk.Button(frame_params, text="Lotto Ordini", command=self.ottimizza_lotto_ordini,
+                   width=22).grid(row=0, column=6, padx=5)
 
         # Selezione modalità
         ttk.Label(frame_params, text="Modalità:").grid(row=0, column=3, sticky="w", padx=(30, 5))
@@ -216,6 +4803,22 @@ class ApplicativoGUI:
         ttk.Radiobutton(frame_params, text="Calcola fabbisogno", variable=self.modalita,
                        value="calcola", command=self.cambia_modalita).grid(row=0, column=5, padx=5)
 
+        # Magazzino scarti
+        ttk.Checkbutton(frame_params, text=f"Usa scarti in magazzino (≥ {LUNGHEZZA_MINIMA_SCARTO} mm)",
+                        variable=self.usa_scarti).grid(row=1, column=0, columnspan=3, sticky="w", padx=5, pady=(5, 0))
+        ttk.Button(frame_params, text="Magazzino Scarti", command=self.mostra_magazzino_scarti,
+                   width=20).grid(row=1, column=7, padx=5, pady=(5, 0))
+        # Peso di un pattern distinto (cambio battute) rispetto al materiale: 0 = nessuna riduzione
+        ttk.Label(frame_params, text="Peso pattern (barre):").grid(row=1, column=3, sticky="w",
+                                                                   padx=(30, 5), pady=(5, 0))
+        self.entry_peso_pattern = ttk.Entry(frame_params, width=8)
+        self.entry_peso_pattern.insert(0, "0")
+        self.entry_peso_pattern.grid(row=1, column=4, sticky="w", padx=5, pady=(5, 0))
+        ttk.Button(frame_params, text="Parametri Sega", command=self.imposta_parametri_sega,
+                   width=20).grid(row=1, column=5, padx=5, pady=(5, 0))
+        ttk.Button(frame_params, text="Commessa Multi-profilo", command=self.ottimizza_commessa,
+                   width=22).grid(row=1, column=6, padx=5, pady=(5, 0))
+
         # Frame container per le due sezioni affiancate
         frame_input_container = ttk.Frame(self.root)
         frame_input_container.pack(fill="both", expand=True, padx=10, pady=5)
@@ -250,19 +4853,15 @@ class ApplicativoGUI:
         frame_lista_barre = ttk.Frame(frame_barre_col)
         frame_lista_barre.pack(fill="both", expand=True, pady=(5, 0))
 
-        self.tree_barre = ttk.Treeview(frame_lista_barre, columns=("Quantità", "Lunghezza", "Costo"), show="headings", height=5)
-        self.tree_barre.heading("Quantità", text="Quantità")
-        self.tree_barre.heading("Lunghezza", text="Lunghezza (mm)")
-        self.tree_barre.heading("Costo", text="Costo (€)")
-        self.tree_barre.column("Quantità", width=70)
-        self.tree_barre.column("Lunghezza", width=100)
-        self.tree_barre.column("Costo", width=80)
-
-        scrollbar_barre = ttk.Scrollbar(frame_lista_barre, orient="vertical", command=self.tree_barre.yview)
-        self.tree_barre.configure(yscrollcommand=scrollbar_barre.set)
+        # Tabella virtualizzata: mostra solo le righe visibili anche con liste enormi
+        self.tabella_barre = TabellaVirtuale(frame_lista_barre, ("Quantità", "Lunghezza", "Costo"),
+                                             ("Quantità", "Lunghezza (mm)", "Costo (€)"), (70, 100, 80),
+                                             formatta=self._formatta_barra)
+        self.tabella_barre.imposta_dati(self.barre_disponibili)
+        self.tabella_barre.pack(fill="both", expand=True)
 
-        self.tree_barre.pack(side="left", fill="both", expand=True)
-        scrollbar_barre.pack(side="right", fill="y")
+        self.label_totali_barre = ttk.Label(frame_barre_col, text="", font=("Arial", 8))
+        self.label_totali_barre.pack(anchor="w")
 
         # ===== COLONNA DESTRA: Pezzi Richiesti =====
         frame_pezzi_col = ttk.Frame(frame_input_container)
@@ -290,17 +4889,13 @@ class ApplicativoGUI:
         frame_lista = ttk.Frame(frame_pezzi_col)
         frame_lista.pack(fill="both", expand=True, pady=(5, 0))
 
-        self.tree_pezzi = ttk.Treeview(frame_lista, columns=("Quantità", "Lunghezza"), show="headings", height=5)
-        self.tree_pezzi.heading("Quantità", text="Quantità")
-        self.tree_pezzi.heading("Lunghezza", text="Lunghezza (mm)")
-        self.tree_pezzi.column("Quantità", width=80)
-        self.tree_pezzi.column("Lunghezza", width=120)
+        self.tabella_pezzi = TabellaVirtuale(frame_lista, ("Quantità", "Lunghezza"),
+                                             ("Quantità", "Lunghezza (mm)"), (80, 120))
+        self.tabella_pezzi.imposta_dati(self.pezzi_richiesti)
+        self.tabella_pezzi.pack(fill="both", expand=True)
 
-        scrollbar = ttk.Scrollbar(frame_lista, orient="vertical", command=self.tree_pezzi.yview)
-        self.tree_pezzi.configure(yscrollcommand=scrollbar.set)
-
-        self.tree_pezzi.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+        self.label_totali_pezzi = ttk.Label(frame_pezzi_col, text="", font=("Arial", 8))
+        self.label_totali_pezzi.pack(anchor="w")
 
         # Frame risultati
         frame_risultati = ttk.LabelFrame(self.root, text="Risultati", padding=10)
@@ -315,38 +4910,178 @@ class ApplicativoGUI:
         frame_azioni.pack(side="left")
 
         ttk.Button(frame_azioni, text="OTTIMIZZA", command=self.ottimizza, width=18).pack(side="left", padx=(0, 5))
-        ttk.Button(frame_azioni, text="GENERA PDF", command=self.genera_pdf, width=18).pack(side="left")
+        ttk.Button(frame_azioni, text="STIMA", command=self.stima_rapida, width=10).pack(side="left", padx=(0, 5))
+        ttk.Button(frame_azioni, text="GENERA PDF", command=self.genera_pdf, width=18).pack(side="left", padx=(0, 5))
+        ttk.Button(frame_azioni, text="ESPORTA EXCEL", command=self.esporta_excel, width=18).pack(side="left", padx=(0, 5))
+        ttk.Button(frame_azioni, text="CONFERMA TAGLIO", command=self.conferma_taglio, width=18).pack(side="left", padx=(0, 5))
+        ttk.Button(frame_azioni, text="Dettagli", command=self.mostra_dettagli_prestazioni, width=10).pack(side="left")
 
         # Statistiche a destra
         self.label_stats = ttk.Label(frame_top_risultati, text="", font=("Arial", 9, "bold"))
         self.label_stats.pack(side="left", padx=(20, 0))
 
-        # Tabella risultati
-        self.tree_risultati = ttk.Treeview(frame_risultati, columns=("Barra", "Lunghezza", "Tagli", "Num Tagli", "Sfrido"), show="headings", height=8)
-        self.tree_risultati.heading("Barra", text="Barra #")
-        self.tree_risultati.heading("Lunghezza", text="Lung. Barra")
-        self.tree_risultati.heading("Tagli", text="Tagli (mm)")
-        self.tree_risultati.heading("Num Tagli", text="N° Tagli")
-        self.tree_risultati.heading("Sfrido", text="Sfrido (mm)")
+        # Controlli della vista risultati: raggruppamento e filtro
+        frame_vista = ttk.Frame(frame_risultati)
+        frame_vista.pack(fill="x", pady=(0, 5))
+
+        self.raggruppa_pattern = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frame_vista, text="Raggruppa pattern uguali", variable=self.raggruppa_pattern,
+                        command=self._aggiorna_tabella_risultati).pack(side="left")
+
+        ttk.Label(frame_vista, text="Filtro:").pack(side="left", padx=(20, 5))
+        self.combo_filtro = ttk.Combobox(frame_vista, values=FILTRI_RISULTATI, state="readonly", width=20)
+        self.combo_filtro.current(0)
+        self.combo_filtro.pack(side="left")
+        self.entry_filtro = ttk.Entry(frame_vista, width=10)
+        self.entry_filtro.pack(side="left", padx=5)
+        self.entry_filtro.bind("<Return>", lambda e: self._aggiorna_tabella_risultati())
+        ttk.Button(frame_vista, text="Applica", command=self._aggiorna_tabella_risultati, width=8).pack(side="left")
+        ttk.Button(frame_vista, text="Rimuovi", command=self._rimuovi_filtro_risultati, width=8).pack(side="left", padx=5)
+
+        self.label_vista = ttk.Label(frame_vista, text="", font=("Arial", 8))
+        self.label_vista.pack(side="left", padx=10)
+
+        # Tabella risultati virtualizzata: le righe (e le stringhe dei tagli)
+        # vengono costruite solo quando diventano visibili
+        self.ordinamento_risultati = None  # (colonna, decrescente) oppure None
+        self.tabella_risultati = TabellaVirtuale(frame_risultati,
+                                                 [c for c, _, _ in COLONNE_RISULTATI],
+                                                 [t for _, t, _ in COLONNE_RISULTATI],
+                                                 [w for _, _, w in COLONNE_RISULTATI],
+                                                 height=8, formatta=self._formatta_riga_risultato)
+        for colonna in ("Barra", "Lunghezza", "Num Tagli", "Sfrido"):
+            self.tabella_risultati.tree.heading(colonna, command=lambda c=colonna: self._ordina_risultati(c))
+        self.tabella_risultati.pack(fill="both", expand=True)
+
+        self._aggiorna_totali_barre()
+        self._aggiorna_totali_pezzi()
+
+    def _formatta_riga_risultato(self, riga):
+        """Valori di una riga risultati: (numero barra, pattern, copie o None, ordine dei tagli)"""
+        numero, pattern, copie, ordine = riga
+        tagli = " + ".join(str(int(t)) for t in ordine)
+        if copie is None:
+            etichetta = numero
+        else:
+            # Vista raggruppata: intervallo di barre della distinta e ordine del primo fascio
+            etichetta = f"#{numero}" if copie == 1 else f"#{numero}-{numero + copie - 1} ({copie}×)"
+            if -(-copie // self.parametri_sega.barre_per_fascio) > 1 and ordine != ordine[::-1]:
+                tagli += " (alterna)"
+        return (etichetta, pattern.descrizione_barra, tagli,
+                pattern.num_tagli, f"{pattern.sfrido:.1f}")
+
+    def _aggiorna_tabella_risultati(self):
+        """Ricostruisce la vista risultati applicando raggruppamento, filtro e ordinamento
+
+        Filtro e ordinamento lavorano sui passi del piano sequenziato; in vista
+        per barra le righe sono espanse solo quando vengono visualizzate.
+        Numeri di barra e ordine dei tagli sono quelli del report PDF e
+        dell'export Excel, così lo schermo corrisponde alla distinta stampata.
+        """
+        piano = self.risultati_ottimizzazione
+        barre_per_fascio = self.parametri_sega.barre_per_fascio
+        sequenza = sequenzia_piano(piano, barre_per_fascio)
+
+        # Una voce per passo della sequenza: (numero prima barra, pattern, copie, ordine)
+        righe = [(sequenza.numero_prima_barra(j), pattern, copie, ordine)
+                 for j, (pattern, copie, ordine) in enumerate(sequenza.passi)]
+
+        testo_filtro = self.entry_filtro.get().strip()
+        filtro_valido = True
+        if testo_filtro:
+            try:
+                valore = float(testo_filtro.replace(",", "."))
+            except ValueError:
+                # Il filtro non valido si svuota: la tabella mostra comunque il piano corrente
+                filtro_valido = False
+                self.entry_filtro.delete(0, tk.END)
+
+        if testo_filtro and filtro_valido:
+            criterio = self.combo_filtro.get()
+            if criterio == FILTRO_PEZZO:
+                righe = [r for r in righe if valore in r[1].tagli]
+            elif criterio == FILTRO_LUNGHEZZA:
+                righe = [r for r in righe if r[1].lunghezza == valore]
+            elif criterio == FILTRO_SFRIDO:
+                righe = [r for r in righe if r[1].sfrido >= valore]
+
+        decrescente = False
+        if self.ordinamento_risultati is not None:
+            colonna, decrescente = self.ordinamento_risultati
+            if colonna == "Barra":
+                chiave = lambda r: r[0]
+            elif colonna == "Lunghezza":
+                chiave = lambda r: r[1].lunghezza
+            elif colonna == "Num Tagli":
+                chiave = lambda r: r[1].num_tagli
+            else:
+                chiave = lambda r: r[1].sfrido
+            righe.sort(key=chiave, reverse=decrescente)
+
+        if self.raggruppa_pattern.get():
+            vista = righe
+            num_barre = sum(r[2] for r in righe)
+        else:
+            vista = _VistaBarre(righe, decrescente, barre_per_fascio)
+            num_barre = len(vista)
+
+        self.tabella_risultati.imposta_dati(vista)
+        self.label_vista.config(text=f"Righe: {len(vista)} | Barre: {num_barre}" if piano else "")
+        if not filtro_valido:
+            messagebox.showerror("Errore", "Inserire un valore numerico valido per il filtro")
+
+    def _ordina_risultati(self, colonna):
+        """Ordina la tabella risultati per colonna (un secondo click inverte l'ordine)"""
+        if self.ordinamento_risultati is not None and self.ordinamento_risultati[0] == colonna:
+            self.ordinamento_risultati = (colonna, not self.ordinamento_risultati[1])
+        else:
+            self.ordinamento_risultati = (colonna, False)
 
-        self.tree_risultati.column("Barra", width=70)
-        self.tree_risultati.column("Lunghezza", width=100)
-        self.tree_risultati.column("Tagli", width=400)
-        self.tree_risultati.column("Num Tagli", width=80)
-        self.tree_risultati.column("Sfrido", width=100)
+        for nome, testo, _ in COLONNE_RISULTATI:
+            if nome == colonna:
+                testo += " ▼" if self.ordinamento_risultati[1] else " ▲"
+            self.tabella_risultati.tree.heading(nome, text=testo)
 
-        scrollbar_ris = ttk.Scrollbar(frame_risultati, orient="vertical", command=self.tree_risultati.yview)
-        self.tree_risultati.configure(yscrollcommand=scrollbar_ris.set)
+        self._aggiorna_tabella_risultati()
 
-        self.tree_risultati.pack(side="left", fill="both", expand=True)
-        scrollbar_ris.pack(side="right", fill="y")
+    def _rimuovi_filtro_risultati(self):
+        self.entry_filtro.delete(0, tk.END)
+        self._aggiorna_tabella_risultati()
+
+    def _formatta_barra(self, riga):
+        """Valori di riga della tabella barre (quantità o 'Catalogo', lunghezza, costo)"""
+        if self.modalita.get() == "disponibili":
+            qty, lunghezza = riga
+        else:
+            qty, lunghezza = "Catalogo", riga
+        costo = self.costi_barre.get(lunghezza)
+        costo_display = f"{costo:.2f}" if costo is not None else "-"
+        return (qty, lunghezza, costo_display)
+
+    def _aggiorna_totali_barre(self):
+        """Aggiorna la riga di totali aggregati sotto la lista barre"""
+        if self.modalita.get() == "disponibili":
+            num_barre = sum(qty for qty, _ in self.barre_disponibili)
+            lunghezza_tot = sum(qty * lung for qty, lung in self.barre_disponibili)
+            testo = (f"Righe: {len(self.barre_disponibili)} | Barre: {num_barre} | "
+                     f"Lunghezza totale: {lunghezza_tot / 1000:.1f} m")
+        else:
+            testo = f"Lunghezze catalogo: {len(self.lunghezze_catalogo)}"
+        self.label_totali_barre.config(text=testo)
+
+    def _aggiorna_totali_pezzi(self):
+        """Aggiorna la riga di totali aggregati sotto la lista pezzi"""
+        num_pezzi = sum(qty for qty, _ in self.pezzi_richiesti)
+        lunghezza_tot = sum(qty * lung for qty, lung in self.pezzi_richiesti)
+        self.label_totali_pezzi.config(
+            text=f"Righe: {len(self.pezzi_richiesti)} | Pezzi: {num_pezzi} | "
+                 f"Lunghezza totale: {lunghezza_tot / 1000:.1f} m")
 
     def cambia_modalita(self):
         """Cambia tra modalità 'disponibili' e 'calcola fabbisogno'"""
         modalita = self.modalita.get()
 
         # Pulisci liste
-        self.tree_barre.delete(*self.tree_barre.get_children())
         self.barre_disponibili = []
         self.lunghezze_catalogo = []
         self.costi_barre = {}
@@ -359,15 +5094,19 @@ class ApplicativoGUI:
             self.frame_barre.config(text="Barre Disponibili")
             self.label_qty_barra.grid()
             self.entry_qty_barra.grid()
-            self.tree_barre.heading("Quantità", text="Quantità")
-            self.tree_barre.column("Quantità", width=70)
+            self.tabella_barre.tree.heading("Quantità", text="Quantità")
+            self.tabella_barre.tree.column("Quantità", width=70)
+            self.tabella_barre.imposta_dati(self.barre_disponibili)
         else:
             # Modalità calcola: nascondi campo quantità
             self.frame_barre.config(text="Lunghezze Catalogo Barre")
             self.label_qty_barra.grid_remove()
             self.entry_qty_barra.grid_remove()
-            self.tree_barre.heading("Quantità", text="Tipo")
-            self.tree_barre.column("Quantità", width=70)
+            self.tabella_barre.tree.heading("Quantità", text="Tipo")
+            self.tabella_barre.tree.column("Quantità", width=70)
+            self.tabella_barre.imposta_dati(self.lunghezze_catalogo)
+
+        self._aggiorna_totali_barre()
 
     def aggiungi_barra(self):
         try:
@@ -396,8 +5135,6 @@ class ApplicativoGUI:
                     return
 
                 self.barre_disponibili.append((qty, lunghezza))
-                costo_display = f"{costo:.2f}" if costo is not None else "-"
-                self.tree_barre.insert("", "end", values=(qty, lunghezza, costo_display))
             else:
                 # Modalità calcola: solo lunghezza
                 if lunghezza in self.lunghezze_catalogo:
@@ -405,8 +5142,9 @@ class ApplicativoGUI:
                     return
 
                 self.lunghezze_catalogo.append(lunghezza)
-                costo_display = f"{costo:.2f}" if costo is not None else "-"
-                self.tree_barre.insert("", "end", values=("Catalogo", lunghezza, costo_display))
+
+            self.tabella_barre.aggiorna()
+            self._aggiorna_totali_barre()
 
             self.entry_qty_barra.delete(0, tk.END)
             self.entry_lung_barra.delete(0, tk.END)
@@ -416,11 +5154,8 @@ class ApplicativoGUI:
             messagebox.showerror("Errore", "Inserire valori numerici validi")
 
     def rimuovi_barra(self):
-        selected = self.tree_barre.selection()
-        if selected:
-            idx = self.tree_barre.index(selected[0])
-            self.tree_barre.delete(selected[0])
-
+        idx = self.tabella_barre.indice_selezionato()
+        if idx is not None:
             modalita = self.modalita.get()
             if modalita == "disponibili":
                 _, lunghezza = self.barre_disponibili.pop(idx)
@@ -431,6 +5166,9 @@ class ApplicativoGUI:
                 if lunghezza in self.costi_barre:
                     del self.costi_barre[lunghezza]
 
+            self.tabella_barre.aggiorna()
+            self._aggiorna_totali_barre()
+
     def aggiungi_pezzo(self):
         try:
             qty = int(self.entry_quantita.get())
@@ -441,7 +5179,8 @@ class ApplicativoGUI:
                 return
 
             self.pezzi_richiesti.append((qty, lunghezza))
-            self.tree_pezzi.insert("", "end", values=(qty, lunghezza))
+            self.tabella_pezzi.aggiorna()
+            self._aggiorna_totali_pezzi()
 
             self.entry_quantita.delete(0, tk.END)
             self.entry_lunghezza.delete(0, tk.END)
@@ -450,225 +5189,187 @@ class ApplicativoGUI:
             messagebox.showerror("Errore", "Inserire valori numerici validi")
 
     def rimuovi_pezzo(self):
-        selected = self.tree_pezzi.selection()
-        if selected:
-            idx = self.tree_pezzi.index(selected[0])
-            self.tree_pezzi.delete(selected[0])
+        idx = self.tabella_pezzi.indice_selezionato()
+        if idx is not None:
             self.pezzi_richiesti.pop(idx)
+            self.tabella_pezzi.aggiorna()
+            self._aggiorna_totali_pezzi()
 
     def pulisci_pezzi(self):
-        self.tree_pezzi.delete(*self.tree_pezzi.get_children())
         self.pezzi_richiesti = []
+        self.tabella_pezzi.imposta_dati(self.pezzi_richiesti)
+        self._aggiorna_totali_pezzi()
 
-    def importa_barre_excel(self):
-        """Importa barre disponibili da file Excel (ottimizzato per file grandi)"""
-        filename = filedialog.askopenfilename(
-            title="Seleziona file Excel con barre disponibili",
-            filetypes=[("Excel files", "*.xlsx *.xls"), ("All files", "*.*")]
-        )
-
-        if not filename:
-            return
-
-        try:
-            # read_only=True per ottimizzare lettura file grandi
-            wb = load_workbook(filename, data_only=True, read_only=True)
-
-            # Cerca il foglio giusto
-            ws = None
-            for nome_foglio in ["Barre", "Magazzino", "Barre Disponibili", "Disponibili"]:
-                if nome_foglio in wb.sheetnames:
-                    ws = wb[nome_foglio]
-                    break
-
-            if ws is None:
-                ws = wb.active
-
-            modalita = self.modalita.get()
-            righe_importate = 0
-            errori = []
-
-            # Batch insert per migliorare performance GUI
-            batch_data = []
-            batch_size = 50
-
-            # Salta l'intestazione e leggi i dati
-            for idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-                if not row or all(cell is None for cell in row):
-                    continue
-
-                try:
-                    if modalita == "disponibili":
-                        qty = row[0]
-                        lunghezza = row[1]
-                        costo = row[2] if len(row) > 2 else None
-
-                        if qty is None or lunghezza is None:
-                            continue
-
-                        qty = int(float(qty))
-                        lunghezza = float(lunghezza)
-
-                        if qty <= 0 or lunghezza <= 0:
-                            if len(errori) < 100:  # Limita errori memorizzati
-                                errori.append(f"Riga {idx}: valori devono essere positivi")
-                            continue
-
-                        if costo is not None and costo != "":
-                            costo = float(costo)
-                            if costo >= 0:
-                                self.costi_barre[lunghezza] = costo
+    def _importa_in_background(self, lettura, etichetta, al_termine):
+        """Esegue la lettura di un file Excel in un thread separato
 
-                        self.barre_disponibili.append((qty, lunghezza))
-                        costo_display = f"{costo:.2f}" if costo is not None and costo != "" else "-"
-                        batch_data.append((qty, lunghezza, costo_display))
-                        righe_importate += 1
+        Il thread si limita a leggere il file; l'aggiornamento dei dati e dei
+        widget avviene nel thread di Tk tramite polling con root.after.
 
+        Args:
+            lettura: Funzione lettura(progresso) eseguita nel thread di lavoro
+            etichetta: Label in cui mostrare l'avanzamento
+            al_termine: Funzione chiamata nel thread di Tk con il risultato di lettura
+        """
+        coda = queue.Queue()
+        self._importazione_in_corso = True
+        etichetta.config(text="Importazione in corso...")
+
+        def lavoro():
+            try:
+                risultato = lettura(lambda n: coda.put(("progresso", n)))
+                coda.put(("fine", risultato))
+            except Exception as e:
+                coda.put(("errore", e))
+
+        def controlla():
+            try:
+                while True:
+                    tipo, valore = coda.get_nowait()
+                    if tipo == "progresso":
+                        etichetta.config(text=f"Importazione in corso... {valore} righe lette")
+                        continue
+                    self._importazione_in_corso = False
+                    if tipo == "fine":
+                        al_termine(valore)
                     else:
-                        lunghezza = row[0]
-                        costo = row[1] if len(row) > 1 else None
-
-                        if lunghezza is None:
-                            continue
-
-                        lunghezza = float(lunghezza)
-
-                        if lunghezza <= 0:
-                            if len(errori) < 100:
-                                errori.append(f"Riga {idx}: lunghezza deve essere positiva")
-                            continue
-
-                        if lunghezza in self.lunghezze_catalogo:
-                            if len(errori) < 100:
-                                errori.append(f"Riga {idx}: lunghezza {lunghezza} già presente")
-                            continue
-
-                        if costo is not None and costo != "":
-                            costo = float(costo)
-                            if costo >= 0:
-                                self.costi_barre[lunghezza] = costo
-
-                        self.lunghezze_catalogo.append(lunghezza)
-                        costo_display = f"{costo:.2f}" if costo is not None and costo != "" else "-"
-                        batch_data.append(("Catalogo", lunghezza, costo_display))
-                        righe_importate += 1
-
-                    # Inserimento batch per performance
-                    if len(batch_data) >= batch_size:
-                        for data in batch_data:
-                            self.tree_barre.insert("", "end", values=data)
-                        batch_data.clear()
-                        self.root.update_idletasks()  # Aggiorna GUI periodicamente
-
-                except (ValueError, TypeError) as e:
-                    if len(errori) < 100:
-                        errori.append(f"Riga {idx}: errore nei dati - {str(e)}")
-                    continue
+                        messagebox.showerror("Errore", f"Errore durante l'importazione del file Excel:\n{str(valore)}")
+                    self._aggiorna_totali_barre()
+                    self._aggiorna_totali_pezzi()
+                    return
+            except queue.Empty:
+                self.root.after(100, controlla)
 
-            # Inserisci i dati rimanenti
-            for data in batch_data:
-                self.tree_barre.insert("", "end", values=data)
+        threading.Thread(target=lavoro, daemon=True).start()
+        self.root.after(100, controlla)
 
-            wb.close()
+    def _esegui_con_progresso(self, titolo, lavoro, al_termine, messaggio_errore):
+        """Esegue un lavoro lungo in un thread separato mostrando una barra di avanzamento
 
-            # Mostra risultati
-            msg = f"Importazione completata!\n\nRighe importate: {righe_importate}"
-            if errori:
-                num_errori = min(len(errori), 100)
-                msg += f"\n\nErrori trovati (primi {num_errori}):\n" + "\n".join(errori[:5])
-                if len(errori) > 5:
-                    msg += f"\n... e altri {len(errori) - 5} errori"
-                messagebox.showwarning("Importazione completata con errori", msg)
-            else:
-                messagebox.showinfo("Successo", msg)
+        Args:
+            titolo: Titolo della finestra di avanzamento
+            lavoro: Funzione lavoro(progresso) eseguita nel thread; progresso(fatto, totale)
+            al_termine: Funzione chiamata nel thread di Tk con il risultato del lavoro
+            messaggio_errore: Testo mostrato prima del dettaglio in caso di errore
+        """
+        # Finestra modale che ha il grab (es. gli scenari): lo riavrà alla fine, anche in caso di errore
+        precedente = self.root.grab_current()
+        finestra = tk.Toplevel(self.root)
+        finestra.title(titolo)
+        finestra.geometry("350x100")
+        finestra.transient(self.root)
+        finestra.grab_set()
+        finestra.protocol("WM_DELETE_WINDOW", lambda: None)  # Non chiudibile durante il lavoro
+        self.imposta_icona(finestra)
+
+        etichetta = ttk.Label(finestra, text=f"{titolo} in corso...")
+        etichetta.pack(pady=(15, 5))
+        barra_progresso = ttk.Progressbar(finestra, mode="determinate", length=300)
+        barra_progresso.pack(pady=5)
+
+        coda = queue.Queue()
+
+        def esegui():
+            try:
+                risultato = lavoro(lambda fatto, totale: coda.put(("progresso", (fatto, totale))))
+                coda.put(("fine", risultato))
+            except Exception as e:
+                coda.put(("errore", e))
+
+        def controlla():
+            try:
+                while True:
+                    tipo, valore = coda.get_nowait()
+                    if tipo == "progresso":
+                        fatto, totale = valore
+                        barra_progresso.config(maximum=totale, value=fatto)
+                        etichetta.config(text=f"{titolo}: {fatto}/{totale}")
+                        continue
+                    finestra.destroy()
+                    if precedente is not None and precedente.winfo_exists():
+                        precedente.grab_set()
+                    if tipo == "fine":
+                        al_termine(valore)
+                    else:
+                        messagebox.showerror("Errore", f"{messaggio_errore}:\n{str(valore)}",
+                                             parent=precedente or self.root)
+                    return
+            except queue.Empty:
+                self.root.after(100, controlla)
+
+        threading.Thread(target=esegui, daemon=True).start()
+        self.root.after(100, controlla)
+
+    def _mostra_esito_importazione(self, righe_importate, errori):
+        """Mostra il riepilogo di un'importazione Excel"""
+        msg = f"Importazione completata!\n\nRighe importate: {righe_importate}"
+        if errori:
+            num_errori = min(len(errori), 100)
+            msg += f"\n\nErrori trovati (primi {num_errori}):\n" + "\n".join(errori[:5])
+            if len(errori) > 5:
+                msg += f"\n... e altri {len(errori) - 5} errori"
+            messagebox.showwarning("Importazione completata con errori", msg)
+        else:
+            messagebox.showinfo("Successo", msg)
 
-        except Exception as e:
-            messagebox.showerror("Errore", f"Errore durante l'importazione del file Excel:\n{str(e)}")
+    def importa_barre_excel(self):
+        """Importa barre disponibili da file Excel (lettura in background)"""
+        if self._importazione_in_corso:
+            messagebox.showwarning("Attenzione", "Importazione già in corso")
+            return
 
-    def importa_pezzi_excel(self):
-        """Importa pezzi richiesti da file Excel (ottimizzato)"""
         filename = filedialog.askopenfilename(
-            title="Seleziona file Excel con pezzi da tagliare",
+            title="Seleziona file Excel con barre disponibili",
             filetypes=[("Excel files", "*.xlsx *.xls"), ("All files", "*.*")]
         )
 
         if not filename:
             return
 
-        try:
-            wb = load_workbook(filename, data_only=True, read_only=True)
-
-            # Cerca il foglio giusto
-            ws = None
-            for nome_foglio in ["Pezzi", "Tagli", "Pezzi Richiesti", "Lista Tagli"]:
-                if nome_foglio in wb.sheetnames:
-                    ws = wb[nome_foglio]
-                    break
-
-            if ws is None:
-                ws = wb.active
-
-            righe_importate = 0
-            errori = []
-
-            # Batch insert per performance
-            batch_data = []
-            batch_size = 50
-
-            # Salta l'intestazione e leggi i dati (Quantità, Lunghezza)
-            for idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-                if not row or all(cell is None for cell in row):
-                    continue
-
-                try:
-                    qty = row[0]
-                    lunghezza = row[1]
-
-                    if qty is None or lunghezza is None:
-                        continue
-
-                    qty = int(float(qty))
-                    lunghezza = float(lunghezza)
+        modalita = self.modalita.get()
+        lunghezze_presenti = tuple(self.lunghezze_catalogo)
 
-                    if qty <= 0 or lunghezza <= 0:
-                        if len(errori) < 100:
-                            errori.append(f"Riga {idx}: valori devono essere positivi")
-                        continue
+        def al_termine(risultato):
+            righe, costi, errori = risultato
+            if self.modalita.get() != modalita:
+                messagebox.showwarning("Attenzione", "Modalità cambiata durante l'importazione: dati scartati")
+                return
 
-                    self.pezzi_richiesti.append((qty, lunghezza))
-                    batch_data.append((qty, lunghezza))
-                    righe_importate += 1
+            self.costi_barre.update(costi)
+            if modalita == "disponibili":
+                self.barre_disponibili.extend(righe)
+            else:
+                self.lunghezze_catalogo.extend(righe)
+            self.tabella_barre.aggiorna()
+            self._mostra_esito_importazione(len(righe), errori)
 
-                    # Inserimento batch
-                    if len(batch_data) >= batch_size:
-                        for data in batch_data:
-                            self.tree_pezzi.insert("", "end", values=data)
-                        batch_data.clear()
-                        self.root.update_idletasks()
+        self._importa_in_background(
+            lambda progresso: leggi_barre_excel(filename, modalita, lunghezze_presenti, progresso),
+            self.label_totali_barre, al_termine)
 
-                except (ValueError, TypeError) as e:
-                    if len(errori) < 100:
-                        errori.append(f"Riga {idx}: errore nei dati - {str(e)}")
-                    continue
+    def importa_pezzi_excel(self):
+        """Importa pezzi richiesti da file Excel (lettura in background)"""
+        if self._importazione_in_corso:
+            messagebox.showwarning("Attenzione", "Importazione già in corso")
+            return
 
-            # Inserisci i dati rimanenti
-            for data in batch_data:
-                self.tree_pezzi.insert("", "end", values=data)
+        filename = filedialog.askopenfilename(
+            title="Seleziona file Excel con pezzi da tagliare",
+            filetypes=[("Excel files", "*.xlsx *.xls"), ("All files", "*.*")]
+        )
 
-            wb.close()
+        if not filename:
+            return
 
-            # Mostra risultati
-            msg = f"Importazione completata!\n\nRighe importate: {righe_importate}"
-            if errori:
-                msg += f"\n\nErrori trovati ({len(errori)}):\n" + "\n".join(errori[:5])
-                if len(errori) > 5:
-                    msg += f"\n... e altri {len(errori) - 5} errori"
-                messagebox.showwarning("Importazione completata con errori", msg)
-            else:
-                messagebox.showinfo("Successo", msg)
+        def al_termine(risultato):
+            righe, errori = risultato
+            self.pezzi_richiesti.extend(righe)
+            self.tabella_pezzi.aggiorna()
+            self._mostra_esito_importazione(len(righe), errori)
 
-        except Exception as e:
-            messagebox.showerror("Errore", f"Errore durante l'importazione del file Excel:\n{str(e)}")
+        self._importa_in_background(
+            lambda progresso: leggi_pezzi_excel(filename, progresso),
+            self.label_totali_pezzi, al_termine)
 
     def crea_excel_esempio(self):
         """Crea file Excel di esempio per l'importazione"""
@@ -787,6 +5488,53 @@ class ApplicativoGUI:
             filepath3 = os.path.join(directory, "esempio_pezzi_richiesti.xlsx")
             wb3.save(filepath3)
 
+            # === FILE 4: Commessa multi-profilo ===
+            wb4 = Workbook()
+            fogli_commessa = [
+                ("Pezzi", ["Profilo", "Quantità", "Lunghezza (mm)"],
+                 [["IPE80", 6, 2100], ["IPE80", 10, 900], ["Tubo 40x40", 12, 1500], ["Tubo 40x40", 4, 2750],
+                  ["Piatto 50x5", 20, 640]]),
+                ("Barre", ["Profilo", "Quantità", "Lunghezza (mm)", "Costo (€)"],
+                 [["IPE80", None, 6000, 48.00], ["IPE80", None, 12000, 92.00],
+                  ["Tubo 40x40", None, 6000, 31.50], ["Piatto 50x5", 3, 6000, 18.00]]),
+                ("Profili", ["Profilo", "Spessore lama (mm)"],
+                 [["IPE80", 4.0], ["Tubo 40x40", 3.0], ["Piatto 50x5", 2.5]]),
+            ]
+            for indice_foglio, (titolo, intestazioni, dati) in enumerate(fogli_commessa):
+                ws4 = wb4.active if indice_foglio == 0 else wb4.create_sheet()
+                ws4.title = titolo
+                ws4.append(intestazioni)
+                for cella in ws4[1]:
+                    cella.fill = header_fill
+                    cella.font = header_font
+                    cella.alignment = Alignment(horizontal='center', vertical='center')
+                for row_data in dati:
+                    ws4.append(row_data)
+                for colonna in "ABCD":
+                    ws4.column_dimensions[colonna].width = 18
+
+            filepath4 = os.path.join(directory, "esempio_commessa_multiprofilo.xlsx")
+            wb4.save(filepath4)
+
+            # === FILE 5: Coda ordini per un lotto ===
+            wb5 = Workbook()
+            ws5 = wb5.active
+            ws5.title = "Ordini"
+            ws5.append(["Ordine", "Quantità", "Lunghezza (mm)", "Scadenza (giorni o data)"])
+            for cella in ws5[1]:
+                cella.fill = header_fill
+                cella.font = header_font
+                cella.alignment = Alignment(horizontal='center', vertical='center')
+            for row_data in [["ORD-101", 3, 2100, 2], ["ORD-101", 2, 900, 2], ["ORD-102", 4, 1750, 3],
+                             ["ORD-103", 2, 2400, 10], ["ORD-103", 6, 600, 10], ["ORD-104", 3, 1200, None],
+                             ["ORD-105", 5, 850, 15]]:
+                ws5.append(row_data)
+            for colonna in "ABCD":
+                ws5.column_dimensions[colonna].width = 20
+
+            filepath5 = os.path.join(directory, "esempio_ordini.xlsx")
+            wb5.save(filepath5)
+
             messagebox.showinfo("Successo",
                               f"File Excel di esempio creati con successo!\n\n"
                               f"1. {os.path.basename(filepath1)}\n"
@@ -795,402 +5543,448 @@ class ApplicativoGUI:
                               f"   → Usalo in modalità 'Calcola fabbisogno'\n\n"
                               f"3. {os.path.basename(filepath3)}\n"
                               f"   → Per importare i pezzi da tagliare\n\n"
+                              f"4. {os.path.basename(filepath4)}\n"
+                              f"   → Usalo con 'Commessa Multi-profilo' (quantità vuota = illimitate)\n\n"
+                              f"5. {os.path.basename(filepath5)}\n"
+                              f"   → Usalo con 'Lotto Ordini' (scadenza vuota = nessuna urgenza)\n\n"
                               f"Percorso: {directory}")
 
         except Exception as e:
             messagebox.showerror("Errore", f"Errore durante la creazione dei file Excel:\n{str(e)}")
 
-    def genera_tutti_scenari(self, pezzi_richiesti, lunghezze_catalogo, spessore_lama, costi_barre=None):
-        """
-        Genera tutti gli scenari possibili di taglio provando diverse combinazioni di barre.
-
-        Args:
-            pezzi_richiesti: Lista di tuple (quantità, lunghezza)
-            lunghezze_catalogo: Lista delle lunghezze disponibili nel catalogo
-            spessore_lama: Spessore della lama in mm
-            costi_barre: Dict opzionale {lunghezza: costo} per calcolare il costo totale
-
-        Returns:
-            Lista di scenari ordinati per spreco crescente. Ogni scenario contiene:
-            - fabbisogno: dict {lunghezza: quantità}
-            - spreco_totale: float
-            - scarti: lista delle lunghezze degli scarti
-            - num_barre_totale: int
-            - costo_totale: float (solo se costi_barre è fornito)
-            - barre_dettaglio: lista delle barre con tagli
-        """
-        import itertools
-
-        # Espandi i pezzi
-        tutti_pezzi = []
-        for qty, lunghezza in pezzi_richiesti:
-            tutti_pezzi.extend([lunghezza] * qty)
-
-        # Ordina per lunghezza decrescente
-        tutti_pezzi.sort(reverse=True)
+    def genera_tutti_scenari(self, pezzi_richiesti, lunghezze_catalogo, spessore_lama, costi_barre=None,
+                             peso_pattern=0):
+        """Genera gli scenari di taglio (vedi GeneratoreScenari.genera_tutti_scenari)"""
+        return GeneratoreScenari().genera_tutti_scenari(pezzi_richiesti, lunghezze_catalogo,
+                                                        spessore_lama, costi_barre, peso_pattern)
 
-        scenari = []
+    def ottimizza(self):
+        if not self.pezzi_richiesti:
+            messagebox.showwarning("Attenzione", "Inserire almeno un pezzo da tagliare")
+            return
 
-        # Strategia 1: Scenario con spreco minimo (algoritmo greedy esistente)
-        scenario_minimo = self._calcola_scenario_greedy(tutti_pezzi, lunghezze_catalogo, spessore_lama, costi_barre)
-        scenari.append(scenario_minimo)
+        modalita = self.modalita.get()
 
-        # Strategia 2: Prova diverse combinazioni forzando l'uso di barre diverse
-        # Per ogni lunghezza di barra, prova a creare scenari che privilegiano quella lunghezza
-        for lung_preferita in sorted(lunghezze_catalogo, reverse=True):
-            scenario = self._calcola_scenario_con_preferenza(tutti_pezzi, lunghezze_catalogo,
-                                                             spessore_lama, lung_preferita, costi_barre)
-            if scenario and not self._scenario_duplicato(scenario, scenari):
-                scenari.append(scenario)
+        if modalita == "disponibili":
+            if not self.barre_disponibili:
+                messagebox.showwarning("Attenzione", "Inserire almeno una barra disponibile")
+                return
+            # Modalità disponibili: usa algoritmo classico
+            with Strumentazione() as strumentazione:
+                piano = self._ottimizza_con_barre_disponibili()
+            motore = "ottimizza"
+            lunghezza_max = max(l for _, l in self.barre_disponibili)
+            costo = self.costo_barre_intere or None
+        else:
+            if not self.lunghezze_catalogo:
+                messagebox.showwarning("Attenzione", "Inserire almeno una lunghezza nel catalogo")
+                return
+            # Modalità calcola: mostra tutti gli scenari
+            with Strumentazione() as strumentazione:
+                scenari = self._mostra_scenari()
+            motore = "scenari"
+            lunghezza_max = max(self.lunghezze_catalogo)
+            # Nello storico finisce lo scenario con meno barre
+            migliore = min(scenari, key=lambda s: s['num_barre_totale']) if scenari else None
+            piano = migliore['piano'] if migliore else None
+            costo = migliore['costo_totale'] if migliore else None
+
+        self.ultima_strumentazione = strumentazione
+        try:
+            spessore_lama = float(self.entry_spessore_lama.get())
+        except ValueError:
+            return
+        StoricoEsecuzioni().registra(modalita, motore, self.pezzi_richiesti, lunghezza_max,
+                                     spessore_lama, piano, strumentazione, costo)
 
-        # Strategia 3: Scenario con numero minimo di barre (privilegia barre lunghe)
-        scenario_min_barre = self._calcola_scenario_min_barre(tutti_pezzi, lunghezze_catalogo,
-                                                               spessore_lama, costi_barre)
-        if scenario_min_barre and not self._scenario_duplicato(scenario_min_barre, scenari):
-            scenari.append(scenario_min_barre)
+    def stima_rapida(self):
+        """Stima immediata di barre e costo per ogni lunghezza, senza calcolare il piano
 
-        # Strategia 4: Scenario con scarti più lunghi
-        scenario_scarti_lunghi = self._calcola_scenario_scarti_lunghi(tutti_pezzi, lunghezze_catalogo,
-                                                                       spessore_lama, costi_barre)
-        if scenario_scarti_lunghi and not self._scenario_duplicato(scenario_scarti_lunghi, scenari):
-            scenari.append(scenario_scarti_lunghi)
+        Pensata per i preventivi: usa solo i limiti di stima_fabbisogno.
+        """
+        if not self.pezzi_richiesti:
+            messagebox.showwarning("Attenzione", "Inserire almeno un pezzo da tagliare")
+            return
+        if self.modalita.get() == "disponibili":
+            lunghezze = sorted({l for _, l in self.barre_disponibili})
+        else:
+            lunghezze = list(self.lunghezze_catalogo)
+        if not lunghezze:
+            messagebox.showwarning("Attenzione", "Inserire almeno una lunghezza di barra")
+            return
+        try:
+            spessore_lama = float(self.entry_spessore_lama.get())
+        except ValueError:
+            messagebox.showerror("Errore", "Spessore lama non valido")
+            return
 
-        # Ordina gli scenari per spreco crescente
-        scenari.sort(key=lambda x: x['spreco_totale'])
+        inizio = time.perf_counter()
+        stime = stima_fabbisogno(self.pezzi_richiesti, lunghezze, spessore_lama, self.costi_barre)
+        durata = time.perf_counter() - inizio
+
+        righe = []
+        for stima in stime:
+            testo = f"{int(stima['lunghezza'])} mm: "
+            if stima['barre_min'] is None:
+                righe.append(testo + "non utilizzabile (pezzi più lunghi della barra)")
+                continue
+            testo += f"{stima['barre_min']}-{stima['barre_max']} barre"
+            if stima['costo_min'] is not None:
+                testo += f"  (€{stima['costo_min']:.2f} - €{stima['costo_max']:.2f})"
+            righe.append(testo)
+        pezzi = sum(q for q, _ in self.pezzi_richiesti)
+        messagebox.showinfo("Stima rapida",
+                            f"Pezzi: {pezzi} | Lama: {spessore_lama} mm\n"
+                            f"Barre necessarie usando una sola lunghezza (minimo-massimo):\n\n"
+                            + "\n".join(righe)
+                            + f"\n\nCalcolata in {durata * 1000:.2f} ms. Per il piano esatto usare OTTIMIZZA.")
+
+    def conferma_taglio(self):
+        """Conferma l'esecuzione del piano: aggiorna il magazzino scarti
+
+        Gli scarti usati dal piano vengono tolti dal magazzino e gli sfridi
+        lunghi almeno LUNGHEZZA_MINIMA_SCARTO vengono registrati come nuovi scarti.
+        """
+        piano = self.risultati_ottimizzazione
+        if not piano:
+            messagebox.showwarning("Attenzione", "Eseguire prima l'ottimizzazione")
+            return
 
-        return scenari
+        nuovi = sum(copie for pattern, copie in piano.voci
+                    if not pattern.profilo and pattern.sfrido >= LUNGHEZZA_MINIMA_SCARTO)
+        if not messagebox.askyesno(
+                "Conferma taglio",
+                f"Confermi l'esecuzione del piano di taglio?\n\n"
+                f"Scarti prelevati dal magazzino: {len(self.scarti_usati)}\n"
+                f"Nuovi scarti da registrare (≥ {LUNGHEZZA_MINIMA_SCARTO} mm): {nuovi}"):
+            return
 
-    def _scenario_duplicato(self, scenario, lista_scenari):
-        """Verifica se uno scenario è duplicato (stesso fabbisogno)"""
-        for s in lista_scenari:
-            if s['fabbisogno'] == scenario['fabbisogno']:
-                return True
-        return False
+        try:
+            magazzino = MagazzinoScarti()
+            magazzino.preleva(self.scarti_usati)
+            magazzino.registra_piano(piano, origine=datetime.now().strftime('%d/%m/%Y'))
+        except (sqlite3.Error, OSError) as e:
+            messagebox.showerror("Errore", f"Impossibile aggiornare il magazzino scarti:\n{str(e)}")
+            return
 
-    def _calcola_scenario_greedy(self, tutti_pezzi, lunghezze_catalogo, spessore_lama, costi_barre):
-        """Algoritmo greedy: minimizza lo spreco per singola barra"""
-        lunghezze_ord = sorted(lunghezze_catalogo)
-        barre_utilizzate = []
-        pezzi_usati = set()
-        n_pezzi = len(tutti_pezzi)
-
-        while len(pezzi_usati) < n_pezzi:
-            # Trova primo pezzo non usato (ottimizzato)
-            pezzo_idx = next(i for i in range(n_pezzi) if i not in pezzi_usati)
-            pezzo = tutti_pezzi[pezzo_idx]
-            inserito = False
-
-            # Cerca barra già aperta (early exit se trovata)
-            miglior_barra_idx = -1
-            miglior_spreco_barra = float('inf')
-
-            for idx, barra in enumerate(barre_utilizzate):
-                if pezzo <= barra['spazio_rimanente']:
-                    spreco = barra['spazio_rimanente'] - pezzo - spessore_lama
-                    if spreco < miglior_spreco_barra:
-                        miglior_spreco_barra = spreco
-                        miglior_barra_idx = idx
-                        if spreco == 0:  # Perfect fit, ferma la ricerca
-                            break
+        # Il piano è stato consumato: una seconda conferma non deve ripetere l'operazione
+        self.scarti_usati = []
+        self.risultati_ottimizzazione = PianoTaglio()
+        self._aggiorna_tabella_risultati()
+        self.label_stats.config(text="")
+        messagebox.showinfo("Successo", "Magazzino scarti aggiornato.")
 
-            if miglior_barra_idx >= 0:
-                barra_scelta = barre_utilizzate[miglior_barra_idx]
-                barra_scelta['pezzi'].append(pezzo)
-                barra_scelta['spazio_rimanente'] -= (pezzo + spessore_lama)
-                pezzi_usati.add(pezzo_idx)
-                inserito = True
+    def mostra_magazzino_scarti(self):
+        """Mostra gli scarti in magazzino raggruppati per lunghezza"""
+        try:
+            riepilogo = MagazzinoScarti().riepilogo()
+        except (sqlite3.Error, OSError) as e:
+            messagebox.showerror("Errore", f"Impossibile leggere il magazzino scarti:\n{str(e)}")
+            return
 
-            # Apri nuova barra
-            if not inserito:
-                barre_compatibili = [lung for lung in lunghezze_ord if pezzo <= lung]
-                if not barre_compatibili:
-                    raise ValueError(f"Nessuna barra può contenere il pezzo da {pezzo}mm")
-
-                migliore_barra = barre_compatibili[0]
-                miglior_spreco = float('inf')
-                migliori_pezzi = [pezzo]
-                migliori_idx = [pezzo_idx]
-
-                # Ottimizzazione: limita il numero di barre da testare per grandi dataset
-                max_test = min(3, len(barre_compatibili))
-
-                for lung_barra in barre_compatibili[:max_test]:
-                    spazio_sim = lung_barra - pezzo - spessore_lama
-                    pezzi_sim = [pezzo]
-                    idx_sim = [pezzo_idx]
-
-                    # Ottimizzazione: limita quanti pezzi aggiuntivi cercare
-                    pezzi_aggiunti = 0
-                    max_pezzi_extra = 10
-
-                    for i in range(n_pezzi):
-                        if pezzi_aggiunti >= max_pezzi_extra:
-                            break
-                        if i not in pezzi_usati and i != pezzo_idx:
-                            p = tutti_pezzi[i]
-                            if p <= spazio_sim:
-                                pezzi_sim.append(p)
-                                idx_sim.append(i)
-                                spazio_sim -= (p + spessore_lama)
-                                pezzi_aggiunti += 1
-
-                    if spazio_sim < miglior_spreco:
-                        miglior_spreco = spazio_sim
-                        migliore_barra = lung_barra
-                        migliori_pezzi = pezzi_sim
-                        migliori_idx = idx_sim
-
-                nuova_barra = {
-                    'lunghezza': migliore_barra,
-                    'pezzi': migliori_pezzi,
-                    'spazio_rimanente': miglior_spreco
-                }
-                barre_utilizzate.append(nuova_barra)
-                pezzi_usati.update(migliori_idx)
-
-        return self._crea_scenario(barre_utilizzate, lunghezze_catalogo, costi_barre)
-
-    def _calcola_scenario_con_preferenza(self, tutti_pezzi, lunghezze_catalogo, spessore_lama,
-                                        lung_preferita, costi_barre):
-        """Calcola scenario privilegiando una specifica lunghezza di barra"""
-        lunghezze_ord = [lung_preferita] + [l for l in sorted(lunghezze_catalogo) if l != lung_preferita]
-        barre_utilizzate = []
-        pezzi_usati = set()
-        n_pezzi = len(tutti_pezzi)
-
-        while len(pezzi_usati) < n_pezzi:
-            pezzo_idx = next(i for i in range(n_pezzi) if i not in pezzi_usati)
-            pezzo = tutti_pezzi[pezzo_idx]
-            inserito = False
+        finestra = tk.Toplevel(self.root)
+        finestra.title("Magazzino Scarti")
+        finestra.geometry("350x400")
+        finestra.transient(self.root)
+        self.imposta_icona(finestra)
+
+        totale = sum(q for _, q in riepilogo)
+        totale_mm = sum(l * q for l, q in riepilogo)
+        ttk.Label(finestra, text=f"Scarti: {totale} | Lunghezza totale: {totale_mm / 1000:.1f} m",
+                  font=("Arial", 10, "bold")).pack(anchor="w", padx=10, pady=(10, 5))
+
+        tree = ttk.Treeview(finestra, columns=("lunghezza", "quantita"), show="headings", height=12)
+        tree.heading("lunghezza", text="Lunghezza (mm)")
+        tree.heading("quantita", text="Quantità")
+        tree.column("lunghezza", width=150, anchor="center")
+        tree.column("quantita", width=100, anchor="center")
+        for lunghezza, quantita in riepilogo:
+            tree.insert("", "end", values=(f"{lunghezza:.0f}", quantita))
+        tree.pack(fill="both", expand=True, padx=10, pady=5)
+
+        def svuota():
+            if messagebox.askyesno("Conferma", "Eliminare tutti gli scarti dal magazzino?", parent=finestra):
+                MagazzinoScarti().svuota()
+                finestra.destroy()
+
+        ttk.Button(finestra, text="Svuota magazzino", command=svuota, width=20).pack(pady=10)
+
+    def _peso_pattern(self):
+        """Peso pattern inserito dall'utente (ValueError se non valido)"""
+        testo = self.entry_peso_pattern.get().strip()
+        peso = float(testo) if testo else 0.0
+        if peso < 0:
+            raise ValueError("Il peso pattern non può essere negativo")
+        return peso
+
+    def _testo_tempo_macchina(self, piano):
+        """Parte delle statistiche con il tempo macchina stimato del piano sequenziato"""
+        sequenza = sequenzia_piano(piano, self.parametri_sega.barre_per_fascio)
+        testo = (f" | Tempo macchina stimato: {formatta_durata(sequenza.tempo_macchina(self.parametri_sega))}"
+                 f" ({sequenza.cambi_battuta} cambi battuta)")
+        if len(self.seghe) > 1:
+            pianificazione = pianifica_seghe(piano, self.seghe, self.parametri_sega)
+            testo += f" | Su {len(self.seghe)} seghe: {formatta_durata(pianificazione.makespan)}"
+        return testo
+
+    def imposta_parametri_sega(self):
+        """Finestra per i tempi della sega e le seghe in parallelo"""
+        finestra = tk.Toplevel(self.root)
+        finestra.title("Parametri Sega")
+        finestra.geometry("420x330")
+        finestra.transient(self.root)
+        finestra.grab_set()
+        self.imposta_icona(finestra)
+
+        frame = ttk.Frame(finestra, padding=15)
+        frame.pack(fill="both", expand=True)
+
+        campi = [
+            ("cambio_battuta", "Cambio battuta (s):"),
+            ("carico_barra", "Carico/scarico barra (s):"),
+            ("taglio", "Singolo taglio (s):"),
+            ("cambio_barra", "Cambio lunghezza/profilo barra (s):"),
+            ("barre_per_fascio", "Barre tagliate insieme (fascio):"),
+        ]
+        entries = {}
+        for riga, (attributo, testo) in enumerate(campi):
+            ttk.Label(frame, text=testo).grid(row=riga, column=0, sticky="w", pady=4)
+            entry = ttk.Entry(frame, width=10)
+            entry.insert(0, f"{getattr(self.parametri_sega, attributo):g}")
+            entry.grid(row=riga, column=1, padx=5, pady=4)
+            entries[attributo] = entry
+
+        # Seghe in parallelo: velocità relativa e, facoltativo, setup per lotto
+        riga_seghe = len(campi)
+        ttk.Label(frame, text="Seghe (velocità[:setup s]):").grid(row=riga_seghe, column=0, sticky="w", pady=4)
+        entry_seghe = ttk.Entry(frame, width=18)
+        entry_seghe.insert(0, self.testo_seghe)
+        entry_seghe.grid(row=riga_seghe, column=1, padx=5, pady=4)
+        ttk.Label(frame, text="es. 1, 1, 0.8:120 = tre seghe, la terza più lenta con 2 min di setup",
+                  font=("Arial", 8)).grid(row=riga_seghe + 1, column=0, columnspan=2, sticky="w")
 
-            # Cerca barra già aperta
-            barre_compatibili = [(idx, barra) for idx, barra in enumerate(barre_utilizzate)
-                                if pezzo <= barra['spazio_rimanente']]
+        def conferma():
+            try:
+                valori = {attributo: float(entry.get()) for attributo, entry in entries.items()}
+                if any(v < 0 for v in valori.values()):
+                    raise ValueError("i tempi non possono essere negativi")
+                seghe = leggi_seghe(entry_seghe.get())
+            except ValueError as e:
+                messagebox.showerror("Errore", f"Valore non valido: {str(e)}", parent=finestra)
+                return
+            self.parametri_sega = ParametriSega(**valori)
+            self.testo_seghe = entry_seghe.get().strip()
+            self.seghe = seghe
+            finestra.destroy()
+            # Il fascio cambia l'ordine dei tagli barra per barra
+            self._aggiorna_tabella_risultati()
+
+        ttk.Button(frame, text="Conferma", command=conferma, width=15).grid(row=riga_seghe + 2, column=0,
+                                                                            columnspan=2, pady=(12, 0))
+
+    def mostra_dettagli_prestazioni(self):
+        """Mostra tempi e contatori di ogni strategia dell'ultima ottimizzazione"""
+        if self.ultima_strumentazione is None:
+            messagebox.showwarning("Attenzione", "Eseguire prima l'ottimizzazione")
+            return
 
-            if barre_compatibili:
-                # Privilegia barre della lunghezza preferita
-                barre_preferite = [(idx, b) for idx, b in barre_compatibili if b['lunghezza'] == lung_preferita]
-                if barre_preferite:
-                    barre_compatibili = barre_preferite
+        dati = self.ultima_strumentazione.come_dict()
+
+        finestra = tk.Toplevel(self.root)
+        finestra.title("Dettagli prestazioni")
+        finestra.geometry("900x300")
+        finestra.transient(self.root)
+        self.imposta_icona(finestra)
+
+        ttk.Label(finestra, text=f"Tempo totale: {dati['tempo_totale_s'] * 1000:.1f} ms",
+                  font=("Arial", 10, "bold")).pack(anchor="w", padx=10, pady=(10, 5))
+
+        colonne = [
+            ("sezione", "Sezione", 110),
+            ("chiamate", "Chiamate", 70),
+            ("tempo", "Tempo (ms)", 85),
+            ("barre_aperte", "Barre aperte", 90),
+            ("ricerche", "Ricerche", 75),
+            ("candidati_esaminati", "Candidati", 75),
+            ("simulazioni_riempimento", "Riempimenti", 85),
+            ("pattern_nuovi", "Pattern nuovi", 90),
+            ("pattern_riusati", "Pattern riusati", 95),
+            ("memoria", "Memoria (MB)", 90),
+        ]
+        tree = ttk.Treeview(finestra, columns=[c for c, _, _ in colonne], show="headings", height=8)
+        for colonna, testo, larghezza in colonne:
+            tree.heading(colonna, text=testo)
+            tree.column(colonna, width=larghezza, anchor="w" if colonna == "sezione" else "center")
+
+        for nome, sezione in dati["sezioni"].items():
+            memoria = sezione.get("memoria_picco_mb")
+            tree.insert("", "end", values=[
+                nome,
+                sezione.get("chiamate", "-"),
+                f"{sezione.get('tempo_s', 0) * 1000:.1f}",
+                *(sezione.get(c, 0) for c, _, _ in colonne[3:-1]),
+                f"{memoria:.2f}" if memoria is not None else "-",
+            ])
+        tree.pack(fill="both", expand=True, padx=10, pady=5)
+
+        ttk.Label(finestra, text="La memoria di picco viene misurata solo da riga di comando (--memoria).",
+                  font=("Arial", 8)).pack(anchor="w", padx=10, pady=(0, 10))
+
+    def ottimizza_commessa(self):
+        """Ottimizza una commessa multi-profilo letta da Excel (profili in parallelo)
+
+        Il piano unificato sostituisce i risultati correnti: PDF, Excel e
+        statistiche mostrano il profilo di ogni barra.
+        """
+        filename = filedialog.askopenfilename(
+            title="Seleziona file Excel della commessa (fogli Pezzi, Barre, Profili)",
+            filetypes=[("Excel files", "*.xlsx *.xls"), ("All files", "*.*")]
+        )
+        if not filename:
+            return
 
-                barre_compatibili.sort(key=lambda x: x[1]['spazio_rimanente'] - pezzo - spessore_lama)
-                idx_scelto, barra_scelta = barre_compatibili[0]
-                barra_scelta['pezzi'].append(pezzo)
-                barra_scelta['spazio_rimanente'] -= (pezzo + spessore_lama)
-                pezzi_usati.add(pezzo_idx)
-                inserito = True
-
-            if not inserito:
-                # Usa la lunghezza preferita se possibile
-                barre_compatibili = [lung for lung in lunghezze_ord if pezzo <= lung]
-                if not barre_compatibili:
-                    return None
+        try:
+            spessore_lama = float(self.entry_spessore_lama.get())
+        except ValueError:
+            messagebox.showerror("Errore", "Spessore lama non valido")
+            return
 
-                lung_barra = barre_compatibili[0]
-                spazio_sim = lung_barra - pezzo - spessore_lama
-                pezzi_sim = [pezzo]
-                idx_sim = [pezzo_idx]
-
-                for i in range(n_pezzi):
-                    if i not in pezzi_usati and i != pezzo_idx:
-                        p = tutti_pezzi[i]
-                        if p <= spazio_sim:
-                            pezzi_sim.append(p)
-                            idx_sim.append(i)
-                            spazio_sim -= (p + spessore_lama)
-
-                nuova_barra = {
-                    'lunghezza': lung_barra,
-                    'pezzi': pezzi_sim,
-                    'spazio_rimanente': spazio_sim
-                }
-                barre_utilizzate.append(nuova_barra)
-                pezzi_usati.update(idx_sim)
-
-        return self._crea_scenario(barre_utilizzate, lunghezze_catalogo, costi_barre)
-
-    def _calcola_scenario_min_barre(self, tutti_pezzi, lunghezze_catalogo, spessore_lama, costi_barre):
-        """Calcola scenario che minimizza il numero di barre (usa barre più lunghe)"""
-        lunghezze_ord = sorted(lunghezze_catalogo, reverse=True)  # Privilegia barre lunghe
-        barre_utilizzate = []
-        pezzi_usati = set()
-        n_pezzi = len(tutti_pezzi)
+        def lavoro(progresso):
+            commessa, errori = leggi_commessa_excel(filename, spessore_lama)
+            if not commessa.pezzi:
+                raise ValueError("Nessun pezzo valido nel file della commessa")
+            return commessa, errori, commessa.ottimizza(progresso=progresso)
 
-        while len(pezzi_usati) < n_pezzi:
-            pezzo_idx = next(i for i in range(n_pezzi) if i not in pezzi_usati)
-            pezzo = tutti_pezzi[pezzo_idx]
-            inserito = False
+        def al_termine(risultato):
+            commessa, errori, piano = risultato
+            self.risultati_ottimizzazione = piano
+            self.scarti_usati = []
+            self.ordini_lotto = []
+            self.costi_commessa = dict(commessa.costi)
+            self._aggiorna_tabella_risultati()
 
-            # Cerca barra già aperta
-            barre_compatibili = [(idx, barra) for idx, barra in enumerate(barre_utilizzate)
-                                if pezzo <= barra['spazio_rimanente']]
+            costo_barre_intere = 0
+            costo_effettivo = 0
+            for pattern, copie in piano.voci:
+                costo_barra = commessa.costi.get((pattern.profilo, pattern.lunghezza))
+                if costo_barra is not None:
+                    costo_barre_intere += costo_barra * copie
+                    costo_effettivo += costo_barra / pattern.lunghezza * (pattern.lunghezza - pattern.sfrido) * copie
+            self.costo_barre_intere = costo_barre_intere
+            self.costo_effettivo = costo_effettivo
 
-            if barre_compatibili:
-                # Privilegia barre più lunghe con più spazio
-                barre_compatibili.sort(key=lambda x: (-x[1]['lunghezza'], x[1]['spazio_rimanente'] - pezzo))
-                idx_scelto, barra_scelta = barre_compatibili[0]
-                barra_scelta['pezzi'].append(pezzo)
-                barra_scelta['spazio_rimanente'] -= (pezzo + spessore_lama)
-                pezzi_usati.add(pezzo_idx)
-                inserito = True
-
-            if not inserito:
-                # Usa sempre la barra più lunga possibile
-                barre_compatibili = [lung for lung in lunghezze_ord if pezzo <= lung]
-                if not barre_compatibili:
-                    return None
+            stats_text = (f"Profili: {len(piano.profili)} | Barre utilizzate: {len(piano)} | "
+                          f"Sfrido totale: {piano.sfrido_totale:.1f} mm | Efficienza: {piano.efficienza:.1f}%")
+            if costo_barre_intere > 0:
+                stats_text += f" | Costo barre intere: €{costo_barre_intere:.2f} | Costo effettivo: €{costo_effettivo:.2f}"
+            stats_text += self._testo_tempo_macchina(piano)
+            self.label_stats.config(text=stats_text)
 
-                lung_barra = barre_compatibili[0]  # La più lunga
-                spazio_sim = lung_barra - pezzo - spessore_lama
-                pezzi_sim = [pezzo]
-                idx_sim = [pezzo_idx]
-
-                for i in range(n_pezzi):
-                    if i not in pezzi_usati and i != pezzo_idx:
-                        p = tutti_pezzi[i]
-                        if p <= spazio_sim:
-                            pezzi_sim.append(p)
-                            idx_sim.append(i)
-                            spazio_sim -= (p + spessore_lama)
-
-                nuova_barra = {
-                    'lunghezza': lung_barra,
-                    'pezzi': pezzi_sim,
-                    'spazio_rimanente': spazio_sim
-                }
-                barre_utilizzate.append(nuova_barra)
-                pezzi_usati.update(idx_sim)
-
-        return self._crea_scenario(barre_utilizzate, lunghezze_catalogo, costi_barre)
-
-    def _calcola_scenario_scarti_lunghi(self, tutti_pezzi, lunghezze_catalogo, spessore_lama, costi_barre):
-        """Calcola scenario che privilegia scarti più lunghi e riutilizzabili"""
-        lunghezze_ord = sorted(lunghezze_catalogo)
-        barre_utilizzate = []
-        pezzi_usati = set()
-        n_pezzi = len(tutti_pezzi)
+            if errori:
+                messagebox.showwarning("Commessa ottimizzata con errori",
+                                       "Righe scartate (prime 5):\n" + "\n".join(errori[:5]))
 
-        while len(pezzi_usati) < n_pezzi:
-            pezzo_idx = next(i for i in range(n_pezzi) if i not in pezzi_usati)
-            pezzo = tutti_pezzi[pezzo_idx]
-            inserito = False
+        self._esegui_con_progresso("Ottimizzazione commessa", lavoro, al_termine,
+                                   "Errore durante l'ottimizzazione della commessa")
 
-            # Cerca barra già aperta - ma evita di riempirle completamente se possibile
-            barre_compatibili = [(idx, barra) for idx, barra in enumerate(barre_utilizzate)
-                                if pezzo <= barra['spazio_rimanente']]
+    def ottimizza_lotto_ordini(self):
+        """Ottimizza insieme gli ordini in coda letti da Excel (stesso profilo)
 
-            if barre_compatibili:
-                # Preferisci barre che dopo il taglio lasciano scarti > 500mm oppure < 100mm
-                # (o molto riutilizzabili o quasi zero)
-                def priorita_scarto(x):
-                    scarto_dopo = x[1]['spazio_rimanente'] - pezzo - spessore_lama
-                    if scarto_dopo > 500:
-                        return 0  # Ottimo, scarto riutilizzabile
-                    elif scarto_dopo < 100:
-                        return 1  # Buono, quasi zero spreco
-                    else:
-                        return 2  # Peggiore, scarto medio inutilizzabile
+        Usa le barre disponibili o il catalogo della modalità corrente. Con un
+        orizzonte in giorni, gli ordini che scadono dopo entrano nel lotto solo
+        se trovano posto negli sfridi; gli altri restano in coda.
+        """
+        modalita = self.modalita.get()
+        if modalita == "disponibili" and not self.barre_disponibili:
+            messagebox.showwarning("Attenzione", "Inserire almeno una barra disponibile")
+            return
+        if modalita == "calcola" and not self.lunghezze_catalogo:
+            messagebox.showwarning("Attenzione", "Inserire almeno una lunghezza nel catalogo")
+            return
 
-                barre_compatibili.sort(key=priorita_scarto)
-                idx_scelto, barra_scelta = barre_compatibili[0]
-                barra_scelta['pezzi'].append(pezzo)
-                barra_scelta['spazio_rimanente'] -= (pezzo + spessore_lama)
-                pezzi_usati.add(pezzo_idx)
-                inserito = True
-
-            if not inserito:
-                # Scegli barra che massimizza lo scarto finale riutilizzabile
-                barre_compatibili = [lung for lung in lunghezze_ord if pezzo <= lung]
-                if not barre_compatibili:
-                    return None
+        filename = filedialog.askopenfilename(
+            title="Seleziona file Excel degli ordini (Ordine, Quantità, Lunghezza, Scadenza)",
+            filetypes=[("Excel files", "*.xlsx *.xls"), ("All files", "*.*")]
+        )
+        if not filename:
+            return
 
-                migliore_barra = barre_compatibili[0]  # Default: prima barra compatibile
-                miglior_score = -float('inf')  # Score iniziale molto basso
-                migliori_pezzi = [pezzo]  # Default: solo il pezzo corrente
-                migliori_idx = [pezzo_idx]
-
-                for lung_barra in barre_compatibili:
-                    spazio_sim = lung_barra - pezzo - spessore_lama
-                    pezzi_sim = [pezzo]
-                    idx_sim = [pezzo_idx]
-
-                    for i in range(n_pezzi):
-                        if i not in pezzi_usati and i != pezzo_idx:
-                            p = tutti_pezzi[i]
-                            if p <= spazio_sim:
-                                pezzi_sim.append(p)
-                                idx_sim.append(i)
-                                spazio_sim -= (p + spessore_lama)
-
-                    # Score: privilegia scarti > 500mm
-                    if spazio_sim > 500:
-                        score = spazio_sim  # Più lungo è meglio
-                    else:
-                        score = -spazio_sim  # Più corto è meglio
-
-                    if score > miglior_score:
-                        miglior_score = score
-                        migliore_barra = lung_barra
-                        migliori_pezzi = pezzi_sim.copy()
-                        migliori_idx = idx_sim.copy()
-
-                nuova_barra = {
-                    'lunghezza': migliore_barra,
-                    'pezzi': migliori_pezzi,
-                    'spazio_rimanente': migliore_barra - sum(migliori_pezzi) - len(migliori_pezzi) * spessore_lama
-                }
-                barre_utilizzate.append(nuova_barra)
-                pezzi_usati.update(migliori_idx)
-
-        return self._crea_scenario(barre_utilizzate, lunghezze_catalogo, costi_barre)
-
-    def _crea_scenario(self, barre_utilizzate, lunghezze_catalogo, costi_barre):
-        """Crea un oggetto scenario dai dati delle barre utilizzate"""
-        # Conta fabbisogno
-        fabbisogno = {lung: 0 for lung in lunghezze_catalogo}
-        for barra in barre_utilizzate:
-            fabbisogno[barra['lunghezza']] += 1
+        try:
+            spessore_lama = float(self.entry_spessore_lama.get())
+        except ValueError:
+            messagebox.showerror("Errore", "Spessore lama non valido")
+            return
 
-        # Calcola spreco totale e scarti
-        spreco_totale = sum(b['spazio_rimanente'] for b in barre_utilizzate)
-        scarti = sorted([b['spazio_rimanente'] for b in barre_utilizzate], reverse=True)
+        testo = simpledialog.askstring(
+            "Orizzonte", "Taglia comunque gli ordini che scadono entro (giorni).\n"
+                         "Vuoto = taglia tutti gli ordini:", parent=self.root)
+        if testo is None:
+            return
+        try:
+            orizzonte = int(testo) if testo.strip() else None
+        except ValueError:
+            messagebox.showerror("Errore", "Orizzonte non valido: inserire un numero intero di giorni")
+            return
 
-        # Calcola costo se fornito
-        costo_totale = None
-        if costi_barre:
-            costo_totale = sum(costi_barre.get(lung, 0) * qty for lung, qty in fabbisogno.items())
+        if modalita == "disponibili":
+            lotto = LottoOrdini(spessore_lama, barre_disponibili=self.barre_disponibili)
+        else:
+            lotto = LottoOrdini(spessore_lama, lunghezze_catalogo=self.lunghezze_catalogo,
+                                costi_barre=self.costi_barre)
+
+        def lavoro(progresso):
+            ordini, errori = leggi_ordini_excel(filename)
+            if not ordini:
+                raise ValueError("Nessun ordine valido nel file")
+            for ordine in ordini:
+                lotto.aggiungi(ordine)
+            return errori, lotto.pianifica(orizzonte, progresso=progresso)
+
+        def al_termine(risultato):
+            errori, esito = risultato
+            piano = esito.piano
+            self.risultati_ottimizzazione = piano
+            self.scarti_usati = []
+            self.ordini_lotto = esito.inclusi
+            self._aggiorna_tabella_risultati()
 
-        return {
-            'fabbisogno': fabbisogno,
-            'spreco_totale': spreco_totale,
-            'scarti': scarti,
-            'num_barre_totale': len(barre_utilizzate),
-            'costo_totale': costo_totale,
-            'barre_dettaglio': barre_utilizzate
-        }
+            costo_barre_intere = 0
+            costo_effettivo = 0
+            for pattern, copie in piano.voci:
+                costo_barra = self.costi_barre.get(pattern.lunghezza)
+                if costo_barra is not None:
+                    costo_barre_intere += costo_barra * copie
+                    costo_effettivo += costo_barra / pattern.lunghezza * (pattern.lunghezza - pattern.sfrido) * copie
+            self.costo_barre_intere = costo_barre_intere
+            self.costo_effettivo = costo_effettivo
 
-    def ottimizza(self):
-        if not self.pezzi_richiesti:
-            messagebox.showwarning("Attenzione", "Inserire almeno un pezzo da tagliare")
-            return
+            stats_text = (f"Ordini nel lotto: {len(esito.inclusi)} (rinviati: {len(esito.rinviati)}) | "
+                          f"Barre utilizzate: {len(piano)} (ordini separati: {esito.barre_separate}) | "
+                          f"Sfrido totale: {piano.sfrido_totale:.1f} mm | Efficienza: {piano.efficienza:.1f}%")
+            if costo_barre_intere > 0:
+                stats_text += f" | Costo barre intere: €{costo_barre_intere:.2f} | Costo effettivo: €{costo_effettivo:.2f}"
+            stats_text += self._testo_tempo_macchina(piano)
+            self.label_stats.config(text=stats_text)
 
-        modalita = self.modalita.get()
+            messaggi = []
+            if esito.rinviati:
+                codici = ", ".join(o.codice for o in esito.rinviati[:10])
+                altri = f" e altri {len(esito.rinviati) - 10}" if len(esito.rinviati) > 10 else ""
+                messaggi.append(f"Ordini lasciati in coda: {codici}{altri}")
+            if errori:
+                messaggi.append("Righe scartate (prime 5):\n" + "\n".join(errori[:5]))
+            if messaggi:
+                messagebox.showinfo("Lotto ordini", "\n\n".join(messaggi))
 
-        if modalita == "disponibili":
-            if not self.barre_disponibili:
-                messagebox.showwarning("Attenzione", "Inserire almeno una barra disponibile")
-                return
-            # Modalità disponibili: usa algoritmo classico
-            self._ottimizza_con_barre_disponibili()
-        else:
-            if not self.lunghezze_catalogo:
-                messagebox.showwarning("Attenzione", "Inserire almeno una lunghezza nel catalogo")
-                return
-            # Modalità calcola: mostra tutti gli scenari
-            self._mostra_scenari()
+        self._esegui_con_progresso("Ottimizzazione lotto ordini", lavoro, al_termine,
+                                   "Errore durante l'ottimizzazione del lotto")
 
     def _ottimizza_con_barre_disponibili(self):
-        """Ottimizzazione classica con barre già disponibili"""
+        """Ottimizzazione classica con barre già disponibili
+
+        Returns:
+            Il PianoTaglio calcolato, None in caso di errore
+        """
         try:
             spessore_lama = float(self.entry_spessore_lama.get())
 
@@ -1202,48 +5996,53 @@ class ApplicativoGUI:
                 messagebox.showerror("Errore",
                     f"Errore: c'è un pezzo da {max_pezzo}mm che è più lungo della barra più lunga ({max_lunghezza_barra}mm)!\n\n"
                     f"Soluzione: aggiungi barre più lunghe di almeno {max_pezzo}mm")
-                return
+                return None
 
-            # Esegui ottimizzazione
-            ottimizzatore = OttimizzatoreTaglio(self.barre_disponibili, spessore_lama)
-            barre = ottimizzatore.ottimizza(self.pezzi_richiesti)
+            # Esegui ottimizzazione, tagliando prima dagli scarti in magazzino se richiesto
+            scarti = []
+            if self.usa_scarti.get():
+                try:
+                    scarti = MagazzinoScarti().lunghezze()
+                except (sqlite3.Error, OSError):
+                    scarti = []
+            ottimizzatore = OttimizzatoreTaglio(self.barre_disponibili, spessore_lama, scarti)
+            piano = ottimizzatore.ottimizza(self.pezzi_richiesti)
+            # Gli scarti hanno lunghezze uniche: la riduzione pattern vale solo per le barre intere
+            if not ottimizzatore.scarti_usati:
+                piano = riduci_pattern(piano, spessore_lama, self._peso_pattern(), self.barre_disponibili)
 
             # Salva risultati
-            self.risultati_ottimizzazione = barre
-
-            # Pulisci risultati precedenti
-            self.tree_risultati.delete(*self.tree_risultati.get_children())
+            self.risultati_ottimizzazione = piano
+            self.scarti_usati = ottimizzatore.scarti_usati
+            self.ordini_lotto = []
 
             # Mostra risultati
+            self._aggiorna_tabella_risultati()
+
             tot_sfrido = 0
-            tot_pezzi = len(barre)
+            # Le barre tagliate dagli scarti non sono barre nuove: si contano e non si pagano a parte
+            da_scarti = dict(ottimizzatore.piano_scarti.voci)
+            tot_pezzi = len(piano) - len(ottimizzatore.piano_scarti)
             lunghezza_totale = 0
             costo_barre_intere = 0
             costo_effettivo = 0
 
-            for i, barra in enumerate(barre, 1):
-                tagli_str = " + ".join(str(int(t)) for t in barra['tagli'])
-                self.tree_risultati.insert("", "end", values=(
-                    i,
-                    f"{int(barra['lunghezza'])} mm",
-                    tagli_str,
-                    barra['num_tagli'],
-                    f"{barra['sfrido']:.1f}"
-                ))
-                tot_sfrido += barra['sfrido']
-                lunghezza_totale += barra['lunghezza']
+            for pattern, copie in piano.voci:
+                tot_sfrido += pattern.sfrido * copie
+                lunghezza_totale += pattern.lunghezza * copie
 
                 # Calcola costi se disponibili
-                lung_barra = barra['lunghezza']
-                if lung_barra in self.costi_barre:
+                lung_barra = pattern.lunghezza
+                copie -= da_scarti.get(pattern, 0)
+                if copie and lung_barra in self.costi_barre:
                     costo_barra = self.costi_barre[lung_barra]
-                    costo_barre_intere += costo_barra
+                    costo_barre_intere += costo_barra * copie
 
                     # Costo effettivo = (costo/lunghezza) * lunghezza_utilizzata
                     # lunghezza_utilizzata = lunghezza_barra - sfrido
                     costo_per_mm = costo_barra / lung_barra
-                    lunghezza_utilizzata = lung_barra - barra['sfrido']
-                    costo_effettivo += costo_per_mm * lunghezza_utilizzata
+                    lunghezza_utilizzata = lung_barra - pattern.sfrido
+                    costo_effettivo += costo_per_mm * lunghezza_utilizzata * copie
 
             # Salva i costi per il PDF
             self.costo_barre_intere = costo_barre_intere
@@ -1251,36 +6050,49 @@ class ApplicativoGUI:
 
             # Mostra statistiche
             efficienza = ((lunghezza_totale - tot_sfrido) / lunghezza_totale * 100) if lunghezza_totale > 0 else 0
-            stats_text = f"Barre utilizzate: {tot_pezzi} | Sfrido totale: {tot_sfrido:.1f} mm | Efficienza: {efficienza:.1f}%"
+            stats_text = f"Barre utilizzate: {tot_pezzi} | "
+            if self.scarti_usati:
+                stats_text += f"Scarti riutilizzati: {len(self.scarti_usati)} | "
+            stats_text += (f"Pattern: {piano.num_pattern} | "
+                           f"Sfrido totale: {tot_sfrido:.1f} mm | Efficienza: {efficienza:.1f}%")
 
             # Aggiungi costi se disponibili
             if costo_barre_intere > 0:
                 stats_text += f" | Costo barre intere: €{costo_barre_intere:.2f} | Costo effettivo: €{costo_effettivo:.2f}"
 
+            stats_text += self._testo_tempo_macchina(piano)
             self.label_stats.config(text=stats_text)
+            return piano
 
         except ValueError as e:
             messagebox.showerror("Errore", f"Errore durante l'ottimizzazione:\n{str(e)}")
         except Exception as e:
             messagebox.showerror("Errore", f"Errore imprevisto:\n{str(e)}\n\nDettagli tecnici: {type(e).__name__}")
+        return None
 
     def _mostra_scenari(self):
-        """Mostra finestra con tutti gli scenari possibili"""
+        """Mostra finestra con tutti gli scenari possibili
+
+        Returns:
+            La lista degli scenari calcolati, None in caso di errore
+        """
         try:
             spessore_lama = float(self.entry_spessore_lama.get())
 
             # Genera tutti gli scenari
             costi_opzionali = self.costi_barre if self.costi_barre else None
             scenari = self.genera_tutti_scenari(self.pezzi_richiesti, self.lunghezze_catalogo,
-                                               spessore_lama, costi_opzionali)
+                                               spessore_lama, costi_opzionali, self._peso_pattern())
 
             # Crea finestra modale per scenari
             self._crea_finestra_scenari(scenari, spessore_lama)
+            return scenari
 
         except ValueError as e:
             messagebox.showerror("Errore", f"Errore durante il calcolo degli scenari:\n{str(e)}")
         except Exception as e:
             messagebox.showerror("Errore", f"Errore imprevisto durante il calcolo degli scenari:\n{str(e)}\n\nDettagli: {type(e).__name__}")
+        return None
 
     def _crea_finestra_scenari(self, scenari, spessore_lama):
         """Crea finestra modale per mostrare tutti gli scenari"""
@@ -1298,6 +6110,9 @@ class ApplicativoGUI:
         titolo_frame.pack(fill="x")
         ttk.Label(titolo_frame, text="COMBINAZIONI POSSIBILI",
                  font=("Arial", 12, "bold")).pack()
+        ttk.Label(titolo_frame, text="Solo le combinazioni non dominate: ognuna è la migliore per almeno uno tra "
+                                     "barre, spreco, costo, pattern distinti e scarti riutilizzabili",
+                 font=("Arial", 9)).pack()
         
 
         # Frame scrollabile per scenari
@@ -1320,9 +6135,14 @@ class ApplicativoGUI:
         canvas.pack(side="left", fill="both", expand=True, padx=10, pady=10)
         scrollbar.pack(side="right", fill="y", pady=10)
 
-        # Bottone chiudi
-        ttk.Button(finestra_scenari, text="Chiudi", command=finestra_scenari.destroy,
-                  width=20).pack(pady=10)
+        # Bottoni esporta e chiudi
+        frame_bottoni = ttk.Frame(finestra_scenari)
+        frame_bottoni.pack(pady=10)
+        ttk.Button(frame_bottoni, text="Esporta Excel",
+                  command=lambda: self._esporta_scenari_excel(scenari, finestra_scenari),
+                  width=20).pack(side="left", padx=5)
+        ttk.Button(frame_bottoni, text="Chiudi", command=finestra_scenari.destroy,
+                  width=20).pack(side="left", padx=5)
 
     def _crea_card_scenario(self, parent, numero, scenario, spessore_lama):
         """Crea una card per un singolo scenario"""
@@ -1330,7 +6150,7 @@ class ApplicativoGUI:
         card = ttk.LabelFrame(parent, text=f"COMBINAZIONE {numero}", padding=10)
         card.pack(fill="x", padx=5, pady=5)
 
-        # Prima riga: Fabbisogno barre
+        # Prima riga: Fabbisogno piano
         fabb_frame = ttk.Frame(card)
         fabb_frame.pack(fill="x", pady=(0, 5))
 
@@ -1350,7 +6170,8 @@ class ApplicativoGUI:
         stats_left = ttk.Frame(stats_frame)
         stats_left.pack(side="left", fill="x", expand=True)
 
-        ttk.Label(stats_left, text=f"• Numero barre: {scenario['num_barre_totale']}").pack(anchor="w")
+        ttk.Label(stats_left, text=f"• Numero barre: {scenario['num_barre_totale']}    "
+                                   f"• Pattern distinti: {scenario['num_pattern']}").pack(anchor="w")
         ttk.Label(stats_left, text=f"• Spreco totale: {scenario['spreco_totale']:.1f} mm").pack(anchor="w")
 
         # Scarti
@@ -1358,6 +6179,13 @@ class ApplicativoGUI:
         if len(scenario['scarti']) > 5:
             scarti_str += f" (+{len(scenario['scarti'])-5} altri)"
         ttk.Label(stats_left, text=f"• Scarti: {scarti_str}").pack(anchor="w")
+        ttk.Label(stats_left, text=f"• Scarti riutilizzabili (≥ {LUNGHEZZA_MINIMA_SCARTO} mm): "
+                                   f"{scenario['scarti_utili']:.0f} mm").pack(anchor="w")
+
+        sequenza = sequenzia_piano(scenario['piano'], self.parametri_sega.barre_per_fascio)
+        ttk.Label(stats_left, text=f"• Tempo macchina stimato: "
+                                   f"{formatta_durata(sequenza.tempo_macchina(self.parametri_sega))} "
+                                   f"({sequenza.cambi_battuta} cambi battuta)").pack(anchor="w")
 
         # Costo se disponibile
         if scenario['costo_totale'] is not None:
@@ -1373,55 +6201,38 @@ class ApplicativoGUI:
 
     def _seleziona_scenario(self, scenario, spessore_lama):
         """Seleziona uno scenario e mostra i dettagli di taglio"""
-        # Converti scenario in formato barre_disponibili
-        barre_disponibili = [(qty, lung) for lung, qty in scenario['fabbisogno'].items() if qty > 0]
-
-        # Esegui ottimizzazione con queste barre
-        ottimizzatore = OttimizzatoreTaglio(barre_disponibili, spessore_lama)
-        barre = ottimizzatore.ottimizza(self.pezzi_richiesti)
+        # Il piano è quello mostrato nella scheda: riottimizzare darebbe pattern diversi
+        # e perderebbe la riduzione dei pattern
+        piano = scenario['piano']
 
         # Salva risultati
-        self.risultati_ottimizzazione = barre
-
-        # Pulisci risultati precedenti
-        self.tree_risultati.delete(*self.tree_risultati.get_children())
+        self.risultati_ottimizzazione = piano
+        self.scarti_usati = []
+        self.ordini_lotto = []
 
         # Mostra risultati
-        tot_sfrido = 0
-        tot_pezzi = len(barre)
-        lunghezza_totale = 0
-
-        for i, barra in enumerate(barre, 1):
-            tagli_str = " + ".join(str(int(t)) for t in barra['tagli'])
-            self.tree_risultati.insert("", "end", values=(
-                i,
-                f"{int(barra['lunghezza'])} mm",
-                tagli_str,
-                barra['num_tagli'],
-                f"{barra['sfrido']:.1f}"
-            ))
-            tot_sfrido += barra['sfrido']
-            lunghezza_totale += barra['lunghezza']
+        self._aggiorna_tabella_risultati()
+
+        tot_sfrido = piano.sfrido_totale
+        tot_pezzi = len(piano)
 
         # Mostra statistiche
-        efficienza = ((lunghezza_totale - tot_sfrido) / lunghezza_totale * 100) if lunghezza_totale > 0 else 0
+        efficienza = piano.efficienza
 
         # Aggiungi info sul fabbisogno e costo
         fabbisogno_str = " | Fabbisogno: "
-        # Conta lunghezze in un solo passaggio usando dict
-        fabb_count = {}
-        for b in barre:
-            lung = b['lunghezza']
-            fabb_count[lung] = fabb_count.get(lung, 0) + 1
+        fabb_count = piano.fabbisogno()
 
         fabb_items = [f"{count}x{int(lung)}mm" for lung, count in sorted(fabb_count.items(), reverse=True)]
 
-        stats_text = f"Barre utilizzate: {tot_pezzi} | Sfrido totale: {tot_sfrido:.1f} mm | Efficienza: {efficienza:.1f}%"
+        stats_text = (f"Barre utilizzate: {tot_pezzi} | Pattern: {piano.num_pattern} | "
+                      f"Sfrido totale: {tot_sfrido:.1f} mm | Efficienza: {efficienza:.1f}%")
         stats_text += fabbisogno_str + ", ".join(fabb_items)
 
         if scenario['costo_totale'] is not None:
             stats_text += f" | Costo: €{scenario['costo_totale']:.2f}"
 
+        stats_text += self._testo_tempo_macchina(piano)
         self.label_stats.config(text=stats_text)
 
         # Chiudi tutte le finestre TopLevel
@@ -1440,7 +6251,7 @@ class ApplicativoGUI:
         # Mostra finestra per inserire nome progetto e data
         dialogo = tk.Toplevel(self.root)
         dialogo.title("Informazioni PDF")
-        dialogo.geometry("400x200")
+        dialogo.geometry("400x230")
         dialogo.transient(self.root)
         dialogo.grab_set()
 
@@ -1463,13 +6274,19 @@ class ApplicativoGUI:
         entry_data.insert(0, datetime.now().strftime('%d/%m/%Y'))
         entry_data.grid(row=1, column=1, pady=5, padx=5)
 
+        # Schemi grafici delle barre
+        var_schemi = tk.BooleanVar(value=True)
+        ttk.Checkbutton(frame_content, text="Includi schemi grafici di taglio",
+                        variable=var_schemi).grid(row=2, column=0, columnspan=2, sticky="w", pady=5)
+
         # Variabile per salvare i dati
-        dati_pdf = {'confermato': False, 'progetto': '', 'data': ''}
+        dati_pdf = {'confermato': False, 'progetto': '', 'data': '', 'schemi': True}
 
         def conferma():
             dati_pdf['confermato'] = True
             dati_pdf['progetto'] = entry_progetto.get().strip()
             dati_pdf['data'] = entry_data.get().strip()
+            dati_pdf['schemi'] = var_schemi.get()
             dialogo.destroy()
 
         def annulla():
@@ -1477,7 +6294,7 @@ class ApplicativoGUI:
 
         # Frame pulsanti
         frame_buttons = ttk.Frame(frame_content)
-        frame_buttons.grid(row=2, column=0, columnspan=2, pady=20)
+        frame_buttons.grid(row=3, column=0, columnspan=2, pady=15)
 
         ttk.Button(frame_buttons, text="Conferma", command=conferma, width=15).pack(side="left", padx=5)
         ttk.Button(frame_buttons, text="Annulla", command=annulla, width=15).pack(side="left", padx=5)
@@ -1503,101 +6320,74 @@ class ApplicativoGUI:
         if not filename:
             return
 
-        try:
-            # Crea il PDF con margini ridotti
-            doc = SimpleDocTemplate(
-                filename,
-                pagesize=A4,
-                topMargin=15*mm,
-                bottomMargin=15*mm,
-                leftMargin=15*mm,
-                rightMargin=15*mm
-            )
-            story = []
-            styles = getSampleStyleSheet()
-
-            # Calcola statistiche
-            tot_sfrido = sum(barra['sfrido'] for barra in self.risultati_ottimizzazione)
-            lunghezza_totale = sum(barra['lunghezza'] for barra in self.risultati_ottimizzazione)
-            efficienza = ((lunghezza_totale - tot_sfrido) / lunghezza_totale * 100) if lunghezza_totale > 0 else 0
+        spessore_lama = self.entry_spessore_lama.get()
+        piano = self.risultati_ottimizzazione
+        costo_barre_intere = self.costo_barre_intere
+        costo_effettivo = self.costo_effettivo
+        schemi = dati_pdf['schemi']
+        parametri_sega = self.parametri_sega
+        seghe = list(self.seghe)
+        ordini = list(self.ordini_lotto)
+
+        # La generazione gira in un thread separato: l'interfaccia resta reattiva
+        self._esegui_con_progresso(
+            "Generazione PDF",
+            lambda progresso: genera_report_pdf(filename, piano, nome_progetto, data_progetto, spessore_lama,
+                                                costo_barre_intere, costo_effettivo, progresso, schemi,
+                                                parametri_sega, seghe, ordini),
+            lambda _: messagebox.showinfo("Successo", f"PDF generato con successo:\n{filename}"),
+            "Errore durante la generazione del PDF")
+
+    def _chiedi_file_excel(self, prefisso):
+        """Chiede dove salvare un file Excel esportato"""
+        return filedialog.asksaveasfilename(
+            defaultextension=".xlsx",
+            filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
+            initialfile=f"{prefisso}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        )
+
+    def esporta_excel(self):
+        """Esporta il piano di taglio corrente in Excel (scrittura in background)"""
+        if not self.risultati_ottimizzazione:
+            messagebox.showwarning("Attenzione", "Eseguire prima l'ottimizzazione")
+            return
 
-            # Intestazione compatta
-            header_style = ParagraphStyle(
-                'Header',
-                parent=styles['Heading1'],
-                fontSize=14,
-                textColor=colors.HexColor('#2c3e50'),
-                spaceAfter=8,
-                alignment=TA_CENTER,
-                fontName='Helvetica-Bold'
-            )
-
-            story.append(Paragraph(nome_progetto.upper(), header_style))
-
-            # Info progetto
-            progetto_style = ParagraphStyle('Progetto', parent=styles['Normal'], fontSize=10, alignment=TA_CENTER, textColor=colors.HexColor('#2c3e50'))
-            story.append(Paragraph(f"Data: {data_progetto}", progetto_style))
-            story.append(Spacer(1, 5))
-
-            # Info in una riga
-            info_text = f"Lama: {self.entry_spessore_lama.get()}mm | Barre: {len(self.risultati_ottimizzazione)} | Sfrido: {tot_sfrido:.0f}mm | Efficienza: {efficienza:.1f}%"
-            info_style = ParagraphStyle('Info', parent=styles['Normal'], fontSize=8, alignment=TA_CENTER)
-            story.append(Paragraph(info_text, info_style))
+        filename = self._chiedi_file_excel("piano_taglio")
+        if not filename:
+            return
 
-            # Aggiungi costi se disponibili
-            if self.costo_barre_intere > 0:
-                costo_text = f"Costo barre intere: €{self.costo_barre_intere:.2f} | Costo effettivo (materiale utilizzato): €{self.costo_effettivo:.2f}"
-                costo_style = ParagraphStyle('Costo', parent=styles['Normal'], fontSize=8, alignment=TA_CENTER, textColor=colors.HexColor('#27ae60'))
-                story.append(Paragraph(costo_text, costo_style))
-
-            story.append(Spacer(1, 10))
-
-            # Tabella principale con tutte le barre
-            main_data = [["Barra", "Lung.", "Tagli", "Sfrido"]]
-
-            for i, barra in enumerate(self.risultati_ottimizzazione, 1):
-                tagli_str = " + ".join(str(int(t)) for t in barra['tagli'])
-                main_data.append([
-                    f"#{i}",
-                    f"{int(barra['lunghezza'])}",
-                    tagli_str,
-                    f"{barra['sfrido']:.0f}"
-                ])
-
-            # Calcola larghezza dinamica per la colonna tagli
-            tagli_width = 400
-            main_table = Table(main_data, colWidths=[35, 50, tagli_width, 50])
-            main_table.setStyle(TableStyle([
-                # Header
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495e')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 9),
-                ('ALIGN', (0, 0), (0, -1), 'CENTER'),  # Barra centrata
-                ('ALIGN', (1, 0), (1, -1), 'CENTER'),  # Lunghezza centrata
-                ('ALIGN', (2, 0), (2, -1), 'LEFT'),    # Tagli allineati a sinistra
-                ('ALIGN', (3, 0), (3, -1), 'CENTER'),  # Sfrido centrato
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
-                ('TOPPADDING', (0, 0), (-1, 0), 6),
-                # Body
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 8),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#ecf0f1')]),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                ('TOPPADDING', (0, 1), (-1, -1), 4),
-                ('BOTTOMPADDING', (0, 1), (-1, -1), 4),
-                ('LEFTPADDING', (0, 0), (-1, -1), 5),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 5),
-            ]))
-            story.append(main_table)
-
-            # Genera il PDF
-            doc.build(story)
-
-            messagebox.showinfo("Successo", f"PDF generato con successo:\n{filename}")
+        piani = [("Piano", self.risultati_ottimizzazione)]
+        costi_barre = {**self.costi_barre, **self.costi_commessa}
+        parametri_sega = self.parametri_sega
+        seghe = list(self.seghe)
+        ordini = list(self.ordini_lotto)
+
+        self._esegui_con_progresso(
+            "Esportazione Excel",
+            lambda progresso: esporta_excel(filename, piani, costi_barre, progresso, parametri_sega, seghe,
+                                            ordini),
+            lambda _: messagebox.showinfo("Successo", f"File Excel creato con successo:\n{filename}"),
+            "Errore durante l'esportazione Excel")
+
+    def _esporta_scenari_excel(self, scenari, finestra_scenari):
+        """Esporta tutti gli scenari calcolati in un unico file Excel"""
+        filename = self._chiedi_file_excel("scenari_taglio")
+        if not filename:
+            return
 
-        except Exception as e:
-            messagebox.showerror("Errore", f"Errore durante la generazione del PDF:\n{str(e)}")
+        piani = [(f"Combinazione {i}", scenario['piano']) for i, scenario in enumerate(scenari, 1)]
+        costi_barre = dict(self.costi_barre)
+        parametri_sega = self.parametri_sega
+        seghe = list(self.seghe)
+
+        def al_termine(_):
+            messagebox.showinfo("Successo", f"File Excel creato con successo:\n{filename}", parent=finestra_scenari)
+
+        self._esegui_con_progresso(
+            "Esportazione Excel",
+            lambda progresso: esporta_excel(filename, piani, costi_barre, progresso, parametri_sega, seghe),
+            al_termine,
+            "Errore durante l'esportazione Excel")
 
     def mostra_help(self):
         """Mostra finestra di aiuto con istruzioni per l'uso"""
@@ -1876,7 +6666,484 @@ VANTAGGIO: Sai esattamente cosa ordinare al negozio!
         help_window.grab_set()
 
 
+def _riepilogo_piano(nome, piano, costi_barre, parametri_sega=None, seghe=None):
+    """Dati principali di un piano in forma serializzabile (JSON)"""
+    fabbisogno = piano.fabbisogno()
+    parametri_sega = parametri_sega or ParametriSega()
+    sequenza = sequenzia_piano(piano, parametri_sega.barre_per_fascio)
+    costo = None
+    if costi_barre:
+        costo = round(sum(costi_barre.get(l, 0) * q for l, q in fabbisogno.items()), 2)
+    return {
+        "nome": nome,
+        "barre": len(piano),
+        "pattern": piano.num_pattern,
+        "sfrido_mm": round(piano.sfrido_totale, 1),
+        "efficienza_percento": round(piano.efficienza, 2),
+        "costo": costo,
+        "cambi_battuta": sequenza.cambi_battuta,
+        "tempo_macchina_min": round(sequenza.tempo_macchina(parametri_sega) / 60, 1),
+        "makespan_seghe_min": (round(pianifica_seghe(piano, seghe, parametri_sega).makespan / 60, 1)
+                               if seghe and len(seghe) > 1 else None),
+        "fabbisogno": {str(int(l)): q for l, q in sorted(fabbisogno.items(), reverse=True)},
+    }
+
+
+def _ottimizzatore_genetico(args, barre):
+    """OttimizzatoreGenetico con i parametri della riga di comando"""
+    return OttimizzatoreGenetico(barre, args.lama, isole=args.isole, tempo=args.tempo, seme=args.seme,
+                                 generazioni=args.generazioni)
+
+
+def _comando_ottimizza(args):
+    """Ottimizza da riga di comando e stampa il risultato in JSON"""
+    pezzi, errori = leggi_pezzi_excel(args.pezzi)
+    barre, costi, errori_barre = leggi_barre_excel(args.barre, args.modalita)
+    for errore in errori + errori_barre:
+        print(errore, file=sys.stderr)
+    if not pezzi or not barre:
+        print("Nessun pezzo o nessuna barra valida nei file indicati", file=sys.stderr)
+        return 2
+
+    parametri_sega = ParametriSega(barre_per_fascio=args.barre_per_fascio)
+    try:
+        seghe = leggi_seghe(args.seghe)
+    except ValueError as e:
+        print(f"Seghe non valide: {e}", file=sys.stderr)
+        return 2
+    try:
+        with Strumentazione(memoria=args.memoria, profilo=args.profilo) as strumentazione:
+            esito_corsa = None
+            if args.modalita == "disponibili" and args.motore == "corsa":
+                esito_corsa = corsa_motori(pezzi, barre, args.lama, tempo=args.tempo, seme=args.seme)
+                piano = riduci_pattern(esito_corsa.piano, args.lama, args.peso_pattern, barre)
+                risultati = [_riepilogo_piano(f"corsa ({esito_corsa.motore})", piano, costi, parametri_sega, seghe)]
+                lunghezza_max = max(l for _, l in barre)
+                if args.conferma:
+                    MagazzinoScarti().registra_piano(piano, origine=datetime.now().strftime('%d/%m/%Y'))
+            elif args.modalita == "disponibili" and args.motore == "genetico":
+                piano = _ottimizzatore_genetico(args, barre).ottimizza(pezzi)
+                piano = riduci_pattern(piano, args.lama, args.peso_pattern, barre)
+                risultati = [_riepilogo_piano("genetico", piano, costi, parametri_sega, seghe)]
+                lunghezza_max = max(l for _, l in barre)
+                if args.conferma:
+                    MagazzinoScarti().registra_piano(piano, origine=datetime.now().strftime('%d/%m/%Y'))
+            elif args.modalita == "disponibili":
+                scarti = MagazzinoScarti().lunghezze() if args.usa_scarti else []
+                ottimizzatore = OttimizzatoreTaglio(barre, args.lama, scarti)
+                piano = ottimizzatore.ottimizza(pezzi)
+                if not ottimizzatore.scarti_usati:
+                    piano = riduci_pattern(piano, args.lama, args.peso_pattern, barre)
+                risultati = [_riepilogo_piano("ottimizza", piano, costi, parametri_sega, seghe)]
+                risultati[0]["scarti_usati"] = len(ottimizzatore.scarti_usati)
+                lunghezza_max = max(l for _, l in barre)
+                if args.conferma:
+                    magazzino = MagazzinoScarti()
+                    magazzino.preleva(ottimizzatore.scarti_usati)
+                    magazzino.registra_piano(piano, origine=datetime.now().strftime('%d/%m/%Y'))
+            else:
+                scenari = GeneratoreScenari().genera_tutti_scenari(pezzi, barre, args.lama, costi or None,
+                                                                   args.peso_pattern)
+                risultati = [_riepilogo_piano(f"Combinazione {i}", s['piano'], costi, parametri_sega, seghe)
+                             for i, s in enumerate(scenari, 1)]
+                piani = [s['piano'] for s in scenari]
+                if args.motore == "genetico":
+                    # Catalogo: barre illimitate di ogni lunghezza, il risultato è uno scenario in più
+                    num_pezzi = sum(q for q, _ in pezzi)
+                    genetico = _ottimizzatore_genetico(args, [(num_pezzi, l) for l in barre]).ottimizza(pezzi)
+                    genetico = riduci_pattern(genetico, args.lama, args.peso_pattern)
+                    risultati.append(_riepilogo_piano("Genetico", genetico, costi, parametri_sega, seghe))
+                    piani.append(genetico)
+                elif args.motore == "corsa":
+                    num_pezzi = sum(q for q, _ in pezzi)
+                    esito_corsa = corsa_motori(pezzi, [(num_pezzi, l) for l in barre], args.lama,
+                                               tempo=args.tempo, seme=args.seme)
+                    corsa = riduci_pattern(esito_corsa.piano, args.lama, args.peso_pattern)
+                    risultati.append(_riepilogo_piano(f"Corsa ({esito_corsa.motore})", corsa, costi,
+                                                      parametri_sega, seghe))
+                    piani.append(corsa)
+                if not piani:
+                    raise ValueError("Nessuno scenario di taglio trovato con il catalogo indicato")
+                piano = min(piani, key=len)
+                lunghezza_max = max(barre)
+    except ValueError as e:
+        print(f"Errore durante l'ottimizzazione: {e}", file=sys.stderr)
+        return 1
+
+    if not args.senza_storico:
+        if args.motore in ("genetico", "corsa"):
+            motore = args.motore
+        else:
+            motore = "ottimizza" if args.modalita == "disponibili" else "scenari"
+        costo = _riepilogo_piano(motore, piano, costi)["costo"]
+        StoricoEsecuzioni().registra(args.modalita, motore, pezzi, lunghezza_max, args.lama,
+                                     piano, strumentazione, costo)
+
+    uscita = {
+        "modalita": args.modalita,
+        "pezzi": sum(q for q, _ in pezzi),
+        "lunghezze_distinte": len({l for _, l in pezzi}),
+        "spessore_lama": args.lama,
+        "risultati": risultati,
+        "strumentazione": strumentazione.come_dict(),
+    }
+    if esito_corsa is not None:
+        uscita["corsa"] = {"vincitore": esito_corsa.motore, "secondi": esito_corsa.secondi,
+                           "limite_inferiore": esito_corsa.limite_inferiore, "ottimo": esito_corsa.ottimo,
+                           "motori": esito_corsa.esiti}
+    testo = json.dumps(uscita, indent=2, ensure_ascii=False)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(testo)
+    else:
+        print(testo)
+    return 0
+
+
+def _comando_commessa(args):
+    """Ottimizza una commessa multi-profilo e stampa il risultato in JSON"""
+    commessa, errori = leggi_commessa_excel(args.file, args.lama)
+    for errore in errori:
+        print(errore, file=sys.stderr)
+    if not commessa.pezzi:
+        print("Nessun pezzo valido nel file indicato", file=sys.stderr)
+        return 2
+
+    try:
+        with Strumentazione() as strumentazione:
+            piano = commessa.ottimizza(processi=args.processi)
+    except ValueError as e:
+        print(f"Errore durante l'ottimizzazione: {e}", file=sys.stderr)
+        return 1
+
+    profili = []
+    for profilo in piano.profili:
+        parziale = PianoTaglio((p, c) for p, c in piano.voci if p.profilo == profilo)
+        costi = {l: c for (pr, l), c in commessa.costi.items() if pr == profilo}
+        riepilogo = _riepilogo_piano(profilo, parziale, costi)
+        riepilogo["spessore_lama"] = commessa.spessori_lama.get(profilo, commessa.spessore_lama)
+        profili.append(riepilogo)
+
+    costi_noti = [p["costo"] for p in profili if p["costo"] is not None]
+    uscita = {
+        "pezzi": commessa.num_pezzi,
+        "barre": len(piano),
+        "sfrido_mm": round(piano.sfrido_totale, 1),
+        "efficienza_percento": round(piano.efficienza, 2),
+        "costo": round(sum(costi_noti), 2) if costi_noti else None,
+        "profili": profili,
+        "strumentazione": strumentazione.come_dict(),
+    }
+    testo = json.dumps(uscita, indent=2, ensure_ascii=False)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(testo)
+    else:
+        print(testo)
+    return 0
+
+
+def _comando_lotto(args):
+    """Ottimizza insieme una coda di ordini e stampa il risultato in JSON"""
+    ordini, errori = leggi_ordini_excel(args.ordini)
+    barre, costi, errori_barre = leggi_barre_excel(args.barre, args.modalita)
+    for errore in errori + errori_barre:
+        print(errore, file=sys.stderr)
+    if not ordini or not barre:
+        print("Nessun ordine o nessuna barra valida nei file indicati", file=sys.stderr)
+        return 2
+
+    if args.modalita == "disponibili":
+        lotto = LottoOrdini(args.lama, barre_disponibili=barre)
+    else:
+        lotto = LottoOrdini(args.lama, lunghezze_catalogo=barre, costi_barre=costi)
+    for ordine in ordini:
+        lotto.aggiungi(ordine)
+
+    try:
+        with Strumentazione() as strumentazione:
+            esito = lotto.pianifica(args.orizzonte)
+    except ValueError as e:
+        print(f"Errore durante l'ottimizzazione: {e}", file=sys.stderr)
+        return 1
+
+    sequenza = sequenzia_piano(esito.piano)
+    barre_ordine = barre_per_ordine(sequenza, esito.inclusi)
+    uscita = {
+        "modalita": args.modalita,
+        "orizzonte_giorni": args.orizzonte,
+        "pezzi": sum(o.num_pezzi for o in esito.inclusi),
+        "barre_ordini_separati": esito.barre_separate,
+        "barre_risparmiate": esito.barre_risparmiate,
+        "piano": _riepilogo_piano("lotto", esito.piano, costi),
+        "ordini": [{"ordine": o.codice, "scadenza_giorni": o.scadenza, "pezzi": o.num_pezzi,
+                    "barre": formatta_intervalli(barre_ordine[o.codice])} for o in esito.inclusi],
+        "rinviati": [{"ordine": o.codice, "scadenza_giorni": o.scadenza, "pezzi": o.num_pezzi}
+                     for o in esito.rinviati],
+        "strumentazione": strumentazione.come_dict(),
+    }
+    testo = json.dumps(uscita, indent=2, ensure_ascii=False)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(testo)
+    else:
+        print(testo)
+    return 0
+
+
+def _comando_stima(args):
+    """Stima barre e costi per ogni lunghezza senza calcolare il piano e stampa il risultato in JSON"""
+    pezzi, errori = leggi_pezzi_excel(args.pezzi)
+    barre, costi, errori_barre = leggi_barre_excel(args.barre, args.modalita)
+    for errore in errori + errori_barre:
+        print(errore, file=sys.stderr)
+    if not pezzi or not barre:
+        print("Nessun pezzo o nessuna barra valida nei file indicati", file=sys.stderr)
+        return 2
+
+    lunghezze = [l for _, l in barre] if args.modalita == "disponibili" else barre
+    inizio = time.perf_counter()
+    stime = stima_fabbisogno(pezzi, lunghezze, args.lama, costi)
+    durata = time.perf_counter() - inizio
+    uscita = {
+        "pezzi": sum(q for q, _ in pezzi),
+        "spessore_lama": args.lama,
+        "stime": stime,
+        "tempo_ms": round(durata * 1000, 3),
+    }
+    testo = json.dumps(uscita, indent=2, ensure_ascii=False)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(testo)
+    else:
+        print(testo)
+    return 0
+
+
+def _leggi_listino(testo):
+    """Listino da riga di comando: file Excel del catalogo oppure "6000=45, 7500=55" """
+    if "=" not in testo:
+        _, costi, errori = leggi_barre_excel(testo, "calcola")
+        for errore in errori:
+            print(errore, file=sys.stderr)
+        return os.path.splitext(os.path.basename(testo))[0], costi
+    costi = {}
+    for voce in testo.split(","):
+        lunghezza, costo = voce.split("=")
+        costi[float(lunghezza)] = float(costo)
+    return testo, costi
+
+
+def _comando_confronta(args):
+    """Confronta gli scenari su una griglia di spessori lama, cataloghi e listini"""
+    pezzi, errori = leggi_pezzi_excel(args.pezzi)
+    catalogo, costi, errori_barre = leggi_barre_excel(args.barre, "calcola")
+    for errore in errori + errori_barre:
+        print(errore, file=sys.stderr)
+    if not pezzi or not catalogo:
+        print("Nessun pezzo o nessuna lunghezza di catalogo valida nei file indicati", file=sys.stderr)
+        return 2
+
+    try:
+        spessori_lama = [float(s) for s in args.lame.split(",")]
+        cataloghi = ([[float(l) for l in gruppo.split(",")] for gruppo in args.cataloghi.split(";")]
+                     if args.cataloghi else [catalogo])
+        listini = [("catalogo", costi)] if costi else []
+        listini += [_leggi_listino(testo) for testo in args.listino or []]
+    except ValueError as e:
+        print(f"Parametri non validi: {e}", file=sys.stderr)
+        return 2
+
+    with Strumentazione() as strumentazione:
+        righe = confronta_parametri(pezzi, spessori_lama, cataloghi, listini, args.peso_pattern, args.processi)
+
+    print(formatta_confronto(righe))
+    if args.json:
+        uscita = {
+            "pezzi": sum(q for q, _ in pezzi),
+            "righe": [{k: v for k, v in riga.items() if k != "piano"} for riga in righe],
+            "strumentazione": strumentazione.come_dict(),
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(json.dumps(uscita, indent=2, ensure_ascii=False))
+    return 0
+
+
+def _comando_approvvigionamento(args):
+    """Suggerisce le lunghezze di barra da tenere a magazzino in base allo storico ordini"""
+    ordini = []
+    for filename in args.ordini:
+        letti, errori = leggi_ordini_excel(filename)
+        for errore in errori:
+            print(errore, file=sys.stderr)
+        ordini.extend(letti)
+    if not ordini:
+        print("Nessun ordine valido nei file indicati", file=sys.stderr)
+        return 2
+
+    try:
+        candidate = range(args.da, args.a + 1, args.passo)
+        attuale = [float(l) for l in args.attuale.split(",")] if args.attuale else None
+        with Strumentazione() as strumentazione:
+            classifica, risultato_attuale, statistiche = raccomanda_lunghezze(
+                ordini, args.lama, candidate, args.max_lunghezze, args.costo_metro, args.costo_barra,
+                args.migliori, attuale)
+    except ValueError as e:
+        print(f"Errore durante l'analisi: {e}", file=sys.stderr)
+        return 1
+
+    testo = [f"Ordini: {statistiche['ordini']} ({statistiche['domande_distinte']} distinti) | "
+             f"Insiemi: {statistiche['insiemi']}, valutati {statistiche['valutati']} "
+             f"(interrotti {statistiche['interrotti']})", "",
+             f"  {'Lunghezze':<26}{'Costo':>12}{'Per ordine':>12}{'Barre':>9}{'Sfrido (m)':>12}{'Lim.inf.':>12}"]
+    righe = [(f"{i}. ", r) for i, r in enumerate(classifica, 1)]
+    if risultato_attuale is not None:
+        righe.append(("Attuale: ", risultato_attuale))
+    for etichetta, r in righe:
+        lunghezze = etichetta + "+".join(str(int(l)) for l in r['lunghezze'])
+        testo.append(f"  {lunghezze:<26}{r['costo']:>12.1f}{r['costo_medio']:>12.2f}{r['barre']:>9}"
+                     f"{r['sfrido'] / 1000:>12.1f}{r['limite_inferiore']:>12.1f}")
+    print("\n".join(testo))
+
+    if args.json:
+        uscita = {"classifica": classifica, "attuale": risultato_attuale, "statistiche": statistiche,
+                  "strumentazione": strumentazione.come_dict()}
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(json.dumps(uscita, indent=2, ensure_ascii=False))
+    return 0
+
+
+def _comando_storico(args):
+    """Stampa il rapporto dello storico esecuzioni"""
+    print(StoricoEsecuzioni(args.file).rapporto(args.giorni))
+    return 0
+
+
+def esegui_da_riga_di_comando(argv):
+    """Interfaccia a riga di comando (senza argomenti si apre l'interfaccia grafica)"""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="ottimizzatore_taglio",
+                                     description="Ottimizzatore Taglio Barre - riga di comando")
+    comandi = parser.add_subparsers(dest="comando", required=True)
+
+    p_ottimizza = comandi.add_parser("ottimizza", help="Ottimizza da file Excel e stampa il risultato in JSON")
+    p_ottimizza.add_argument("--pezzi", required=True, help="File Excel dei pezzi richiesti")
+    p_ottimizza.add_argument("--barre", required=True, help="File Excel delle barre (magazzino o catalogo)")
+    p_ottimizza.add_argument("--modalita", choices=["disponibili", "calcola"], default="disponibili",
+                             help="disponibili = barre in magazzino, calcola = scenari dal catalogo")
+    p_ottimizza.add_argument("--lama", type=float, default=3.0, help="Spessore lama in mm (default 3)")
+    p_ottimizza.add_argument("--json", help="Scrive il risultato in questo file invece che a video")
+    p_ottimizza.add_argument("--memoria", action="store_true",
+                             help="Misura il picco di memoria di ogni strategia (più lento)")
+    p_ottimizza.add_argument("--profilo", help="Salva un dump cProfile/pstats dell'esecuzione")
+    p_ottimizza.add_argument("--peso-pattern", type=float, default=0.0,
+                             help="Costo di ogni pattern distinto in barre: riduce i pattern "
+                                  "accettando più sfrido (default 0 = nessuna riduzione)")
+    p_ottimizza.add_argument("--barre-per-fascio", type=int, default=1,
+                             help="Barre identiche tagliate insieme, per la stima del tempo macchina (default 1)")
+    p_ottimizza.add_argument("--seghe", default="1",
+                             help="Seghe in parallelo come velocità[:setup s] separate da virgola, "
+                                  "es. \"1,1,0.8:120\" (default una sega)")
+    p_ottimizza.add_argument("--motore", choices=["standard", "genetico", "corsa"], default="standard",
+                             help="genetico = algoritmo genetico a isole su più processi, per istanze grandi; "
+                                  "corsa = ottimizza, scenari e genetico in gara, vince il piano migliore "
+                                  "(in modalità calcola aggiungono uno scenario)")
+    p_ottimizza.add_argument("--tempo", type=float, default=10.0,
+                             help="Secondi a disposizione del motore genetico o della corsa (default 10)")
+    p_ottimizza.add_argument("--seme", type=int, help="Seme del motore genetico, per risultati ripetibili")
+    p_ottimizza.add_argument("--isole", type=int, help="Isole del motore genetico (default: numero di CPU)")
+    p_ottimizza.add_argument("--generazioni", type=int,
+                             help="Generazioni massime per epoca del motore genetico (default: fino al tempo)")
+    p_ottimizza.add_argument("--usa-scarti", action="store_true",
+                             help="Taglia prima dagli scarti del magazzino (solo modalità disponibili)")
+    p_ottimizza.add_argument("--conferma", action="store_true",
+                             help="Considera il piano eseguito: aggiorna il magazzino scarti")
+    p_ottimizza.add_argument("--senza-storico", action="store_true",
+                             help="Non registra l'esecuzione nello storico locale")
+    p_ottimizza.set_defaults(funzione=_comando_ottimizza)
+
+    p_commessa = comandi.add_parser("commessa", help="Ottimizza una commessa multi-profilo (profili in parallelo)")
+    p_commessa.add_argument("--file", required=True, help="File Excel con fogli Pezzi, Barre e Profili")
+    p_commessa.add_argument("--lama", type=float, default=3.0,
+                            help="Spessore lama dei profili senza valore nel foglio Profili (default 3)")
+    p_commessa.add_argument("--processi", type=int, help="Numero massimo di processi (default: numero di CPU)")
+    p_commessa.add_argument("--json", help="Scrive il risultato in questo file invece che a video")
+    p_commessa.set_defaults(funzione=_comando_commessa)
+
+    p_lotto = comandi.add_parser("lotto", help="Ottimizza insieme gli ordini in coda per lo stesso profilo")
+    p_lotto.add_argument("--ordini", required=True, help="File Excel degli ordini (Ordine, Quantità, Lunghezza, Scadenza)")
+    p_lotto.add_argument("--barre", required=True, help="File Excel delle barre (magazzino o catalogo)")
+    p_lotto.add_argument("--modalita", choices=["disponibili", "calcola"], default="disponibili",
+                         help="disponibili = barre in magazzino, calcola = scenari dal catalogo")
+    p_lotto.add_argument("--lama", type=float, default=3.0, help="Spessore lama in mm (default 3)")
+    p_lotto.add_argument("--orizzonte", type=int,
+                         help="Taglia comunque gli ordini che scadono entro N giorni; gli altri solo "
+                              "se entrano negli sfridi (default: tutti gli ordini)")
+    p_lotto.add_argument("--json", help="Scrive il risultato in questo file invece che a video")
+    p_lotto.set_defaults(funzione=_comando_lotto)
+
+    p_stima = comandi.add_parser("stima", help="Stima immediata di barre e costi per lunghezza, senza piano")
+    p_stima.add_argument("--pezzi", required=True, help="File Excel dei pezzi richiesti")
+    p_stima.add_argument("--barre", required=True, help="File Excel delle barre (magazzino o catalogo)")
+    p_stima.add_argument("--modalita", choices=["disponibili", "calcola"], default="calcola",
+                         help="Formato del file delle barre (default calcola = catalogo)")
+    p_stima.add_argument("--lama", type=float, default=3.0, help="Spessore lama in mm (default 3)")
+    p_stima.add_argument("--json", help="Scrive il risultato in questo file invece che a video")
+    p_stima.set_defaults(funzione=_comando_stima)
+
+    p_confronta = comandi.add_parser("confronta", help="What-if: scenari per più spessori lama, cataloghi e listini")
+    p_confronta.add_argument("--pezzi", required=True, help="File Excel dei pezzi richiesti")
+    p_confronta.add_argument("--barre", required=True, help="File Excel del catalogo (lunghezze e costi)")
+    p_confronta.add_argument("--lame", default="3", help="Spessori lama separati da virgola, es. \"3,4\" (default 3)")
+    p_confronta.add_argument("--cataloghi",
+                             help="Cataloghi da provare separati da punto e virgola, es. \"6000;6000,7500\" "
+                                  "(default: il catalogo del file)")
+    p_confronta.add_argument("--listino", action="append",
+                             help="Listino alternativo: file Excel del catalogo oppure \"6000=45,7500=55\" "
+                                  "(ripetibile)")
+    p_confronta.add_argument("--peso-pattern", type=float, default=0.0,
+                             help="Costo di ogni pattern distinto in barre (default 0 = nessuna riduzione)")
+    p_confronta.add_argument("--processi", type=int, help="Numero massimo di processi (default: numero di CPU)")
+    p_confronta.add_argument("--json", help="Scrive anche le righe del confronto in questo file JSON")
+    p_confronta.set_defaults(funzione=_comando_confronta)
+
+    p_approvvigionamento = comandi.add_parser(
+        "approvvigionamento", help="Suggerisce le lunghezze di barra da tenere a magazzino dallo storico ordini")
+    p_approvvigionamento.add_argument("--ordini", required=True, action="append",
+                                      help="File Excel dello storico ordini (ripetibile)")
+    p_approvvigionamento.add_argument("--lama", type=float, default=3.0, help="Spessore lama in mm (default 3)")
+    p_approvvigionamento.add_argument("--da", type=int, default=LUNGHEZZE_CANDIDATE[0],
+                                      help="Lunghezza candidata minima in mm (default 3000)")
+    p_approvvigionamento.add_argument("--a", type=int, default=LUNGHEZZE_CANDIDATE[-1],
+                                      help="Lunghezza candidata massima in mm (default 7500)")
+    p_approvvigionamento.add_argument("--passo", type=int, default=250, help="Passo tra le candidate in mm (default 250)")
+    p_approvvigionamento.add_argument("--max-lunghezze", type=int, default=2,
+                                      help="Numero massimo di lunghezze a magazzino (default 2)")
+    p_approvvigionamento.add_argument("--costo-metro", type=float, default=1.0,
+                                      help="Costo di un metro di barra (default 1: il costo sono i metri acquistati)")
+    p_approvvigionamento.add_argument("--costo-barra", type=float, default=0.0,
+                                      help="Costo fisso per barra, es. movimentazione (default 0)")
+    p_approvvigionamento.add_argument("--migliori", type=int, default=10, help="Insiemi da mostrare (default 10)")
+    p_approvvigionamento.add_argument("--attuale", help="Catalogo attuale da confrontare, es. \"6000,7500\"")
+    p_approvvigionamento.add_argument("--json", help="Scrive anche il risultato in questo file JSON")
+    p_approvvigionamento.set_defaults(funzione=_comando_approvvigionamento)
+
+    p_storico = comandi.add_parser("storico", help="Rapporto su tempi e qualità delle esecuzioni registrate")
+    p_storico.add_argument("--giorni", type=int, help="Considera solo gli ultimi N giorni")
+    p_storico.add_argument("--file", default=FILE_STORICO, help="Database dello storico")
+    p_storico.set_defaults(funzione=_comando_storico)
+
+    args = parser.parse_args(argv)
+    return args.funzione(args)
+
+
 if __name__ == "__main__":
+    # Necessario per il pool di processi delle commesse nell'eseguibile Windows
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1:
+        sys.exit(esegui_da_riga_di_comando(sys.argv[1:]))
+
     root = tk.Tk()
     app = ApplicativoGUI(root)
     root.mainloop()